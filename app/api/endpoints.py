@@ -1,23 +1,47 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, UploadFile, Form, File, Response
-from fastapi.responses import FileResponse
-from typing import Dict, Any, Optional, List, Annotated
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, Form, File, Header, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, Any, Optional, List, Annotated, Union
 import os
 import tempfile
 import shutil
 from pathlib import Path
 import uuid
+import hashlib
 import asyncio
+from contextlib import AsyncExitStack, nullcontext
+from datetime import datetime
+from functools import partial
 
 from app.models import (
+    FileStage,
     TaskStatus, 
     TaskResponse, 
     TaskResult,
+    TaskPage,
+    TaskStatusRecord,
 )
-from app.storage import get_storage
-from app.storage.base import StorageInterface
-from app.tasks import get_task_runner
+from app.storage import get_storage, get_blob_store, get_task_events
+from app.storage.base import StorageInterface, TaskFilter
+from app.tasks import get_task_runner, get_task_executor, get_job_queue, QueueFullError
+from app.api.file_responses import file_response
+from app.tasks.chunk_export import (
+    EXPORT_FORMATS, ExportUnavailableError, check_export_available, export_chunks, export_path
+)
+from app.tasks.base import take_lease
+from app.tasks.chunk_index import query_chunks
+from app.tasks.cost import FileCostInput, estimate_task_cost
+from app.tasks.executor import DEFAULT_PRIORITY, DEFAULT_TENANT, PRIORITY_OFFSETS
+from app.tasks.runners import get_chunk_pool, get_parser_worker_pool
+from app.parsers.sharding import count_pdf_pages
+from app.cache import get_chunk_cache, get_parse_cache
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.core.uploads import (
+    RequestUploadBudget,
+    SavedUpload,
+    UploadTooLargeError,
+    save_upload_file,
+)
 
 
 # Set up logger
@@ -33,11 +57,41 @@ def get_task_storage() -> StorageInterface:
     return get_storage(storage_type)
 
 
+def _queue_full_exception(retry_after: int) -> HTTPException:
+    """Build the 429 response returned when the task queue is full"""
+    logger.warning(f"Task queue is full, rejecting request (retry after {retry_after}s)")
+    return HTTPException(
+        status_code=429,
+        detail="Too many queued tasks, please retry later",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+def _tenant_id(api_key: Optional[str]) -> str:
+    """Identify the tenant of a request without keeping its API key around"""
+    if not api_key:
+        return DEFAULT_TENANT
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+async def _estimate_cost(uploads: List[SavedUpload], strategy: str) -> float:
+    """Estimate how long a task over the uploaded files will run"""
+    files = []
+    for upload in uploads:
+        page_count = None
+        if upload.path.endswith(".pdf"):
+            page_count = await asyncio.to_thread(count_pdf_pages, upload.path)
+        files.append(FileCostInput(path=upload.path, size=upload.size, page_count=page_count))
+    return estimate_task_cost(files, strategy)
+
+
 @router.post("/tasks/chunking_task", response_model=TaskResponse)
 async def create_chunking_task(
-    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     strategy: str = Form(...),
+    priority: str = Form(DEFAULT_PRIORITY),
+    export_format: Optional[str] = Form(None),
+    x_api_key: Optional[str] = Header(None),
     storage: StorageInterface = Depends(get_task_storage)
 ):
     """
@@ -45,12 +99,42 @@ async def create_chunking_task(
     
     Takes multiple files and processes them using appropriate parsers based on file type.
     Returns a task ID that can be used to check the status and results.
+    Queued tasks are run by priority class and estimated cost, so small
+    documents do not wait behind large ones. With export_format ("arrow" or
+    "parquet") the chunks are also written in that columnar format; if the
+    export fails, the task still completes, with the error in its result.
     """
     task_type = "chunking_task"
     logger.info(f"Creating new {task_type} for {len(files)} files")
+    if priority not in PRIORITY_OFFSETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown priority {priority}, expected one of {', '.join(PRIORITY_OFFSETS)}"
+        )
+    if export_format and export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown export format {export_format}, expected one of {', '.join(EXPORT_FORMATS)}"
+        )
+    if export_format:
+        try:
+            check_export_available()
+        except ExportUnavailableError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+    tenant = _tenant_id(x_api_key)
+    
+    # Reject early, before any upload is written, when the queue is full
+    distributed = settings.EXECUTION_MODE == "distributed"
+    executor = get_task_executor()
+    if distributed:
+        job_queue = get_job_queue()
+        if await job_queue.is_full():
+            raise _queue_full_exception(await job_queue.retry_after())
+    elif executor.is_full(tenant):
+        raise _queue_full_exception(executor.retry_after())
     
     # Create base directory if it doesn't exist
-    base_dir = Path("/tmp/ai_chunking")
+    base_dir = Path(settings.TASK_BASE_DIR)
     base_dir.mkdir(parents=True, exist_ok=True)
     
     # Create a unique directory for this task
@@ -58,53 +142,113 @@ async def create_chunking_task(
     task_dir = base_dir / task_id
     task_dir.mkdir(parents=True, exist_ok=True)
     
-    saved_files = []
+    blob_store = get_blob_store()
+    saved_uploads: List[SavedUpload] = []
+    budget = RequestUploadBudget()
     
     try:
-        # Save uploaded files to task directory
+        # Stream uploaded files into the blob store and link them into the task directory
         for file in files:
-            file_path = task_dir / file.filename
+            file_path = task_dir / Path(file.filename).name
             try:
-                # Save uploaded file content
-                with open(file_path, "wb") as temp_file:
-                    content = await file.read()
-                    temp_file.write(content)
-                    await file.seek(0)  # Reset file pointer for potential reuse
-                saved_files.append(str(file_path))
-                logger.debug(f"Saved file {file.filename} to {file_path}")
+                upload = await save_upload_file(file, blob_store.staging_path(), budget=budget)
+                try:
+                    await blob_store.add(upload.path, upload.sha256, str(file_path), task_id)
+                except Exception:
+                    # The staged file is moved by a successful ingest, and the
+                    # reference is recorded before linking, so undo both
+                    if os.path.exists(upload.path):
+                        os.remove(upload.path)
+                    await blob_store.release(upload.sha256, task_id)
+                    raise
+                upload.path = str(file_path)
+                saved_uploads.append(upload)
+                logger.debug(f"Saved file {file.filename} to {file_path} (blob {upload.sha256})")
+            except UploadTooLargeError as e:
+                logger.warning(str(e))
+                raise HTTPException(status_code=413, detail=str(e))
             except Exception as e:
                 logger.error(f"Error saving file {file.filename}: {str(e)}")
                 raise HTTPException(status_code=500, detail=f"Error processing file {file.filename}")
         
+        saved_files = [upload.path for upload in saved_uploads]
+        cost = await _estimate_cost(saved_uploads, strategy)
+        
         # Create a new task result object
         task_result = TaskResult.create_new(task_type=task_type, task_id=task_id)
         logger.debug(f"Generated task ID: {task_id}")
 
         # Save initial metadata about files
         task_result.result = {
-            "input_files": [{"filename": f.filename, "size": len(await f.read())} for f in files],
+            "input_files": [
+                {"filename": upload.filename, "size": upload.size, "sha256": upload.sha256}
+                for upload in saved_uploads
+            ],
             "task_dir": str(task_dir),
             "saved_files": saved_files,
-            "strategy": strategy
+            "strategy": strategy,
+            "priority": priority,
+            "tenant": tenant,
+            "export_format": export_format,
+            "estimated_cost": round(cost, 1)
+        }
+        task_result.checkpoints = {
+            upload.path: {"stage": FileStage.UPLOADED.value, "sha256": upload.sha256}
+            for upload in saved_uploads
         }
         
+        if not distributed:
+            # Held by this process until it finishes, see recover_tasks
+            take_lease(task_result)
+        
         # Save the initial task state
         logger.debug(f"Saving initial task state for {task_id}")
         await storage.save_task(task_result)
         
-        # Get the task runner
-        task_runner = get_task_runner(task_type, storage)
-        logger.debug(f"Created task runner for {task_id}")
-        
-        # Add task to background tasks
-        logger.debug(f"Adding task {task_id} to background tasks")
+        file_hashes = {upload.path: upload.sha256 for upload in saved_uploads}
         print("Strategy: ", strategy)
-        background_tasks.add_task(
-            task_runner.run_task,
-            task_result,
-            files=saved_files,
-            strategy=strategy
-        )
+        try:
+            if distributed:
+                # Queue the task on the shared job stream for the worker processes
+                logger.debug(f"Enqueueing task {task_id} for distributed workers")
+                queue_position = await job_queue.enqueue({
+                    "task_id": task_id,
+                    "task_type": task_type,
+                    "kwargs": {
+                        "files": saved_files,
+                        "strategy": strategy,
+                        "file_hashes": file_hashes,
+                        "export_format": export_format,
+                    },
+                })
+            else:
+                # Get the task runner
+                task_runner = get_task_runner(task_type, storage)
+                logger.debug(f"Created task runner for {task_id}")
+                
+                # Queue the task on the bounded executor, ordered by estimated cost
+                logger.debug(f"Queueing task {task_id}")
+                queue_position = executor.submit(
+                    task_id,
+                    strategy,
+                    partial(
+                        task_runner.run_task,
+                        task_result,
+                        files=saved_files,
+                        strategy=strategy,
+                        file_hashes=file_hashes,
+                        export_format=export_format
+                    ),
+                    cost=cost,
+                    priority=priority,
+                    tenant=tenant,
+                    heartbeat=partial(task_runner.renew_lease, task_result)
+                )
+        except QueueFullError as e:
+            task_result.status = TaskStatus.FAILED
+            task_result.error = str(e)
+            await storage.save_task(task_result)
+            raise _queue_full_exception(e.retry_after)
         
         logger.info(f"Successfully initiated task {task_id}")
         
@@ -113,19 +257,131 @@ async def create_chunking_task(
             task_id=task_id,
             task_type=task_type,
             status=TaskStatus.PENDING,
-            created_at=task_result.created_at
+            created_at=task_result.created_at,
+            queue_position=queue_position
         )
         
     except Exception as e:
         logger.error(f"Error creating chunking task: {str(e)}")
-        # Clean up task directory in case of error
+        # Clean up task directory and blob references in case of error
         shutil.rmtree(task_dir, ignore_errors=True)
+        await blob_store.release_all([upload.sha256 for upload in saved_uploads], task_id)
         raise
 
 
+def _parse_wait(wait: Optional[str]) -> float:
+    """Parse a long-poll duration such as "30s" or "30", capped at LONG_POLL_MAX_WAIT"""
+    if not wait:
+        return 0.0
+    try:
+        seconds = float(wait[:-1] if wait.endswith("s") else wait)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid wait duration: {wait}")
+    return max(0.0, min(seconds, settings.LONG_POLL_MAX_WAIT))
+
+
+def _subscribe_if_waiting(task_id: str, wait_seconds: float):
+    """
+    Subscribe to a task's events for a long poll, or do nothing without a wait
+
+    Subscribing takes a Redis connection with Redis events, so plain reads
+    skip it. Subscribe before reading, so a change right after the read is
+    not missed.
+    """
+    return get_task_events().subscribe(task_id) if wait_seconds else nullcontext()
+
+
+async def _with_queue_position(task: Union[TaskResult, TaskStatusRecord]) -> Union[TaskResult, TaskStatusRecord]:
+    """Fill in the queue position of a pending task"""
+    if task.status == TaskStatus.PENDING:
+        if settings.EXECUTION_MODE == "distributed":
+            task.queue_position = await get_job_queue().queue_position(task.task_id)
+        else:
+            task.queue_position = get_task_executor().queue_position(task.task_id)
+    return task
+
+
+# Task fields holding dicts, whose keys can be selected with dotted paths
+DICT_FIELDS = ("result", "progress", "checkpoints")
+
+
+def _projection(fields: str) -> Dict[str, Any]:
+    """
+    Parse a field selection such as "status,result.results.chunks_count"
+    into a tree of selected keys, always including task_id
+    
+    Raises:
+        HTTPException: 400 if a field is not a task field, or a dotted path
+        does not start at a field holding a dict
+    """
+    projection: Dict[str, Any] = {"task_id": True}
+    for field in filter(None, (field.strip() for field in fields.split(","))):
+        path = field.split(".")
+        if path[0] not in TaskResult.model_fields:
+            raise HTTPException(status_code=400, detail=f"Unknown task field: {path[0]}")
+        if len(path) > 1 and path[0] not in DICT_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Task field {path[0]} has no keys: {field}")
+        if not all(path):
+            raise HTTPException(status_code=400, detail=f"Invalid field path: {field}")
+        node = projection
+        for key in path[:-1]:
+            if node.get(key) is True:
+                break
+            node = node.setdefault(key, {})
+        else:
+            node[path[-1]] = True
+    return projection
+
+
+def _project(value: Any, projection: Dict[str, Any]) -> Any:
+    """Keep the selected keys of a dumped task, selecting them in every item of a list"""
+    if isinstance(value, list):
+        return [_project(item, projection) for item in value]
+    if not isinstance(value, dict):
+        return {}
+    projected = {}
+    for key, selected in projection.items():
+        if key not in value:
+            continue
+        if selected is True:
+            projected[key] = value[key]
+        elif isinstance(value[key], (dict, list)):
+            projected[key] = _project(value[key], selected)
+    return projected
+
+
+@router.get("/tasks/{task_id}/status", response_model=TaskStatusRecord)
+async def get_task_status(
+    task_id: str,
+    wait: Optional[str] = Query(None, description='Long-poll for up to this long, e.g. "30s"'),
+    storage: StorageInterface = Depends(get_task_storage)
+):
+    """
+    Get the status, timestamps and progress counters of a task
+    
+    Meant for polling: the response stays small however many files the task
+    has, and the task result is not read. With wait, an unfinished task is
+    only returned once it changes or the wait runs out.
+    """
+    wait_seconds = _parse_wait(wait)
+    
+    async with _subscribe_if_waiting(task_id, wait_seconds) as subscription:
+        record = await storage.get_task_status(task_id)
+        if not record:
+            logger.warning(f"Task {task_id} not found")
+            raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+        
+        if wait_seconds and not record.status.is_final:
+            record = await subscription.next(wait_seconds) or record
+    
+    return await _with_queue_position(record)
+
+
 @router.get("/results/{task_id}", response_model=TaskResult)
 async def get_task_result(
     task_id: str,
+    wait: Optional[str] = Query(None, description='Long-poll for up to this long, e.g. "30s"'),
+    fields: Optional[str] = Query(None, description='Only return these fields, e.g. "status,result.results.chunks_count"'),
     storage: StorageInterface = Depends(get_task_storage)
 ):
     """
@@ -133,72 +389,354 @@ async def get_task_result(
     
     If the task is complete, returns the task result
     If the task is still running, returns the current status
+    With wait, an unfinished task is only returned once it changes or the
+    wait runs out, so clients do not need to poll in a loop. With fields,
+    only the listed task fields, or dotted paths of keys within the result,
+    progress or checkpoints, are returned; a path through a list selects
+    the key in each of its items.
+    Use /tasks/{task_id}/status to poll for completion.
     """
     logger.info(f"Retrieving results for task {task_id}")
+    wait_seconds = _parse_wait(wait)
+    include = _projection(fields) if fields else None
     
-    task_result = await storage.get_task(task_id)
+    async with _subscribe_if_waiting(task_id, wait_seconds) as subscription:
+        task_result = await storage.get_task(task_id)
+        
+        if not task_result:
+            logger.warning(f"Task {task_id} not found")
+            raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+        
+        if wait_seconds and not task_result.status.is_final:
+            if await subscription.next(wait_seconds) is not None:
+                task_result = await storage.get_task(task_id) or task_result
+    
+    logger.debug(f"Task {task_id} status: {task_result.status}")
+    task_result = await _with_queue_position(task_result)
+    if include is not None:
+        return JSONResponse(_project(task_result.model_dump(mode="json", include=set(include)), include))
+    return task_result
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@router.get("/tasks/{task_id}/events")
+async def stream_task_events(
+    task_id: str,
+    storage: StorageInterface = Depends(get_task_storage)
+):
+    """
+    Stream status and progress changes of a task as Server-Sent Events
+    
+    Each event carries the task's status record. The current state is sent
+    first, then a "status" event whenever the status changes and a
+    "progress" event for other updates. The stream ends after the task
+    reaches a final status.
+    """
+    subscription_scope = AsyncExitStack()
+    subscription = await subscription_scope.enter_async_context(get_task_events().subscribe(task_id))
+    record = await storage.get_task_status(task_id)
+    if not record:
+        await subscription_scope.aclose()
+        logger.warning(f"Task {task_id} not found")
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    
+    async def events():
+        try:
+            current = await _with_queue_position(record)
+            yield _sse("status", current.model_dump_json())
+            while not current.status.is_final:
+                update = await subscription.next(settings.SSE_KEEPALIVE_INTERVAL)
+                if update is None:
+                    # Comment line, keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                event = "status" if update.status != current.status else "progress"
+                current = update
+                yield _sse(event, current.model_dump_json())
+        finally:
+            await subscription_scope.aclose()
     
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.delete("/tasks/{task_id}", response_model=TaskResult)
+async def cancel_task(
+    task_id: str,
+    storage: StorageInterface = Depends(get_task_storage)
+):
+    """
+    Cancel a queued or running task
+    
+    A running task's parser and chunking processes are stopped and its
+    worker slot is freed. Returns 409 if the task has already finished.
+    """
+    logger.info(f"Cancelling task {task_id}")
+    
+    task_result = await storage.get_task(task_id)
     if not task_result:
         logger.warning(f"Task {task_id} not found")
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    if task_result.status.is_final:
+        raise HTTPException(status_code=409, detail=f"Task {task_id} is already {task_result.status.value}")
     
-    logger.debug(f"Task {task_id} status: {task_result.status}")
+    if settings.EXECUTION_MODE == "distributed":
+        # The worker holding the task stops it; a queued task is skipped when claimed
+        await get_job_queue().request_cancel(task_id)
+        found = "queued" if task_result.status == TaskStatus.PENDING else "running"
+    else:
+        found = await get_task_executor().cancel(task_id)
+    
+    if found == "running":
+        # The runner records the cancellation itself
+        return await storage.get_task(task_id) or task_result
+    
+    task_result.status = TaskStatus.CANCELLED
+    task_result.completed_at = datetime.utcnow()
+    task_result.error = "Task was cancelled"
+    await storage.save_task(task_result)
     return task_result
 
 
-@router.get("/tasks", response_model=Dict[str, TaskResult])
-async def list_tasks(storage: StorageInterface = Depends(get_task_storage)):
-    """List all tasks and their statuses"""
-    logger.info("Listing all tasks")
+def _chunks_output(task_result: TaskResult) -> Optional[Dict[str, str]]:
+    """Get the chunks file and offsets sidecar of a task, finished or still running"""
+    for result in (task_result.result or {}).get("results", []):
+        if result.get("chunks_offsets_path"):
+            return {"chunks_file_path": result["chunks_file_path"], "offsets_path": result["chunks_offsets_path"]}
+    output = (task_result.progress or {}).get("output")
+    if output and output.get("offsets_path"):
+        return {"chunks_file_path": output["chunks_file_path"], "offsets_path": output["offsets_path"]}
+    return None
+
+
+@router.get("/tasks/{task_id}/chunks")
+async def get_task_chunks(
+    task_id: str,
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    source: Optional[List[str]] = Query(None),
+    page_from: Optional[int] = Query(None, ge=0),
+    page_to: Optional[int] = Query(None, ge=0),
+    chunk_id: Optional[List[int]] = Query(None),
+    storage: StorageInterface = Depends(get_task_storage)
+):
+    """
+    Get a page of a task's chunks
+    
+    Chunks are read through the chunk index, so only the requested chunks
+    are read from disk. Chunks of finished documents are available while
+    the task is still running. Pass next_cursor back as cursor to get the
+    following page.
+    """
+    task_result = await storage.get_task(task_id)
+    if not task_result:
+        logger.warning(f"Task {task_id} not found")
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    
+    output = _chunks_output(task_result)
+    if output is None or not os.path.isfile(output["offsets_path"]):
+        raise HTTPException(status_code=404, detail=f"Task {task_id} has no chunks yet")
+    
+    try:
+        chunks, next_cursor = await asyncio.to_thread(
+            query_chunks,
+            output["chunks_file_path"],
+            output["offsets_path"],
+            cursor=cursor,
+            limit=limit,
+            sources=set(source) if source else None,
+            page_from=page_from,
+            page_to=page_to,
+            chunk_ids=set(chunk_id) if chunk_id else None,
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Chunks of task {task_id} are no longer available")
+    
+    return {
+        "task_id": task_id,
+        "status": task_result.status,
+        "chunks": chunks,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/tasks", response_model=TaskPage)
+async def list_tasks(
+    status: Optional[TaskStatus] = Query(None),
+    task_type: Optional[str] = Query(None),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    storage: StorageInterface = Depends(get_task_storage)
+):
+    """
+    List tasks and their statuses, newest first
     
-    tasks = await storage.list_tasks()
+    Results are paginated: pass the returned next_cursor to get the next
+    page, with the same filters.
+    """
+    logger.info("Listing tasks")
+    
+    task_filter = TaskFilter(status=status, task_type=task_type, created_from=created_from, created_to=created_to)
+    try:
+        tasks, next_cursor = await storage.query_tasks(task_filter, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     logger.debug(f"Found {len(tasks)} tasks")
-    return tasks
+    return TaskPage(tasks=tasks, next_cursor=next_cursor)
+
+
+@router.get("/executor/stats")
+async def get_executor_stats():
+    """Get task queue depth and worker utilization"""
+    if settings.EXECUTION_MODE == "distributed":
+        return await get_job_queue().stats()
+    stats = get_task_executor().stats()
+    if settings.PARSER_MODE == "worker":
+        stats["parser_workers"] = get_parser_worker_pool().stats()
+    return stats
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get hit/miss counters and size information for the parse and chunk caches"""
+    return {
+        "parse": get_parse_cache().stats(),
+        "chunks": await get_chunk_cache(settings.STORAGE_TYPE).stats(),
+    }
+
+
+@router.post("/tasks/{task_id}/exports/{export_format}")
+async def export_task_chunks(
+    task_id: str,
+    export_format: str,
+    storage: StorageInterface = Depends(get_task_storage)
+):
+    """
+    Convert the chunks of a completed task to a columnar format
+    
+    "arrow" writes a memory-mappable Arrow IPC file, "parquet" a Parquet
+    file. An existing, up to date export is reused. The export can be
+    downloaded as the returned artifact.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown export format {export_format}, expected one of {', '.join(EXPORT_FORMATS)}"
+        )
+    task_result = await storage.get_task(task_id)
+    if not task_result:
+        logger.warning(f"Task {task_id} not found")
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    if task_result.status != TaskStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Task {task_id} is {task_result.status.value}, not completed")
+    output = _chunks_output(task_result)
+    if output is None or not os.path.isfile(output["chunks_file_path"]):
+        raise HTTPException(status_code=404, detail=f"Chunks of task {task_id} are no longer available")
+    
+    path = export_path(output["chunks_file_path"], export_format)
+    if not os.path.isfile(path) or os.path.getmtime(path) < os.path.getmtime(output["chunks_file_path"]):
+        logger.info(f"Exporting chunks of task {task_id} as {export_format}")
+        try:
+            path = await get_chunk_pool().run(
+                export_chunks, output["chunks_file_path"], output["offsets_path"], export_format
+            )
+        except ExportUnavailableError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+    
+    return {
+        "task_id": task_id,
+        "format": export_format,
+        "artifact": os.path.basename(path),
+        "size": os.path.getsize(path),
+    }
+
+
+def _resolve_within(path: Path, base_dir: Path) -> Path:
+    """
+    Resolve a path and make sure it stays inside base_dir
+    
+    Raises:
+        HTTPException: 403 outside base_dir, 404 if the file does not exist
+    """
+    abs_path = path.resolve()
+    if not abs_path.is_relative_to(base_dir.resolve()):
+        logger.warning(f"Attempted to access file outside allowed directory: {path}")
+        raise HTTPException(
+            status_code=403,
+            detail="Access to files outside the allowed directory is forbidden"
+        )
+    if not abs_path.is_file():
+        logger.warning(f"File not found: {path}")
+        raise HTTPException(status_code=404, detail="File not found")
+    return abs_path
+
+
+# Artifact names that stand for a task's outputs wherever they were written
+ARTIFACT_ALIASES = {
+    "chunks": "chunks_file_path",
+    "chunks_offsets": "offsets_path",
+}
+
+
+@router.get("/tasks/{task_id}/artifacts/{artifact:path}")
+async def download_task_artifact(
+    task_id: str,
+    artifact: str,
+    request: Request,
+    storage: StorageInterface = Depends(get_task_storage)
+):
+    """
+    Download a file produced for a task
+    
+    The artifact is either an alias ("chunks", "chunks_offsets") or a path
+    relative to the task directory, such as a parsed markdown file. Supports
+    byte ranges, ETag revalidation and gzip/zstd content encoding.
+    """
+    task_result = await storage.get_task(task_id)
+    if not task_result:
+        logger.warning(f"Task {task_id} not found")
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    
+    task_dir = Path(settings.TASK_BASE_DIR) / task_id
+    if artifact in ARTIFACT_ALIASES:
+        output = _chunks_output(task_result)
+        if output is None:
+            raise HTTPException(status_code=404, detail=f"Task {task_id} has no chunks yet")
+        file_path = Path(output[ARTIFACT_ALIASES[artifact]])
+    else:
+        file_path = task_dir / artifact
+    
+    abs_file_path = _resolve_within(file_path, task_dir)
+    logger.info(f"Serving artifact {artifact} of task {task_id}")
+    return file_response(request, str(abs_file_path))
 
 
 @router.get("/download")
-async def download_file(file_path: str):
+async def download_file(file_path: str, request: Request):
     """
     Download a file from the server
     
-    The file path must be within the /tmp/ai_chunking directory for security
+    The file path must be within the task base directory for security.
+    Prefer /tasks/{task_id}/artifacts/{artifact}, which does not expose
+    server paths.
     """
     logger.info(f"Attempting to download file: {file_path}")
     
-    # Convert to Path object for safe path manipulation
-    file_path = Path(file_path)
-    base_dir = Path("/tmp/ai_chunking")
-    
     try:
-        # Resolve the absolute paths (this also handles any '..' in the path)
-        abs_file_path = file_path.resolve()
-        abs_base_dir = base_dir.resolve()
-        
-        # Security check: ensure the file is within the allowed directory
-        if not str(abs_file_path).startswith(str(abs_base_dir)):
-            logger.warning(f"Attempted to access file outside allowed directory: {file_path}")
-            raise HTTPException(
-                status_code=403,
-                detail="Access to files outside the allowed directory is forbidden"
-            )
-        
-        # Check if file exists
-        if not abs_file_path.is_file():
-            logger.warning(f"File not found: {file_path}")
-            raise HTTPException(status_code=404, detail="File not found")
-        
-        # Get the filename for the download
-        filename = abs_file_path.name
-        
-        logger.info(f"Serving file: {filename}")
-        return FileResponse(
-            path=str(abs_file_path),
-            filename=filename,
-            media_type="application/octet-stream"
-        )
+        abs_file_path = _resolve_within(Path(file_path), Path(settings.TASK_BASE_DIR))
+        logger.info(f"Serving file: {abs_file_path.name}")
+        return file_response(request, str(abs_file_path))
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error downloading file {file_path}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error downloading file") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error downloading file")
@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import zlib
+from email.utils import formatdate
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+READ_SIZE = 1024 * 1024
+
+# Media types of the artifacts a task produces
+MEDIA_TYPES: Dict[str, str] = {
+    ".jsonl": "application/x-ndjson",
+    ".json": "application/json",
+    ".md": "text/markdown; charset=utf-8",
+    ".gz": "application/gzip",
+    ".zst": "application/zstd",
+    ".index": "application/octet-stream",
+    ".arrow": "application/vnd.apache.arrow.file",
+    ".parquet": "application/vnd.apache.parquet",
+}
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Content codings mapped to the suffix of a precompressed sibling file
+ENCODING_SUFFIXES: Dict[str, str] = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def media_type_for(path: str) -> str:
+    """Get the media type of a file from its extension"""
+    extension = os.path.splitext(path)[1].lower()
+    return MEDIA_TYPES.get(extension) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def file_etag(stat: os.stat_result, encoding: Optional[str] = None) -> str:
+    """
+    Strong ETag of one representation of a file
+
+    Derived from the inode, size and modification time in nanoseconds.
+    Artifacts are either replaced atomically or, like the chunks.jsonl of a
+    running task, only appended to in place, so each write changes the
+    size or modification time. A download of a file that has grown since
+    is therefore not resumed by If-Range against its old length.
+    """
+    digest = hashlib.sha1(f"{stat.st_ino}-{stat.st_size}-{stat.st_mtime_ns}".encode()).hexdigest()[:24]
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def supported_encodings() -> List[str]:
+    """Content codings that can be produced on the fly, most preferred first"""
+    return (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """Pick the client's most preferred coding out of the available ones, or None for identity"""
+    preferences: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            preferences[coding.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = preferences.get(coding, preferences.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range into inclusive (start, end) offsets
+
+    Returns None for headers this server does not honor (other units or
+    multiple ranges), in which case the whole file is sent.
+
+    Raises:
+        HTTPException: 416 if the range does not overlap the file
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, min(end, size - 1)
+
+
+async def _read_file(path: str, start: int, length: int) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = await asyncio.to_thread(f.read, min(READ_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+async def _compress(chunks: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _precompressed(path: str, accept_encoding: str) -> Tuple[str, Optional[str]]:
+    """Find a precompressed sibling of path the client accepts"""
+    available = [coding for coding, suffix in ENCODING_SUFFIXES.items() if os.path.isfile(path + suffix)]
+    coding = negotiate_encoding(accept_encoding, available) if available else None
+    if coding is None:
+        return path, None
+    return path + ENCODING_SUFFIXES[coding], coding
+
+
+def file_response(request: Request, path: str, filename: Optional[str] = None) -> Response:
+    """
+    Serve a file with validators, byte ranges and negotiated compression
+
+    A precompressed sibling (path.zst or path.gz) is served directly when the
+    client accepts its coding. Otherwise compressible files are encoded on
+    the fly, unless a range is requested: ranges are always served from the
+    stored bytes of the chosen representation. Each representation has its
+    own strong ETag, so If-None-Match gets a 304 and If-Range only resumes a
+    download of the same bytes.
+    """
+    media_type = media_type_for(path)
+    filename = filename or os.path.basename(path)
+    accept_encoding = request.headers.get("accept-encoding", "")
+    range_header = request.headers.get("range")
+
+    served_path, encoding = _precompressed(path, accept_encoding)
+    stat = os.stat(served_path)
+    on_the_fly = None
+    if encoding is None and range_header is None and media_type.startswith(COMPRESSIBLE_TYPES):
+        on_the_fly = negotiate_encoding(accept_encoding, supported_encodings())
+    etag = file_etag(stat, encoding or on_the_fly)
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+        "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+    }
+    if encoding or on_the_fly:
+        headers["Content-Encoding"] = encoding or on_the_fly
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    if on_the_fly:
+        return StreamingResponse(
+            _compress(_read_file(served_path, 0, stat.st_size), on_the_fly),
+            media_type=media_type,
+            headers=headers,
+        )
+
+    byte_range = None
+    if range_header is not None:
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range.strip() == etag:
+            byte_range = parse_range(range_header, stat.st_size)
+    if byte_range is None:
+        start, length, status_code = 0, stat.st_size, 200
+    else:
+        start, end = byte_range
+        length, status_code = end - start + 1, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _read_file(served_path, start, length),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+    )
@@ -0,0 +1,41 @@
+from functools import lru_cache
+
+from app.cache.parse_cache import ParseCache, file_sha256
+from app.cache.chunk_cache import ChunkCacheInterface, FileChunkCache, RedisChunkCache
+from app.core.config import settings
+from app.storage import get_redis_client
+
+
+@lru_cache()
+def get_parse_cache() -> ParseCache:
+    """Get the shared parser output cache"""
+    return ParseCache(settings.PARSE_CACHE_DIR, max_bytes=settings.PARSE_CACHE_MAX_BYTES)
+
+
+@lru_cache()
+def get_chunk_cache(storage_type: str = "memory") -> ChunkCacheInterface:
+    """Get the chunk result cache matching the configured storage backend"""
+    storage_type = storage_type.lower()
+    if storage_type == "redis":
+        return RedisChunkCache(
+            settings.REDIS_URL,
+            max_bytes=settings.CHUNK_CACHE_MAX_BYTES,
+            ttl=settings.CHUNK_CACHE_TTL,
+            redis_client=get_redis_client(),
+        )
+    return FileChunkCache(
+        settings.CHUNK_CACHE_DIR,
+        max_bytes=settings.CHUNK_CACHE_MAX_BYTES,
+        ttl=settings.CHUNK_CACHE_TTL,
+    )
+
+
+__all__ = [
+    'ParseCache',
+    'ChunkCacheInterface',
+    'FileChunkCache',
+    'RedisChunkCache',
+    'file_sha256',
+    'get_parse_cache',
+    'get_chunk_cache',
+]
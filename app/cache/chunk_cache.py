@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.core.logging import get_logger
+
+# Serialization of cached chunks files; part of the key so entries written
+# in an older format are never handed out
+CHUNKS_FORMAT = "jsonl-task-relative"
+# Stands in for the directory of the task that cached the chunks, so the
+# paths in their metadata point into the directory of the task reusing them
+TASK_DIR_PLACEHOLDER = "{task_dir}"
+
+
+def _json_fragment(text: str) -> bytes:
+    """A string as it appears inside a serialized chunk"""
+    return json.dumps(text, ensure_ascii=False)[1:-1].encode("utf-8")
+
+
+def _replace_task_dir(data: bytes, old: str, new: str) -> bytes:
+    return data.replace(_json_fragment(old), _json_fragment(new))
+
+
+def _copy_replacing_task_dir(src_path: str, dst_path: str, old: str, new: str) -> None:
+    """Copy a chunks file line by line, replacing one task directory with another"""
+    old_fragment, new_fragment = _json_fragment(old), _json_fragment(new)
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        for line in src:
+            dst.write(line.replace(old_fragment, new_fragment))
+
+
+class ChunkCacheInterface(ABC):
+    """
+    Cache of serialized chunking results
+
+    Entries are keyed by the hashes of the parsed documents, the chunking
+    strategy and the chunker parameters, and hold the serialized chunks file.
+    Chunk metadata refers to the parsed document and its assets by path, so
+    the task directory is replaced by TASK_DIR_PLACEHOLDER when a file is
+    stored, and by the directory of the task reading it on a hit.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(content_hashes: List[str], strategy: str, params: Dict[str, Any]) -> str:
+        """Build a cache key from the parsed document hashes and chunker configuration"""
+        payload = json.dumps(
+            {"documents": content_hashes, "strategy": strategy, "params": params, "format": CHUNKS_FORMAT},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @abstractmethod
+    async def get(self, key: str, destination: str, task_dir: str) -> bool:
+        """Materialize a cached chunks file at destination for a task, returning False on a miss"""
+        pass
+
+    @abstractmethod
+    async def put(self, key: str, chunks_path: str, task_dir: str) -> None:
+        """Store a serialized chunks file of the task in task_dir under the given key"""
+        pass
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and size information"""
+        pass
+
+    def _counters(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class FileChunkCache(ChunkCacheInterface):
+    """Chunk cache stored as files on disk with TTL and LRU size-based eviction"""
+
+    def __init__(self, root: str, max_bytes: int, ttl: int):
+        """Initialize the cache rooted at the given directory"""
+        super().__init__()
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.logger = get_logger("cache.chunks")
+
+        self._lock = threading.Lock()
+        # key -> (size, created_at), ordered from least to most recently used
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._total_bytes = 0
+        self.evictions = 0
+        self._load_index()
+        self.logger.info(f"Initialized file chunk cache at {root} ({len(self._entries)} entries)")
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def _load_index(self) -> None:
+        """Rebuild the in-memory index from the entries on disk"""
+        entries = []
+        for path in self.root.iterdir():
+            if path.name.startswith("."):
+                # Leftover from an interrupted put
+                path.unlink(missing_ok=True)
+                continue
+            if path.suffix == ".json":
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for created_at, key, size in sorted(entries):
+            self._entries[key] = (size, created_at)
+            self._total_bytes += size
+
+    async def get(self, key: str, destination: str, task_dir: str) -> bool:
+        return await asyncio.to_thread(self._get, key, destination, task_dir)
+
+    async def put(self, key: str, chunks_path: str, task_dir: str) -> None:
+        await asyncio.to_thread(self._put, key, chunks_path, task_dir)
+
+    async def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "file",
+                **self._counters(),
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+    def _get(self, key: str, destination: str, task_dir: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False
+            if self.ttl and time.time() - entry[1] > self.ttl:
+                self._remove(key)
+                self.misses += 1
+                return False
+            try:
+                if os.path.lexists(destination):
+                    os.remove(destination)
+                _copy_replacing_task_dir(str(self._entry_path(key)), destination, TASK_DIR_PLACEHOLDER, task_dir)
+            except OSError as e:
+                self.logger.warning(f"Dropping unreadable chunk cache entry {key}: {str(e)}")
+                self._remove(key)
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return True
+
+    def _put(self, key: str, chunks_path: str, task_dir: str) -> None:
+        size = os.path.getsize(chunks_path)
+        if self.max_bytes and size > self.max_bytes:
+            self.logger.debug(f"Not caching chunks {key}: {size} bytes exceeds the cache budget")
+            return
+        staging_path = self.root / f".{key}.{uuid.uuid4().hex}"
+        _copy_replacing_task_dir(chunks_path, str(staging_path), task_dir, TASK_DIR_PLACEHOLDER)
+        size = os.path.getsize(staging_path)
+        with self._lock:
+            self._remove(key)
+            os.replace(staging_path, self._entry_path(key))
+            self._entries[key] = (size, time.time())
+            self._total_bytes += size
+            while self.max_bytes and self._total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        self.logger.debug(f"Cached chunks {key} ({size} bytes)")
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry; the caller must hold the lock"""
+        size, _ = self._entries.pop(key, (0, 0.0))
+        self._total_bytes -= size
+        self._entry_path(key).unlink(missing_ok=True)
+
+
+class RedisChunkCache(ChunkCacheInterface):
+    """
+    Chunk cache stored in Redis
+
+    Each entry is a string key with an expiry. A sorted set scored by last
+    access time and a hash of entry sizes drive LRU eviction once the total
+    size exceeds the budget.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        max_bytes: int,
+        ttl: int,
+        key_prefix: str = "chunk_cache:",
+        redis_client: Optional[redis.Redis] = None
+    ):
+        """Initialize with Redis connection URL, or an existing client"""
+        super().__init__()
+        self.redis_client = redis_client or redis.from_url(redis_url)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.lru_key = f"{key_prefix}lru"
+        self.sizes_key = f"{key_prefix}sizes"
+        self.logger = get_logger("cache.chunks")
+        self.logger.info(f"Initialized Redis chunk cache with URL: {redis_url}")
+
+    def _get_key(self, key: str) -> str:
+        return f"{self.key_prefix}entry:{key}"
+
+    async def get(self, key: str, destination: str, task_dir: str) -> bool:
+        data = await self.redis_client.get(self._get_key(key))
+        if data is None:
+            self.misses += 1
+            # Drop bookkeeping for an entry that expired through its TTL
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.zrem(self.lru_key, key)
+                pipe.hdel(self.sizes_key, key)
+                await pipe.execute()
+            return False
+        await self.redis_client.zadd(self.lru_key, {key: time.time()})
+        await asyncio.to_thread(
+            Path(destination).write_bytes, _replace_task_dir(data, TASK_DIR_PLACEHOLDER, task_dir)
+        )
+        self.hits += 1
+        return True
+
+    async def put(self, key: str, chunks_path: str, task_dir: str) -> None:
+        size = os.path.getsize(chunks_path)
+        if self.max_bytes and size > self.max_bytes:
+            self.logger.debug(f"Not caching chunks {key}: {size} bytes exceeds the cache budget")
+            return
+        data = _replace_task_dir(await asyncio.to_thread(Path(chunks_path).read_bytes), task_dir, TASK_DIR_PLACEHOLDER)
+        size = len(data)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(self._get_key(key), data, ex=self.ttl or None)
+            pipe.zadd(self.lru_key, {key: time.time()})
+            pipe.hset(self.sizes_key, key, size)
+            await pipe.execute()
+        await self._evict()
+        self.logger.debug(f"Cached chunks {key} ({size} bytes)")
+
+    async def _evict(self) -> None:
+        """Evict least recently used entries until the total size fits the budget"""
+        if not self.max_bytes:
+            return
+        sizes = await self.redis_client.hgetall(self.sizes_key)
+        total = sum(int(size) for size in sizes.values())
+        while total > self.max_bytes:
+            popped = await self.redis_client.zpopmin(self.lru_key)
+            if not popped:
+                break
+            key = popped[0][0].decode("utf-8")
+            total -= int(sizes.get(key.encode("utf-8"), 0))
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(self._get_key(key))
+                pipe.hdel(self.sizes_key, key)
+                await pipe.execute()
+
+    async def stats(self) -> Dict[str, Any]:
+        sizes = await self.redis_client.hvals(self.sizes_key)
+        return {
+            "backend": "redis",
+            **self._counters(),
+            "entries": len(sizes),
+            "bytes": sum(int(size) for size in sizes),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
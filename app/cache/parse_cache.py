@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.logging import get_logger
+
+
+def _link_or_copy(src: str, dst: str) -> str:
+    """Hardlink a file, falling back to a copy across filesystems"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def _dir_size(path: Path) -> int:
+    """Get the total size of the files under a directory"""
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 digest of a file without loading it into memory"""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for piece in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(piece)
+    return hasher.hexdigest()
+
+
+class ParseCache:
+    """
+    Disk cache of parser output directories
+
+    Entries are keyed by the document content hash and the parse options that
+    affect the output. Each entry is a copy of the parser's output directory
+    (the markdown file plus any extracted images) stored under
+    ``entries/<key>``. The total size is kept under ``max_bytes`` by evicting
+    the least recently used entries; recency survives restarts through the
+    entry directory mtime.
+    """
+
+    META_FILE = ".cache_meta.json"
+
+    def __init__(self, root: str, max_bytes: int):
+        """Initialize the cache rooted at the given directory"""
+        self.root = Path(root)
+        self.entries_dir = self.root / "entries"
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.logger = get_logger("cache.parse")
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+        self.logger.info(
+            f"Initialized parse cache at {root} "
+            f"({len(self._entries)} entries, {self._total_bytes} bytes)"
+        )
+
+    @staticmethod
+    def make_key(content_hash: str, **options: Any) -> str:
+        """Build a cache key from a document hash and the parse options"""
+        payload = json.dumps({"sha256": content_hash, "options": options}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load_index(self) -> None:
+        """Rebuild the in-memory LRU index from the entries on disk"""
+        entries = []
+        for entry_dir in self.entries_dir.iterdir():
+            if not entry_dir.is_dir():
+                continue
+            if entry_dir.name.startswith(".") or not (entry_dir / self.META_FILE).is_file():
+                # Leftover from an interrupted put
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            entries.append((entry_dir.stat().st_mtime, entry_dir.name, _dir_size(entry_dir)))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    async def get(self, key: str, destination_dir: str) -> Optional[str]:
+        """
+        Restore a cached output directory into destination_dir
+
+        Returns:
+            Optional[str]: Path of the restored markdown file, or None on a miss
+        """
+        return await asyncio.to_thread(self._get, key, destination_dir)
+
+    async def put(self, key: str, output_dir: str, markdown_path: str) -> None:
+        """Store a parser output directory under the given key"""
+        await asyncio.to_thread(self._put, key, output_dir, markdown_path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and size information"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _get(self, key: str, destination_dir: str) -> Optional[str]:
+        entry_dir = self.entries_dir / key
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(entry_dir / self.META_FILE) as f:
+                    meta = json.load(f)
+                shutil.copytree(
+                    entry_dir,
+                    destination_dir,
+                    copy_function=_link_or_copy,
+                    ignore=shutil.ignore_patterns(self.META_FILE),
+                    dirs_exist_ok=True,
+                )
+            except OSError as e:
+                self.logger.warning(f"Dropping unreadable parse cache entry {key}: {str(e)}")
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            now = time.time()
+            os.utime(entry_dir, (now, now))
+            self.hits += 1
+        self.logger.debug(f"Parse cache hit for {key}")
+        return os.path.join(destination_dir, meta["markdown_file"])
+
+    def _put(self, key: str, output_dir: str, markdown_path: str) -> None:
+        entry_dir = self.entries_dir / key
+        staging_dir = self.entries_dir / f".{key}.{uuid.uuid4().hex}"
+        shutil.copytree(output_dir, staging_dir, copy_function=_link_or_copy)
+        with open(staging_dir / self.META_FILE, "w") as f:
+            json.dump({"markdown_file": os.path.relpath(markdown_path, output_dir)}, f)
+        size = _dir_size(staging_dir)
+
+        if self.max_bytes and size > self.max_bytes:
+            self.logger.debug(f"Not caching parse output {key}: {size} bytes exceeds the cache budget")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return
+
+        with self._lock:
+            self._remove(key)
+            os.replace(staging_dir, entry_dir)
+            self._entries[key] = size
+            self._total_bytes += size
+            while self.max_bytes and self._total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+                self.logger.debug(f"Evicted parse cache entry {oldest}")
+        self.logger.debug(f"Cached parse output {key} ({size} bytes)")
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry; the caller must hold the lock"""
+        self._total_bytes -= self._entries.pop(key, 0)
+        shutil.rmtree(self.entries_dir / key, ignore_errors=True)
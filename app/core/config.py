@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 from functools import lru_cache
@@ -25,7 +25,15 @@ class Settings(BaseSettings):
     # Storage settings
     STORAGE_TYPE: str = "memory"
     FILE_STORAGE_PATH: str = "./data"
+    SQLITE_STORAGE_PATH: str = "./data/tasks.db"
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50  # Connections shared by storage, caches and the job queue
+    REDIS_POOL_TIMEOUT: float = 20.0  # Seconds to wait for a free connection
+    REDIS_TASK_TTL: int = 7 * 24 * 3600  # Seconds finished tasks are kept in Redis, 0 keeps them
+    # Retention of finished tasks in memory storage, 0 disables each limit
+    MEMORY_STORAGE_MAX_TASKS: int = 100000
+    MEMORY_STORAGE_MAX_BYTES: int = 512 * 1024 * 1024  # 512 MiB of finished task state
+    MEMORY_STORAGE_TTL: int = 24 * 3600  # 1 day in seconds
     
     # Logging settings
     LOG_LEVEL: str = "INFO"
@@ -38,7 +46,75 @@ class Settings(BaseSettings):
     AUTH_ENABLED: bool = False
     
     # Task settings
-    TASK_TIMEOUT: int = 3600  # 1 hour in seconds
+    TASK_TIMEOUT: int = 3600  # 1 hour in seconds, 0 disables the deadline
+    TASK_BASE_DIR: str = "/tmp/ai_chunking"
+    TASK_RECOVERY_ENABLED: bool = True  # Resume interrupted tasks
+    TASK_HEARTBEAT_INTERVAL: float = 30.0  # Seconds between lease renewals of queued and running tasks
+    TASK_LEASE_TIMEOUT: float = 120.0  # Seconds without a renewal before another process resumes a task
+    LONG_POLL_MAX_WAIT: float = 60.0  # Longest ?wait= accepted by /results/{task_id}
+    SSE_KEEPALIVE_INTERVAL: float = 15.0  # Seconds between keepalive comments on event streams
+    MAX_CONCURRENT_TASKS: int = 4
+    TASK_QUEUE_MAX_SIZE: int = 100  # 0 disables the limit
+    # Per-strategy worker limits, e.g. "semantic=2,section_semantic=1"
+    STRATEGY_CONCURRENCY_LIMITS: str = ""
+    # Seconds of estimated cost a queued task gains per second of waiting
+    SCHEDULER_AGING_RATE: float = 1.0
+    TENANT_MAX_CONCURRENT_TASKS: int = 0  # Running tasks per API key, 0 disables
+    TENANT_QUEUE_MAX_SIZE: int = 0  # Queued tasks per API key, 0 disables
+    BLOB_STORE_DIR: str = "/tmp/ai_chunking/blobs"
+    # Seconds between cleanups of evicted and expired tasks, 0 disables them
+    TASK_CLEANUP_INTERVAL: float = 600.0
+    TASK_CLEANUP_MIN_AGE: float = 3600.0  # Tasks created more recently are never cleaned up
+    
+    # Execution mode: "local" runs tasks in the API process, "distributed" queues
+    # them on a Redis stream for worker processes (python -m app.tasks.worker).
+    # Distributed mode needs TASK_BASE_DIR and BLOB_STORE_DIR on storage shared
+    # by all nodes and a storage backend every node can reach.
+    EXECUTION_MODE: str = "local"
+    JOB_STREAM: str = "chunking:jobs"
+    JOB_CONSUMER_GROUP: str = "chunking-workers"
+    JOB_DEAD_LETTER_STREAM: str = "chunking:jobs:dead"
+    JOB_VISIBILITY_TIMEOUT: float = 300.0  # Seconds without a heartbeat before a job is reclaimed
+    JOB_HEARTBEAT_INTERVAL: float = 30.0
+    JOB_MAX_DELIVERIES: int = 3  # Deliveries before a job is dead-lettered
+    WORKER_CONCURRENCY: int = 4  # Jobs run at once by one worker process
+    
+    # Chunking process pool settings
+    CHUNK_POOL_WORKERS: int = 0  # 0 uses one worker per CPU core
+    CHUNK_POOL_START_METHOD: str = "spawn"
+    
+    # Parser settings
+    PARSE_CONCURRENCY: int = 4  # Max marker_single processes running at once
+    PARSER_OUTPUT_TAIL_LINES: int = 200  # Recent parser output lines kept for error reports
+    # "subprocess" spawns marker_single per file, "worker" uses warm parser workers
+    PARSER_MODE: str = "subprocess"
+    PARSER_WORKERS: int = 2
+    PARSER_WORKER_CONVERTER: str = "marker"  # "marker" or "stub" for offline testing
+    PARSER_WORKER_MAX_RSS_MB: int = 8192  # Recycle a worker above this RSS, 0 disables
+    PARSER_WORKER_STARTUP_TIMEOUT: float = 600.0
+    
+    # Large PDFs are parsed as parallel page-range shards
+    PDF_SHARD_PAGES: int = 50  # Pages per shard, 0 disables sharding
+    PDF_SHARD_MIN_PAGES: int = 100  # Only shard documents with at least this many pages
+    
+    # Parse cache settings
+    PARSE_CACHE_ENABLED: bool = True
+    PARSE_CACHE_DIR: str = "/tmp/ai_chunking/cache/parse"
+    PARSE_CACHE_MAX_BYTES: int = 5 * 1024 * 1024 * 1024  # 5 GiB, 0 disables the budget
+    
+    # Chunks output settings
+    CHUNKS_OUTPUT_COMPRESSION: str = ""  # "" writes chunks.jsonl, "gzip" writes chunks.jsonl.gz
+    
+    # Chunk result cache settings
+    CHUNK_CACHE_ENABLED: bool = True
+    CHUNK_CACHE_DIR: str = "/tmp/ai_chunking/cache/chunks"
+    CHUNK_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # 2 GiB, 0 disables the budget
+    CHUNK_CACHE_TTL: int = 7 * 24 * 3600  # 7 days in seconds, 0 disables expiry
+    
+    # Upload settings
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1 MiB read/write piece size
+    MAX_UPLOAD_FILE_SIZE: int = 512 * 1024 * 1024  # 512 MiB per file, 0 disables
+    MAX_UPLOAD_REQUEST_SIZE: int = 2 * 1024 * 1024 * 1024  # 2 GiB per request, 0 disables
     
     # Override settings from environment variables
     model_config = {
@@ -53,6 +129,16 @@ class Settings(BaseSettings):
         """Get list of allowed CORS origins"""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",") if origin.strip()]
 
+    @property
+    def strategy_concurrency_limits(self) -> Dict[str, int]:
+        """Get per-strategy worker limits"""
+        limits = {}
+        for item in self.STRATEGY_CONCURRENCY_LIMITS.split(","):
+            if "=" in item:
+                strategy, limit = item.split("=", 1)
+                limits[strategy.strip()] = int(limit)
+        return limits
+
 # Create logs directory
 os.makedirs(os.environ.get("LOG_DIR", "./logs"), exist_ok=True)
 
@@ -0,0 +1,177 @@
+"""
+Helpers for persisting uploaded files to disk.
+
+Uploads are copied in fixed-size pieces so that peak memory stays constant
+regardless of file size. The size and SHA-256 digest are computed during the
+same pass.
+
+Starlette spools a multipart body to temporary files before the endpoint
+runs, so the request size limit is enforced on the raw body by
+RequestSizeLimitMiddleware, from Content-Length and as the body arrives.
+The per-file limit can only be checked once a file has been spooled, while
+it is copied.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+from fastapi import UploadFile
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("uploads")
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the per-file or per-request byte limit"""
+
+    def __init__(self, filename: str, limit: int, scope: str = "file"):
+        self.filename = filename
+        self.limit = limit
+        self.scope = scope
+        super().__init__(f"Upload {filename} exceeds the {scope} size limit of {limit} bytes")
+
+
+@dataclass
+class SavedUpload:
+    """Metadata about an upload written to disk"""
+    filename: str
+    path: str
+    size: int
+    sha256: str
+
+
+class RequestUploadBudget:
+    """Tracks the bytes received across all files of a single request"""
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = settings.MAX_UPLOAD_REQUEST_SIZE if limit is None else limit
+        self.received = 0
+
+    def consume(self, filename: str, nbytes: int) -> None:
+        """Account for newly received bytes, raising if the request limit is exceeded"""
+        self.received += nbytes
+        if self.limit and self.received > self.limit:
+            raise UploadTooLargeError(filename, self.limit, scope="request")
+
+
+class RequestSizeLimitMiddleware:
+    """
+    ASGI middleware answering 413 to requests whose body exceeds a byte limit
+
+    Requests declaring a larger Content-Length are rejected before their body
+    is read. Otherwise the body is counted as it arrives; once it exceeds the
+    limit the 413 is sent and the application sees a client disconnect, so
+    it stops spooling the upload.
+    """
+
+    def __init__(self, app: ASGIApp, limit: Optional[int] = None):
+        self.app = app
+        self.limit = settings.MAX_UPLOAD_REQUEST_SIZE if limit is None else limit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.limit:
+            await self.app(scope, receive, send)
+            return
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.limit:
+            await self._reject(send)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    rejected = True
+                    await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            # The application's own response is dropped once the 413 was sent
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    async def _reject(self, send: Send) -> None:
+        logger.warning(f"Rejected a request body over the {self.limit} byte limit")
+        body = json.dumps({"detail": f"Request exceeds the size limit of {self.limit} bytes"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def _write_piece(handle: BinaryIO, hasher: "hashlib._Hash", piece: bytes) -> None:
+    """Write a piece to disk and feed it to the hasher (runs in a worker thread)"""
+    handle.write(piece)
+    hasher.update(piece)
+
+
+async def save_upload_file(
+    upload: UploadFile,
+    destination: str,
+    budget: Optional[RequestUploadBudget] = None,
+    max_file_size: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> SavedUpload:
+    """
+    Stream an uploaded file to disk in fixed-size pieces
+
+    Args:
+        upload: The uploaded file
+        destination: Path the file is written to
+        budget: Optional per-request byte budget shared by all files of a request
+        max_file_size: Per-file byte limit (defaults to settings.MAX_UPLOAD_FILE_SIZE)
+        chunk_size: Size of each piece (defaults to settings.UPLOAD_CHUNK_SIZE)
+
+    Returns:
+        SavedUpload: Size and SHA-256 digest of the written file
+
+    Raises:
+        UploadTooLargeError: If a byte limit is exceeded. The partial file is removed.
+    """
+    max_file_size = settings.MAX_UPLOAD_FILE_SIZE if max_file_size is None else max_file_size
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    filename = upload.filename or os.path.basename(destination)
+
+    hasher = hashlib.sha256()
+    size = 0
+    handle = await asyncio.to_thread(open, destination, "wb")
+    try:
+        while True:
+            piece = await upload.read(chunk_size)
+            if not piece:
+                break
+            size += len(piece)
+            if max_file_size and size > max_file_size:
+                raise UploadTooLargeError(filename, max_file_size)
+            if budget is not None:
+                budget.consume(filename, len(piece))
+            await asyncio.to_thread(_write_piece, handle, hasher, piece)
+    except BaseException:
+        await asyncio.to_thread(handle.close)
+        try:
+            os.remove(destination)
+        except OSError:
+            pass
+        raise
+    await asyncio.to_thread(handle.close)
+
+    logger.debug(f"Saved upload {filename} to {destination} ({size} bytes)")
+    return SavedUpload(filename=filename, path=destination, size=size, sha256=hasher.hexdigest())
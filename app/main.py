@@ -1,14 +1,24 @@
 """
 FastAPI application main module.
 """
+import asyncio
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.models import TaskStatus, TaskResponse, TaskResult
-from app.storage import get_storage
+from app.storage import get_blob_store, get_storage
 from app.storage.base import StorageInterface
+from app.storage.blob_store import release_removed_tasks
 from app.core.config import Settings, get_settings
 from app.api.endpoints import router
+from app.tasks import get_task_executor
+from app.tasks.recovery import recover_tasks
+from app.tasks.runners import get_chunk_pool, get_parser_worker_pool
+from app.core.logging import get_logger
+from app.core.uploads import RequestSizeLimitMiddleware
+
+logger = get_logger("main")
 
 # Create FastAPI application
 app = FastAPI(
@@ -20,6 +30,9 @@ app = FastAPI(
 # Get settings instance
 settings = get_settings()
 
+# Reject oversized uploads before they are spooled to disk
+app.add_middleware(RequestSizeLimitMiddleware)
+
 # Add CORS middleware with simple configuration
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +45,61 @@ app.add_middleware(
 # Include the API router
 app.include_router(router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def start_chunk_pool():
+    """Pre-start the chunking and parser worker processes so the first task runs warm"""
+    if settings.EXECUTION_MODE == "distributed":
+        # Tasks run in the worker processes, not in the API
+        return
+    get_chunk_pool().start()
+    if settings.PARSER_MODE == "worker":
+        await get_parser_worker_pool().start()
+
+async def _recover_interrupted_tasks():
+    storage = get_storage(settings.STORAGE_TYPE)
+    while True:
+        try:
+            await recover_tasks(storage, get_task_executor(), settings.TASK_LEASE_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Error resuming interrupted tasks: {str(e)}")
+        await asyncio.sleep(settings.TASK_HEARTBEAT_INTERVAL)
+
+@app.on_event("startup")
+async def resume_interrupted_tasks():
+    """Periodically requeue the tasks whose holder stopped renewing their lease"""
+    if settings.EXECUTION_MODE == "distributed" or not settings.TASK_RECOVERY_ENABLED:
+        # Distributed workers pick up abandoned jobs from the job stream
+        return
+    app.state.task_recovery = asyncio.create_task(_recover_interrupted_tasks())
+
+async def _clean_up_removed_tasks():
+    storage = get_storage(settings.STORAGE_TYPE)
+    while True:
+        await asyncio.sleep(settings.TASK_CLEANUP_INTERVAL)
+        try:
+            await release_removed_tasks(
+                storage, get_blob_store(), settings.TASK_BASE_DIR, settings.TASK_CLEANUP_MIN_AGE
+            )
+        except Exception as e:
+            logger.error(f"Error cleaning up removed tasks: {str(e)}")
+
+@app.on_event("startup")
+async def start_task_cleanup():
+    """Periodically delete the directories and uploads of evicted and expired tasks"""
+    if settings.TASK_CLEANUP_INTERVAL > 0:
+        app.state.task_cleanup = asyncio.create_task(_clean_up_removed_tasks())
+
+@app.on_event("shutdown")
+async def shutdown_task_executor():
+    """Stop the background loops, the task executor workers and the chunking and parser worker processes"""
+    for name in ("task_recovery", "task_cleanup"):
+        loop_task = getattr(app.state, name, None)
+        if loop_task is not None:
+            loop_task.cancel()
+    await get_task_executor().shutdown()
+    get_chunk_pool().shutdown()
+    await get_parser_worker_pool().shutdown()
+
 @app.get("/", tags=["Health"])
 async def health_check(settings: Settings = Depends(get_settings)):
     """
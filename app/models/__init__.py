@@ -10,6 +10,20 @@ class TaskStatus(str, Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+    TIMED_OUT = "timed_out"
+
+    @property
+    def is_final(self) -> bool:
+        """Whether the task has stopped and will not change status again"""
+        return self in (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED, TaskStatus.TIMED_OUT)
+
+
+class FileStage(str, Enum):
+    """Last completed processing stage of one input file of a task"""
+    UPLOADED = "uploaded"
+    PARSED = "parsed"
+    CHUNKED = "chunked"
 
 
 class TaskResponse(BaseModel):
@@ -17,6 +31,7 @@ class TaskResponse(BaseModel):
     task_type: str
     status: TaskStatus
     created_at: datetime 
+    queue_position: Optional[int] = None
 
 
 class TaskResult(BaseModel):
@@ -29,6 +44,13 @@ class TaskResult(BaseModel):
     completed_at: Optional[datetime] = None
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+    # Per-file checkpoints, keyed by input file path, used to resume interrupted tasks
+    checkpoints: Optional[Dict[str, Dict[str, Any]]] = None
+    queue_position: Optional[int] = None
+    # Process holding a queued or running task, and when it last renewed its lease
+    owner: Optional[str] = None
+    heartbeat_at: Optional[datetime] = None
 
     @classmethod
     def create_new(cls, task_type: str, task_id: str = None):
@@ -40,4 +62,64 @@ class TaskResult(BaseModel):
             task_type=task_type,
             status=TaskStatus.PENDING,
             created_at=datetime.now()
-        ) 
\ No newline at end of file
+        )
+
+
+class TaskStatusRecord(BaseModel):
+    """
+    Lightweight state of a task for status polling
+
+    Leaves out the result, checkpoints and per-file progress of the task,
+    so its size does not grow with the number of files.
+    """
+    task_id: str
+    task_type: str
+    status: TaskStatus
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    error: Optional[str] = None
+    progress: Dict[str, int] = Field(default_factory=dict)
+    queue_position: Optional[int] = None
+
+    @classmethod
+    def from_task(cls, task: TaskResult) -> "TaskStatusRecord":
+        return cls(
+            task_id=task.task_id,
+            task_type=task.task_type,
+            status=task.status,
+            created_at=task.created_at,
+            started_at=task.started_at,
+            completed_at=task.completed_at,
+            error=task.error,
+            progress=progress_counters(task),
+            queue_position=task.queue_position,
+        )
+
+
+def progress_counters(task: TaskResult) -> Dict[str, int]:
+    """Summarize the per-file checkpoints and progress of a task as a few counters"""
+    stages = [checkpoint.get("stage") for checkpoint in (task.checkpoints or {}).values()]
+    counters = {}
+    if stages:
+        counters["files"] = len(stages)
+        counters["files_parsed"] = sum(stage in (FileStage.PARSED.value, FileStage.CHUNKED.value) for stage in stages)
+        counters["files_chunked"] = sum(stage == FileStage.CHUNKED.value for stage in stages)
+    progress = task.progress or {}
+    output = progress.get("output") or {}
+    for name in ("documents_written", "chunks_written"):
+        if isinstance(output.get(name), int):
+            counters[name] = output[name]
+    percents = [
+        value["percent"] for key, value in progress.items()
+        if key != "output" and isinstance(value, dict) and isinstance(value.get("percent"), int)
+    ]
+    if percents:
+        counters["parse_percent"] = sum(percents) // len(percents)
+    return counters
+
+
+class TaskPage(BaseModel):
+    """One page of a task listing"""
+    tasks: List[TaskResult]
+    next_cursor: Optional[str] = None
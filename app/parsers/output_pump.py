@@ -0,0 +1,148 @@
+import asyncio
+import codecs
+import logging
+import re
+import subprocess
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Callable, Deque, Dict, IO, Optional
+
+from app.core.logging import get_logger
+
+logger = get_logger("parsers.output_pump")
+
+# tqdm-style progress line as printed by marker, e.g.
+# "Recognizing layout: 45%|████▌     | 9/20 [00:03<00:04,  2.61it/s]"
+PROGRESS_PATTERN = re.compile(
+    r"^\s*(?P<stage>[^:|\r\n]{1,200}):\s*(?P<percent>\d{1,3})%\|[^|]{0,400}\|\s*(?P<current>\d+)/(?P<total>\d+)"
+)
+# Longest line prefix matched against PROGRESS_PATTERN; progress lines are far shorter
+MAX_PROGRESS_LINE = 1024
+
+READ_SIZE = 64 * 1024
+
+
+@dataclass
+class ParseProgress:
+    """Progress of one marker processing stage"""
+    stage: str
+    current: int
+    total: int
+    percent: int
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+def parse_progress_line(line: str) -> Optional[ParseProgress]:
+    """Extract structured progress from a marker output line, if it is a progress line"""
+    if "%|" not in line:
+        return None
+    match = PROGRESS_PATTERN.match(line[:MAX_PROGRESS_LINE])
+    if match is None:
+        return None
+    return ParseProgress(
+        stage=match.group("stage").strip(),
+        current=int(match.group("current")),
+        total=int(match.group("total")),
+        percent=int(match.group("percent")),
+    )
+
+
+class OutputPump:
+    """
+    Drains the stdout and stderr of a parser subprocess concurrently
+
+    Only the most recent ``max_lines`` lines are kept in a ring buffer for
+    error reports. Progress lines are turned into ParseProgress updates and
+    handed to ``on_progress`` when the stage or count changes. Output is read
+    in blocks rather than lines, and carriage returns count as line breaks, so
+    redrawn progress bars never build up one unbounded line.
+    """
+
+    def __init__(
+        self,
+        max_lines: int = 200,
+        on_progress: Optional[Callable[[ParseProgress], None]] = None,
+    ):
+        self.lines: Deque[str] = deque(maxlen=max_lines)
+        self.on_progress = on_progress
+        self.progress: Optional[ParseProgress] = None
+        self._lock = threading.Lock()
+
+    def tail(self, count: Optional[int] = None) -> str:
+        """Get the last lines of output as a single string"""
+        with self._lock:
+            lines = list(self.lines)
+        if count is not None:
+            lines = lines[-count:]
+        return "\n".join(lines)
+
+    def _feed(self, name: str, buffer: str, data: str) -> str:
+        """Split newly read text into lines, returning the unterminated remainder"""
+        buffer += data
+        *complete, buffer = re.split(r"[\r\n]", buffer)
+        for line in complete:
+            self._handle_line(name, line)
+        # Keep a partial line from growing without bound
+        if len(buffer) > READ_SIZE:
+            self._handle_line(name, buffer)
+            buffer = ""
+        return buffer
+
+    def _handle_line(self, name: str, line: str) -> None:
+        line = line.strip()
+        if not line:
+            return
+        with self._lock:
+            self.lines.append(f"[{name}] {line}")
+        progress = parse_progress_line(line)
+        if progress is not None and progress != self.progress:
+            self.progress = progress
+            if self.on_progress is not None:
+                try:
+                    self.on_progress(progress)
+                except Exception as e:
+                    logger.warning(f"Progress callback failed: {str(e)}")
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[{name}] {line}")
+
+    async def drain(self, stream: asyncio.StreamReader, name: str) -> None:
+        """Read an asyncio stream to the end"""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        buffer = ""
+        while True:
+            data = await stream.read(READ_SIZE)
+            if not data:
+                break
+            buffer = self._feed(name, buffer, decoder.decode(data))
+        self._handle_line(name, buffer + decoder.decode(b"", final=True))
+
+    async def pump(self, process: asyncio.subprocess.Process) -> None:
+        """Drain both output streams of an asyncio subprocess concurrently"""
+        await asyncio.gather(
+            self.drain(process.stdout, "stdout"),
+            self.drain(process.stderr, "stderr"),
+        )
+
+    def _drain_sync(self, stream: IO[bytes], name: str) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        buffer = ""
+        while True:
+            data = stream.read1(READ_SIZE) if hasattr(stream, "read1") else stream.read(READ_SIZE)
+            if not data:
+                break
+            buffer = self._feed(name, buffer, decoder.decode(data))
+        self._handle_line(name, buffer + decoder.decode(b"", final=True))
+
+    def pump_sync(self, process: subprocess.Popen) -> None:
+        """Drain both output streams of a blocking subprocess using a reader thread per stream"""
+        threads = [
+            threading.Thread(target=self._drain_sync, args=(process.stdout, "stdout"), daemon=True),
+            threading.Thread(target=self._drain_sync, args=(process.stderr, "stderr"), daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
@@ -1,33 +1,49 @@
 import os
 import json
+import asyncio
 import logging
 import subprocess
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Callable, Optional, List, Tuple
 
+from app.core.config import settings
 from app.core.logging import get_logger
+from app.parsers.output_pump import OutputPump, ParseProgress
+from app.parsers.worker_pool import ParserWorkerPool
 
 logger = get_logger(__name__)
 
+# Number of trailing output lines included in parser error messages
+PARSER_ERROR_TAIL_LINES = 20
+
 class PDFParser:
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, output_dir: Optional[str] = None):
         self.pdf_path = pdf_path
         if not os.path.exists(self.pdf_path):
             raise FileNotFoundError(f"PDF file not found: {self.pdf_path}")
-        self.output_dir = os.path.dirname(self.pdf_path)
+        self.output_dir = output_dir or os.path.dirname(self.pdf_path)
         self.output_path = pdf_path.replace(".pdf", ".md")
     
-    def parse(
-            self, 
+    @property
+    def markdown_output_dir(self) -> str:
+        """Directory marker writes the markdown and extracted images to"""
+        return os.path.join(self.output_dir, os.path.basename(self.pdf_path).rsplit(".", 1)[0])
+    
+    @property
+    def markdown_path(self) -> str:
+        """Path of the markdown file produced by parse()"""
+        return os.path.join(self.markdown_output_dir, os.path.basename(self.pdf_path).replace(".pdf", ".md"))
+    
+    def _build_command(
+            self,
             model_name: str = "gemini-2.0-flash",
             disable_image_extraction: bool = False,
             debug: bool = True,
             page_range: Optional[str] = None,
             force_ocr: bool = False,
             strip_existing_ocr: bool = False
-        ) -> str:
-        logger.info(f"Parsing PDF: {self.pdf_path}")
-        
+        ) -> List[str]:
+        """Build the marker_single command line for this PDF"""
         gemini_api_key = os.getenv("GEMINI_API_KEY")
         if not gemini_api_key:
             raise ValueError("gemini_api_key is required for parsing PDFs")
@@ -53,53 +69,91 @@ class PDFParser:
             command.append("--force_ocr")
         if strip_existing_ocr:
             command.append("--strip_existing_ocr")
+        return command
+    
+    def parse(self, **kwargs) -> str:
+        logger.info(f"Parsing PDF: {self.pdf_path}")
+        command = self._build_command(**kwargs)
 
+        pump = OutputPump(max_lines=settings.PARSER_OUTPUT_TAIL_LINES)
         try:    
-            # Run the command with live output streaming
-            logger.info(f"Running command: {' '.join(command)}")
+            # Run the command, draining both output streams concurrently
+            logger.info(f"Running marker_single for {self.pdf_path}")
             process = subprocess.Popen(
                 command,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
+                stderr=subprocess.PIPE
             )
-
-            # Stream output in real-time
-            while True:
-                # Read stdout
-                stdout_line = process.stdout.readline()
-                if stdout_line:
-                    logger.info(stdout_line.strip())
-
-                # Read stderr
-                stderr_line = process.stderr.readline()
-                if stderr_line:
-                    logger.error(stderr_line.strip())
-
-                # Check if process has finished
-                if process.poll() is not None:
-                    # Read any remaining output
-                    for line in process.stdout.readlines():
-                        if line:
-                            logger.info(line.strip())
-                    for line in process.stderr.readlines():
-                        if line:
-                            logger.error(line.strip())
-                    break
+            pump.pump_sync(process)
+            process.wait()
 
             # Check return code
             if process.returncode != 0:
-                raise subprocess.CalledProcessError(process.returncode, command)
+                raise RuntimeError(
+                    f"marker_single exited with code {process.returncode}:\n{pump.tail(PARSER_ERROR_TAIL_LINES)}"
+                )
             
             # Check if output file exists
-            if not os.path.exists(self.output_path):
-                raise RuntimeError(f"Output file not created: {self.output_path}")
+            if not os.path.exists(self.markdown_path):
+                raise RuntimeError(f"Output file not created: {self.markdown_path}")
 
         except Exception as e:
             logger.error(f"Error parsing PDF: {str(e)}")
         
         # Return Markdown file path
-        markdown_file_path = os.path.join(self.output_dir, os.path.basename(self.pdf_path).rsplit(".", 1)[0], os.path.basename(self.pdf_path).replace(".pdf", ".md"))
-        return markdown_file_path
+        return self.markdown_path
+
+    async def aparse(
+            self,
+            on_progress: Optional[Callable[[ParseProgress], None]] = None,
+            worker_pool: Optional["ParserWorkerPool"] = None,
+            **kwargs
+        ) -> str:
+        """
+        Parse the PDF without blocking the event loop
+
+        Takes the same options as parse(). Both output streams of marker are
+        drained concurrently, so neither pipe can fill up and stall the process.
+
+        Args:
+            on_progress: Called with structured progress parsed from marker's output
+            worker_pool: Convert on a warm parser worker instead of spawning marker_single
+
+        Returns:
+            str: Path to the markdown file
+
+        Raises:
+            RuntimeError: If marker fails or does not produce the markdown file
+        """
+        logger.info(f"Parsing PDF: {self.pdf_path}")
+        if worker_pool is not None:
+            markdown_path = await worker_pool.convert(self.pdf_path, self.output_dir, kwargs, on_progress)
+            if not os.path.exists(markdown_path):
+                raise RuntimeError(f"Output file not created: {markdown_path}")
+            return markdown_path
+
+        command = self._build_command(**kwargs)
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        pump = OutputPump(max_lines=settings.PARSER_OUTPUT_TAIL_LINES, on_progress=on_progress)
+        try:
+            await pump.pump(process)
+            returncode = await process.wait()
+        finally:
+            # Never leave marker running when parsing is cancelled
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+        if returncode != 0:
+            raise RuntimeError(
+                f"marker_single exited with code {returncode} for {self.pdf_path}:\n"
+                f"{pump.tail(PARSER_ERROR_TAIL_LINES)}"
+            )
+        if not os.path.exists(self.markdown_path):
+            raise RuntimeError(f"Output file not created: {self.markdown_path}")
+        return self.markdown_path
+
@@ -0,0 +1,184 @@
+import json
+import os
+import re
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.logging import get_logger
+
+logger = get_logger("parsers.sharding")
+
+PAGE_OBJECT_PATTERN = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+# The raw file is scanned in pieces, each overlapping the previous one
+PAGE_SCAN_READ_SIZE = 1024 * 1024
+PAGE_SCAN_OVERLAP = 64
+
+
+def count_pdf_pages(pdf_path: str) -> Optional[int]:
+    """
+    Get the number of pages of a PDF
+
+    Uses pypdfium2 (installed with marker) and falls back to counting page
+    objects in the raw file, read in pieces so large PDFs are never loaded
+    whole. Returns None when the count cannot be determined.
+    """
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        pdfium = None
+
+    if pdfium is not None:
+        try:
+            document = pdfium.PdfDocument(pdf_path)
+            try:
+                return len(document)
+            finally:
+                document.close()
+        except Exception as e:
+            logger.warning(f"Could not read page count of {pdf_path}: {str(e)}")
+            return None
+
+    count = 0
+    tail = b""
+    with open(pdf_path, "rb") as f:
+        while True:
+            piece = f.read(PAGE_SCAN_READ_SIZE)
+            buffer = tail + piece
+            # Matches starting in the kept tail are counted with the next piece
+            cut = len(buffer) if not piece else max(len(buffer) - PAGE_SCAN_OVERLAP, 0)
+            count += sum(1 for match in PAGE_OBJECT_PATTERN.finditer(buffer) if match.start() < cut)
+            if not piece:
+                break
+            tail = buffer[cut:]
+    return count or None
+
+
+def plan_shards(page_count: int, shard_pages: int) -> List[Tuple[int, int]]:
+    """Split a document into inclusive, 0-indexed page ranges of at most shard_pages pages"""
+    return [
+        (start, min(start + shard_pages, page_count) - 1)
+        for start in range(0, page_count, shard_pages)
+    ]
+
+
+def page_map_path(markdown_path: str) -> str:
+    """Path of the sidecar recording which pages each part of a merged markdown file came from"""
+    return os.path.splitext(markdown_path)[0] + ".pages.json"
+
+
+def merge_shard_outputs(markdown_path: str, shards: List[Tuple[Tuple[int, int], str]]) -> str:
+    """
+    Stitch per-shard markdown back together in page order
+
+    Writes the merged markdown to markdown_path and a page map sidecar with
+    the character span of every shard. Files extracted next to each shard's
+    markdown (images) are linked into the merged output directory.
+
+    Args:
+        markdown_path: Path of the merged markdown file
+        shards: ((first_page, last_page), shard_markdown_path) pairs
+
+    Returns:
+        str: Path of the merged markdown file
+    """
+    output_dir = os.path.dirname(markdown_path)
+    os.makedirs(output_dir, exist_ok=True)
+    page_map: List[Dict[str, Any]] = []
+    offset = 0
+
+    with open(markdown_path, "w", encoding="utf-8") as merged:
+        for index, ((first_page, last_page), shard_path) in enumerate(sorted(shards)):
+            with open(shard_path, "r", encoding="utf-8") as f:
+                text = f.read().strip()
+            if index:
+                merged.write("\n\n")
+                offset += 2
+            merged.write(text)
+            page_map.append({
+                "shard": index,
+                "page_start": first_page,
+                "page_end": last_page,
+                "char_start": offset,
+                "char_end": offset + len(text),
+            })
+            offset += len(text)
+            _link_shard_assets(os.path.dirname(shard_path), output_dir, shard_path)
+
+    with open(page_map_path(markdown_path), "w") as f:
+        json.dump(page_map, f)
+    logger.debug(f"Merged {len(shards)} shards into {markdown_path}")
+    return markdown_path
+
+
+def _link_shard_assets(shard_dir: str, output_dir: str, shard_markdown_path: str) -> None:
+    for name in os.listdir(shard_dir):
+        source = os.path.join(shard_dir, name)
+        target = os.path.join(output_dir, name)
+        if source == shard_markdown_path or not os.path.isfile(source) or name.endswith(".json"):
+            continue
+        if os.path.exists(target):
+            logger.warning(f"Skipping shard asset {name}: already present in {output_dir}")
+            continue
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+
+class PageLocator:
+    """
+    Maps chunk text back to the pages of a sharded document
+
+    Chunks are located in the merged markdown by searching for their text,
+    continuing from the previous match since chunkers emit chunks in order.
+    """
+
+    PROBE_LENGTH = 200
+
+    def __init__(self, markdown_path: str, page_map: List[Dict[str, Any]]):
+        with open(markdown_path, "r", encoding="utf-8") as f:
+            self.content = f.read()
+        self.page_map = page_map
+        self._cursor = 0
+
+    @classmethod
+    def for_document(cls, markdown_path: str) -> Optional["PageLocator"]:
+        """Get a locator for a merged document, or None if it was not sharded"""
+        sidecar = page_map_path(markdown_path)
+        if not os.path.isfile(sidecar):
+            return None
+        with open(sidecar) as f:
+            return cls(markdown_path, json.load(f))
+
+    def locate(self, text: str) -> Optional[Dict[str, Any]]:
+        """Get page provenance for a chunk, or None if its text cannot be found"""
+        text = text.strip()
+        probe = text[:self.PROBE_LENGTH]
+        if not probe:
+            return None
+        position = self.content.find(probe, self._cursor)
+        if position == -1:
+            position = self.content.find(probe)
+            if position == -1:
+                return None
+        self._cursor = position + 1
+        end = position + len(text)
+
+        spans = [
+            span for span in self.page_map
+            if span["char_start"] < end and span["char_end"] > position
+        ] or [span for span in self.page_map if span["char_start"] <= position][-1:]
+        if not spans:
+            return None
+        return {
+            "page_start": spans[0]["page_start"],
+            "page_end": spans[-1]["page_end"],
+            "shards": [span["shard"] for span in spans],
+        }
+
+    def annotate(self, records: List[Dict[str, Any]]) -> None:
+        """Add page provenance to the metadata of serialized chunks in place"""
+        for record in records:
+            provenance = self.locate(record.get("text", ""))
+            if provenance is not None:
+                record.setdefault("metadata", {}).update(provenance)
@@ -0,0 +1,140 @@
+"""
+Long-lived parser worker process.
+
+Run with ``python -m app.parsers.worker --converter marker``. The worker loads
+its converter once and then serves conversion requests over a line-delimited
+JSON protocol:
+
+- on startup it writes ``{"ready": true, "pid": ...}`` to stdout
+- each request read from stdin is
+  ``{"id": ..., "pdf_path": ..., "output_dir": ..., "options": {...}}``
+- each response is ``{"id": ..., "ok": true, "markdown_path": ..., "rss_bytes": ...}``
+  or ``{"id": ..., "ok": false, "error": ..., "rss_bytes": ...}``
+
+Anything the converter prints goes to stderr, which keeps stdout reserved
+for the protocol.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict
+
+
+def current_rss_bytes() -> int:
+    """Get the resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _document_output_dir(pdf_path: str, output_dir: str) -> str:
+    """Directory marker_single writes a document's output to"""
+    return os.path.join(output_dir, os.path.basename(pdf_path).rsplit(".", 1)[0])
+
+
+class StubConverter:
+    """
+    Converter that writes placeholder markdown without loading any models
+
+    Stands in for marker so the worker protocol and pool throughput can be
+    exercised offline. STUB_CONVERTER_DELAY adds a per-document delay in seconds.
+    """
+
+    def __init__(self):
+        self.delay = float(os.environ.get("STUB_CONVERTER_DELAY", "0"))
+
+    def convert(self, pdf_path: str, output_dir: str, options: Dict[str, Any]) -> str:
+        if self.delay:
+            time.sleep(self.delay)
+        base_name = os.path.basename(pdf_path).rsplit(".", 1)[0]
+        document_dir = _document_output_dir(pdf_path, output_dir)
+        os.makedirs(document_dir, exist_ok=True)
+        markdown_path = os.path.join(document_dir, f"{base_name}.md")
+        size = os.path.getsize(pdf_path)
+        with open(markdown_path, "w") as f:
+            f.write(f"# {base_name}\n\nStub conversion of {size} bytes.\n")
+        return markdown_path
+
+
+class MarkerConverter:
+    """Converter backed by marker's Python API, with models loaded once per process"""
+
+    def __init__(self):
+        from marker.models import create_model_dict
+
+        self.artifact_dict = create_model_dict()
+
+    def convert(self, pdf_path: str, output_dir: str, options: Dict[str, Any]) -> str:
+        from marker.config.parser import ConfigParser
+        from marker.converters.pdf import PdfConverter
+        from marker.output import save_output
+
+        config = {
+            "output_format": "markdown",
+            "use_llm": True,
+            "gemini_api_key": os.environ.get("GEMINI_API_KEY"),
+        }
+        config.update({key: value for key, value in options.items() if value not in (None, False)})
+        config_parser = ConfigParser(config)
+        converter = PdfConverter(
+            config=config_parser.generate_config_dict(),
+            artifact_dict=self.artifact_dict,
+            processor_list=config_parser.get_processors(),
+            renderer=config_parser.get_renderer(),
+            llm_service=config_parser.get_llm_service(),
+        )
+        rendered = converter(pdf_path)
+
+        base_name = os.path.basename(pdf_path).rsplit(".", 1)[0]
+        document_dir = _document_output_dir(pdf_path, output_dir)
+        os.makedirs(document_dir, exist_ok=True)
+        save_output(rendered, document_dir, base_name)
+        return os.path.join(document_dir, f"{base_name}.md")
+
+
+CONVERTERS = {
+    "marker": MarkerConverter,
+    "stub": StubConverter,
+}
+
+
+def serve(converter_name: str) -> None:
+    """Load the converter and serve requests until stdin is closed"""
+    # Reserve the real stdout for the protocol and send everything else to stderr
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def respond(message: Dict[str, Any]) -> None:
+        protocol_out.write(json.dumps(message) + "\n")
+        protocol_out.flush()
+
+    converter = CONVERTERS[converter_name]()
+    respond({"ready": True, "pid": os.getpid(), "converter": converter_name})
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        response: Dict[str, Any] = {"id": request.get("id")}
+        try:
+            response["markdown_path"] = converter.convert(
+                request["pdf_path"], request["output_dir"], request.get("options", {})
+            )
+            response["ok"] = True
+        except Exception as e:
+            response["ok"] = False
+            response["error"] = f"{type(e).__name__}: {str(e)}"
+        response["rss_bytes"] = current_rss_bytes()
+        respond(response)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-lived parser worker")
+    parser.add_argument("--converter", choices=sorted(CONVERTERS), default="marker")
+    serve(parser.parse_args().converter)
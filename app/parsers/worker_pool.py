@@ -0,0 +1,241 @@
+import asyncio
+import itertools
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.logging import get_logger
+from app.parsers.output_pump import OutputPump, ParseProgress
+
+logger = get_logger("parsers.worker_pool")
+
+# Directory containing the app package, so workers can import it from anywhere
+PROJECT_ROOT = str(Path(__file__).resolve().parents[2])
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised when a parser worker exits while serving a request"""
+
+
+class ParserWorker:
+    """Handle to one long-lived parser worker process"""
+
+    def __init__(self, converter: str, startup_timeout: float, output_tail_lines: int = 200):
+        self.converter = converter
+        self.startup_timeout = startup_timeout
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.pump = OutputPump(max_lines=output_tail_lines, on_progress=self._on_progress)
+        self.rss_bytes = 0
+        self.requests_served = 0
+        self._stderr_task: Optional[asyncio.Task] = None
+        self._progress_callback: Optional[Callable[[ParseProgress], None]] = None
+        self._request_ids = itertools.count(1)
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    def _on_progress(self, progress: ParseProgress) -> None:
+        if self._progress_callback is not None:
+            self._progress_callback(progress)
+
+    async def start(self) -> None:
+        """Spawn the worker and wait until its converter is loaded"""
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "app.parsers.worker", "--converter", self.converter,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=1024 * 1024,
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [PROJECT_ROOT, os.environ.get("PYTHONPATH")]))}
+        )
+        self._stderr_task = asyncio.get_running_loop().create_task(
+            self.pump.drain(self.process.stderr, "stderr")
+        )
+        try:
+            message = await asyncio.wait_for(self._read_message(), timeout=self.startup_timeout)
+        except (asyncio.TimeoutError, WorkerCrashedError):
+            await self.stop()
+            raise WorkerCrashedError(f"Parser worker failed to start:\n{self.pump.tail(20)}")
+        logger.info(f"Parser worker {message.get('pid')} ready ({self.converter})")
+
+    async def _read_message(self) -> Dict[str, Any]:
+        line = await self.process.stdout.readline()
+        if not line:
+            await self.process.wait()
+            raise WorkerCrashedError(
+                f"Parser worker {self.pid} exited with code {self.process.returncode}"
+            )
+        return json.loads(line)
+
+    async def convert(
+        self,
+        pdf_path: str,
+        output_dir: str,
+        options: Dict[str, Any],
+        on_progress: Optional[Callable[[ParseProgress], None]] = None,
+    ) -> str:
+        """
+        Send one document to the worker and wait for the result
+
+        Returns:
+            str: Path of the markdown file written by the worker
+
+        Raises:
+            WorkerCrashedError: If the worker died while converting
+            RuntimeError: If the conversion failed inside the worker
+        """
+        request_id = next(self._request_ids)
+        request = {"id": request_id, "pdf_path": pdf_path, "output_dir": output_dir, "options": options}
+        self._progress_callback = on_progress
+        try:
+            self.process.stdin.write((json.dumps(request) + "\n").encode("utf-8"))
+            await self.process.stdin.drain()
+            response = await self._read_message()
+        except (BrokenPipeError, ConnectionResetError):
+            await self.process.wait()
+            raise WorkerCrashedError(f"Parser worker {self.pid} exited with code {self.process.returncode}")
+        finally:
+            self._progress_callback = None
+
+        self.requests_served += 1
+        self.rss_bytes = response.get("rss_bytes", 0)
+        if response.get("id") != request_id:
+            raise WorkerCrashedError(f"Parser worker {self.pid} answered out of order")
+        if not response.get("ok"):
+            raise RuntimeError(f"Parser worker failed on {pdf_path}: {response.get('error')}")
+        return response["markdown_path"]
+
+    async def stop(self, kill: bool = False) -> None:
+        """Terminate the worker process, killing it right away if kill is set"""
+        if self.alive and kill:
+            self.process.kill()
+            await self.process.wait()
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        if self._stderr_task is not None:
+            self._stderr_task.cancel()
+
+
+class ParserWorkerPool:
+    """
+    Pool of warm parser worker processes
+
+    Each worker loads the converter models once and then serves documents
+    one at a time. Workers that crash, exceed ``max_rss_bytes`` or are
+    interrupted mid-request are replaced with fresh processes.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        converter: str = "marker",
+        max_rss_bytes: int = 0,
+        startup_timeout: float = 600.0,
+    ):
+        self.size = size
+        self.converter = converter
+        self.max_rss_bytes = max_rss_bytes
+        self.startup_timeout = startup_timeout
+        self.restarts = 0
+        self._workers: List[ParserWorker] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+
+    async def start(self) -> None:
+        """Spawn all workers"""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+            self._idle = asyncio.Queue()
+            workers = await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+            for worker in workers:
+                self._workers.append(worker)
+                self._idle.put_nowait(worker)
+            logger.info(f"Started parser worker pool with {self.size} workers ({self.converter})")
+
+    async def _spawn(self) -> ParserWorker:
+        worker = ParserWorker(self.converter, self.startup_timeout)
+        await worker.start()
+        return worker
+
+    async def _replace(self, worker: ParserWorker, reason: str) -> ParserWorker:
+        logger.warning(f"Restarting parser worker {worker.pid}: {reason}")
+        await worker.stop(kill=True)
+        if worker in self._workers:
+            self._workers.remove(worker)
+        self.restarts += 1
+        replacement = await self._spawn()
+        self._workers.append(replacement)
+        return replacement
+
+    async def convert(
+        self,
+        pdf_path: str,
+        output_dir: str,
+        options: Dict[str, Any],
+        on_progress: Optional[Callable[[ParseProgress], None]] = None,
+    ) -> str:
+        """Convert a document on the next idle worker"""
+        await self.start()
+        worker = await self._idle.get()
+        if not worker.alive:
+            try:
+                worker = await self._replace(worker, "found dead while idle")
+            except Exception:
+                self._idle.put_nowait(worker)
+                raise
+        healthy = False
+        try:
+            result = await worker.convert(pdf_path, output_dir, options, on_progress)
+            healthy = True
+            return result
+        except RuntimeError as e:
+            # The worker reported a conversion error and is still usable
+            healthy = worker.alive and not isinstance(e, WorkerCrashedError)
+            raise
+        finally:
+            reason = None
+            if not healthy:
+                reason = "crashed" if not worker.alive else "interrupted mid-request"
+            elif self.max_rss_bytes and worker.rss_bytes > self.max_rss_bytes:
+                reason = f"memory limit exceeded ({worker.rss_bytes} bytes)"
+            if reason is not None:
+                try:
+                    worker = await asyncio.shield(self._replace(worker, reason))
+                except Exception as e:
+                    # Leave the dead worker in the pool; it is replaced on next use
+                    logger.error(f"Failed to restart parser worker: {str(e)}")
+            self._idle.put_nowait(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get worker health information"""
+        return {
+            "size": self.size,
+            "converter": self.converter,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "restarts": self.restarts,
+            "workers": [
+                {"pid": w.pid, "alive": w.alive, "rss_bytes": w.rss_bytes, "requests_served": w.requests_served}
+                for w in self._workers
+            ],
+        }
+
+    async def shutdown(self) -> None:
+        """Stop all workers"""
+        await asyncio.gather(*(worker.stop() for worker in self._workers), return_exceptions=True)
+        self._workers = []
+        self._idle = None
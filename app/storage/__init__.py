@@ -2,17 +2,58 @@ from typing import Optional
 import os
 from functools import lru_cache
 
+import redis.asyncio as redis
+
 from app.storage.base import StorageInterface
 from app.storage.file_storage import FileStorage
 from app.storage.redis_storage import RedisStorage
 from app.storage.memory import InMemoryStorage
+from app.storage.sqlite_storage import SQLiteStorage
+from app.storage.blob_store import BlobStore
+from app.storage.events import LocalTaskEvents, NotifyingStorage, RedisTaskEvents, TaskEvents
+from app.core.config import settings
 
 # Global storage instances cache
 _storage_instances = {}
 
+@lru_cache()
+def get_redis_client() -> redis.Redis:
+    """
+    Get the Redis client shared by storage, the chunk cache and the job queue
+    
+    Its pool holds at most REDIS_MAX_CONNECTIONS connections; commands wait
+    up to REDIS_POOL_TIMEOUT seconds for one to be free.
+    """
+    pool = redis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+@lru_cache()
+def get_task_events() -> TaskEvents:
+    """
+    Get the task event channel
+    
+    Uses Redis pub/sub when tasks may be saved by another process, and
+    in-process queues otherwise. Subscriptions hold a connection each, so
+    they do not share the pool of get_redis_client.
+    """
+    if settings.STORAGE_TYPE.lower() == "redis" or settings.EXECUTION_MODE == "distributed":
+        return RedisTaskEvents(redis.from_url(settings.REDIS_URL))
+    return LocalTaskEvents()
+
+
 @lru_cache()
 def get_storage(storage_type: str = "memory") -> StorageInterface:
-    """Get the appropriate storage implementation with caching for in-memory storage"""
+    """Get the appropriate storage implementation, publishing task events on every save"""
+    return NotifyingStorage(_get_backend(storage_type), get_task_events())
+
+
+def _get_backend(storage_type: str) -> StorageInterface:
+    """Get the storage backend with caching for in-memory storage"""
     storage_type = storage_type.lower()
     
     # Check if we already have an instance for this storage type
@@ -21,15 +62,32 @@ def get_storage(storage_type: str = "memory") -> StorageInterface:
     
     # Create a new instance
     if storage_type == "memory":
-        _storage_instances[storage_type] = InMemoryStorage()
+        _storage_instances[storage_type] = InMemoryStorage(
+            max_tasks=settings.MEMORY_STORAGE_MAX_TASKS,
+            max_bytes=settings.MEMORY_STORAGE_MAX_BYTES,
+            ttl=settings.MEMORY_STORAGE_TTL
+        )
         return _storage_instances[storage_type]
     elif storage_type == "redis":
         redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
-        _storage_instances[storage_type] = RedisStorage(redis_url=redis_url)
+        _storage_instances[storage_type] = RedisStorage(
+            redis_url=redis_url,
+            redis_client=get_redis_client(),
+            task_ttl=settings.REDIS_TASK_TTL
+        )
         return _storage_instances[storage_type]
     elif storage_type == "file":
         storage_path = os.environ.get("FILE_STORAGE_PATH", "./data")
         _storage_instances[storage_type] = FileStorage(storage_path=storage_path)
         return _storage_instances[storage_type]
+    elif storage_type == "sqlite":
+        _storage_instances[storage_type] = SQLiteStorage(db_path=settings.SQLITE_STORAGE_PATH)
+        return _storage_instances[storage_type]
     else:
         raise ValueError(f"Unknown storage type: {storage_type}")
+
+
+@lru_cache()
+def get_blob_store() -> BlobStore:
+    """Get the shared content-addressed blob store for uploaded documents"""
+    return BlobStore(settings.BLOB_STORE_DIR)
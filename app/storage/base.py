@@ -1,22 +1,135 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
-from app.models import TaskResult
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from app.models import TaskResult, TaskStatus, TaskStatusRecord
+
+# (created_at timestamp, task_id): tasks are listed newest first in this order
+TaskKey = Tuple[float, str]
+
+
+@dataclass(frozen=True)
+class TaskFilter:
+    """Conditions a listed task must meet, each ignored when None"""
+    status: Optional[TaskStatus] = None
+    task_type: Optional[str] = None
+    created_from: Optional[datetime] = None  # Inclusive
+    created_to: Optional[datetime] = None  # Inclusive
+
+    def created_range(self) -> Tuple[float, float]:
+        """Bounds of created_at as timestamps, open ends as infinities"""
+        return (
+            self.created_from.timestamp() if self.created_from else float("-inf"),
+            self.created_to.timestamp() if self.created_to else float("inf"),
+        )
+
+    def matches(self, status: TaskStatus, task_type: str, created: float) -> bool:
+        low, high = self.created_range()
+        return (
+            (self.status is None or status == self.status)
+            and (self.task_type is None or task_type == self.task_type)
+            and low <= created <= high
+        )
+
+
+def task_key(task: TaskResult) -> TaskKey:
+    return task.created_at.timestamp(), task.task_id
+
+
+def encode_cursor(key: TaskKey) -> str:
+    """Opaque cursor resuming a listing after the task with this key"""
+    return f"{key[0]!r}_{key[1]}"
+
+
+def decode_cursor(cursor: str) -> TaskKey:
+    """
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor
+    """
+    created, separator, task_id = cursor.partition("_")
+    if not separator or not task_id:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return float(created), task_id
 
 
 class StorageInterface(ABC):
     """Abstract base class for task storage implementations"""
-    
+
     @abstractmethod
     async def save_task(self, task: TaskResult) -> None:
         """Save a task result"""
         pass
-    
+
     @abstractmethod
     async def get_task(self, task_id: str) -> Optional[TaskResult]:
         """Get a task result by ID"""
         pass
-    
+
+    async def get_task_status(self, task_id: str) -> Optional[TaskStatusRecord]:
+        """
+        Get the status record of a task by ID
+
+        Backends override this to read the record without loading the
+        task's result and checkpoints.
+        """
+        task = await self.get_task(task_id)
+        return TaskStatusRecord.from_task(task) if task else None
+
     @abstractmethod
     async def list_tasks(self) -> Dict[str, TaskResult]:
         """List all tasks"""
-        pass 
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def query_tasks(
+        self,
+        task_filter: TaskFilter = TaskFilter(),
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[TaskResult], Optional[str]]:
+        """
+        List one page of tasks matching a filter, newest first
+
+        Backends serve this from an index of each task's status, type and
+        creation time, so the cost depends on the page size rather than on
+        how many tasks are stored.
+
+        Returns:
+            Tuple[List[TaskResult], Optional[str]]: The tasks and the cursor
+            of the next page, or None on the last page
+
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        pass
+
+
+class StorageWrapper(StorageInterface):
+    """
+    Storage that passes every call through to another storage
+
+    Subclasses override only the calls they extend.
+    """
+
+    def __init__(self, storage: StorageInterface):
+        self.storage = storage
+
+    async def save_task(self, task: TaskResult) -> None:
+        await self.storage.save_task(task)
+
+    async def get_task(self, task_id: str) -> Optional[TaskResult]:
+        return await self.storage.get_task(task_id)
+
+    async def get_task_status(self, task_id: str) -> Optional[TaskStatusRecord]:
+        return await self.storage.get_task_status(task_id)
+
+    async def list_tasks(self) -> Dict[str, TaskResult]:
+        return await self.storage.list_tasks()
+
+    async def query_tasks(
+        self,
+        task_filter: TaskFilter = TaskFilter(),
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[TaskResult], Optional[str]]:
+        return await self.storage.query_tasks(task_filter, cursor, limit)
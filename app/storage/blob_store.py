@@ -0,0 +1,188 @@
+import asyncio
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Set
+
+from app.core.logging import get_logger
+from app.storage.base import StorageInterface
+
+
+class BlobStore:
+    """
+    Content-addressed store for uploaded documents
+
+    Blobs are keyed by their SHA-256 digest and stored once under
+    ``objects/<digest[:2]>/<digest>``. Task directories reference a blob by
+    hardlink (falling back to a copy across filesystems), and each reference
+    is recorded as a marker file under ``refs/<digest>/<task_id>``. A blob is
+    deleted once its last reference is released, which happens when the
+    referencing task is removed (see release_removed_tasks).
+    """
+
+    def __init__(self, root: str):
+        """Initialize the store rooted at the given directory"""
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.refs_dir = self.root / "refs"
+        self.staging_dir = self.root / "staging"
+        for directory in (self.objects_dir, self.refs_dir, self.staging_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        # Serializes ingest/link/release so a blob is never deleted while being referenced
+        self._lock = threading.RLock()
+        self.logger = get_logger("storage.blobs")
+        self.logger.info(f"Initialized blob store at {root}")
+
+    def blob_path(self, digest: str) -> Path:
+        """Get the path of the blob with the given digest"""
+        return self.objects_dir / digest[:2] / digest
+
+    def staging_path(self) -> str:
+        """Get a unique path to stream a new upload to before it is ingested"""
+        return str(self.staging_dir / f"{uuid.uuid4().hex}.part")
+
+    def exists(self, digest: str) -> bool:
+        """Check whether a blob is stored"""
+        return self.blob_path(digest).is_file()
+
+    def ref_count(self, digest: str) -> int:
+        """Get the number of task references to a blob"""
+        ref_dir = self.refs_dir / digest
+        if not ref_dir.is_dir():
+            return 0
+        return sum(1 for _ in ref_dir.iterdir())
+
+    async def ingest(self, staging_path: str, digest: str) -> str:
+        """
+        Move a staged upload into the store
+
+        If a blob with the same digest already exists the staged copy is discarded.
+
+        Returns:
+            str: Path of the stored blob
+        """
+        return await asyncio.to_thread(self._ingest, staging_path, digest)
+
+    async def link(self, digest: str, destination: str, task_id: str) -> str:
+        """Reference a blob from a task directory and record the reference"""
+        return await asyncio.to_thread(self._link, digest, destination, task_id)
+
+    async def add(self, staging_path: str, digest: str, destination: str, task_id: str) -> str:
+        """Ingest a staged upload and reference it from a task directory in one step"""
+        return await asyncio.to_thread(self._add, staging_path, digest, destination, task_id)
+
+    async def release(self, digest: str, task_id: str) -> bool:
+        """
+        Release a task's reference to a blob
+
+        Returns:
+            bool: True if this was the last reference and the blob was deleted
+        """
+        return await asyncio.to_thread(self._release, digest, task_id)
+
+    async def release_all(self, digests: Iterable[str], task_id: str) -> None:
+        """Release a task's references to several blobs"""
+        for digest in set(digests):
+            await self.release(digest, task_id)
+
+    def _ingest(self, staging_path: str, digest: str) -> str:
+        blob_path = self.blob_path(digest)
+        with self._lock:
+            if blob_path.is_file():
+                os.remove(staging_path)
+                self.logger.debug(f"Blob {digest} already stored, discarded duplicate upload")
+            else:
+                blob_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staging_path, blob_path)
+                # Blobs are shared through hardlinks, so guard them against in-place edits
+                os.chmod(blob_path, 0o444)
+                self.logger.debug(f"Stored new blob {digest}")
+        return str(blob_path)
+
+    def _add(self, staging_path: str, digest: str, destination: str, task_id: str) -> str:
+        with self._lock:
+            self._ingest(staging_path, digest)
+            return self._link(digest, destination, task_id)
+
+    def _link(self, digest: str, destination: str, task_id: str) -> str:
+        blob_path = self.blob_path(digest)
+        with self._lock:
+            if not blob_path.is_file():
+                raise FileNotFoundError(f"Blob not found: {digest}")
+            ref_dir = self.refs_dir / digest
+            ref_dir.mkdir(parents=True, exist_ok=True)
+            (ref_dir / task_id).touch()
+            if os.path.lexists(destination):
+                os.remove(destination)
+            try:
+                os.link(blob_path, destination)
+            except OSError:
+                # Copied rather than symlinked, which would dangle once the blob is released
+                shutil.copyfile(blob_path, destination)
+        return destination
+
+    def _release(self, digest: str, task_id: str) -> bool:
+        ref_dir = self.refs_dir / digest
+        with self._lock:
+            try:
+                (ref_dir / task_id).unlink()
+            except FileNotFoundError:
+                pass
+            if ref_dir.is_dir() and any(ref_dir.iterdir()):
+                return False
+            shutil.rmtree(ref_dir, ignore_errors=True)
+            try:
+                self.blob_path(digest).unlink()
+            except FileNotFoundError:
+                return False
+            self.logger.debug(f"Deleted unreferenced blob {digest}")
+            return True
+
+    def task_references(self, min_age: float = 0) -> Dict[str, Set[str]]:
+        """
+        Get the digests referenced by each task
+
+        References recorded less than min_age seconds ago are skipped, so a
+        task still being submitted is not mistaken for a removed one.
+        """
+        cutoff = time.time() - min_age
+        references: Dict[str, Set[str]] = {}
+        with self._lock:
+            for ref_dir in self.refs_dir.iterdir():
+                for marker in ref_dir.iterdir():
+                    if marker.stat().st_mtime <= cutoff:
+                        references.setdefault(marker.name, set()).add(ref_dir.name)
+        return references
+
+
+async def release_removed_tasks(
+    storage: StorageInterface,
+    blob_store: BlobStore,
+    task_base_dir: str,
+    min_age: float
+) -> int:
+    """
+    Clean up the directories and blob references of tasks no longer in storage
+
+    Tasks keep their blob references for as long as they are stored, so an
+    identical upload is deduplicated against them even after they finished.
+    Once a task is evicted or expires its results can no longer be served,
+    so its task directory is deleted and its references are released.
+
+    Returns:
+        int: Number of tasks cleaned up
+    """
+    references = await asyncio.to_thread(blob_store.task_references, min_age)
+    removed = 0
+    for task_id, digests in references.items():
+        if await storage.get_task_status(task_id) is not None:
+            continue
+        await asyncio.to_thread(shutil.rmtree, Path(task_base_dir) / task_id, True)
+        await blob_store.release_all(digests, task_id)
+        removed += 1
+    if removed:
+        blob_store.logger.info(f"Cleaned up {removed} removed tasks")
+    return removed
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+import redis.asyncio as redis
+
+from app.core.logging import get_logger
+from app.models import TaskResult, TaskStatusRecord
+from app.storage.base import StorageInterface, StorageWrapper
+
+logger = get_logger("storage.events")
+
+
+class TaskSubscription(ABC):
+    """Stream of the status records of one task, one per save"""
+
+    @abstractmethod
+    async def next(self, timeout: float) -> Optional[TaskStatusRecord]:
+        """Wait up to timeout seconds for the status record of the next save of the task"""
+        pass
+
+
+class TaskEvents(ABC):
+    """
+    Notifies listeners whenever a task is saved
+
+    Lets clients wait for task changes instead of polling storage. Events
+    carry the task's status record, not its result.
+    """
+
+    @abstractmethod
+    async def publish(self, task: TaskResult) -> None:
+        """Announce the status record of a saved task"""
+        pass
+
+    @abstractmethod
+    def subscribe(self, task_id: str) -> "AsyncIterator[TaskSubscription]":
+        """Async context manager yielding a subscription to one task"""
+        pass
+
+
+class _QueueSubscription(TaskSubscription):
+    def __init__(self, queue: "asyncio.Queue[str]"):
+        self.queue = queue
+
+    async def next(self, timeout: float) -> Optional[TaskStatusRecord]:
+        try:
+            payload = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        return TaskStatusRecord.model_validate_json(payload)
+
+
+class LocalTaskEvents(TaskEvents):
+    """In-process task events, for tasks run by the API process itself"""
+
+    # Events a slow subscriber may fall behind by; older ones are dropped
+    MAX_PENDING = 100
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set["asyncio.Queue[str]"]] = {}
+
+    async def publish(self, task: TaskResult) -> None:
+        queues = self._subscribers.get(task.task_id)
+        if not queues:
+            return
+        payload = TaskStatusRecord.from_task(task).model_dump_json()
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[TaskSubscription]:
+        queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=self.MAX_PENDING)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        try:
+            yield _QueueSubscription(queue)
+        finally:
+            queues = self._subscribers.get(task_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[task_id]
+
+
+class _PubSubSubscription(TaskSubscription):
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def next(self, timeout: float) -> Optional[TaskStatusRecord]:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None and message["type"] == "message":
+                return TaskStatusRecord.model_validate_json(message["data"])
+
+
+class RedisTaskEvents(TaskEvents):
+    """Task events over Redis pub/sub, for tasks saved by other processes or nodes"""
+
+    def __init__(self, redis_client: redis.Redis, channel_prefix: str = "task-events:"):
+        self.redis = redis_client
+        self.channel_prefix = channel_prefix
+
+    async def publish(self, task: TaskResult) -> None:
+        record = TaskStatusRecord.from_task(task)
+        await self.redis.publish(f"{self.channel_prefix}{task.task_id}", record.model_dump_json())
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[TaskSubscription]:
+        channel = f"{self.channel_prefix}{task_id}"
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            yield _PubSubSubscription(pubsub)
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+
+class NotifyingStorage(StorageWrapper):
+    """Storage wrapper that publishes a task event after every save"""
+
+    def __init__(self, storage: StorageInterface, events: TaskEvents):
+        super().__init__(storage)
+        self.events = events
+
+    async def save_task(self, task: TaskResult) -> None:
+        await self.storage.save_task(task)
+        try:
+            await self.events.publish(task)
+        except Exception as e:
+            # Listeners fall back to the stored state; the save itself succeeded
+            logger.warning(f"Failed to publish event for task {task.task_id}: {str(e)}")
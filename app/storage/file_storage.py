@@ -1,17 +1,35 @@
+import asyncio
+import fcntl
 import json
 import os
 import aiofiles
 import logging
-from typing import Dict, Optional
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import aiofiles.os
 
-from app.models import TaskResult
-from app.storage.base import StorageInterface
+from app.models import TaskResult, TaskStatusRecord
+from app.storage.base import StorageInterface, TaskFilter, TaskKey, decode_cursor, encode_cursor
+from app.storage.task_index import TaskIndex
+
+INDEX_FILENAME = "_index.jsonl"
 
 
 class FileStorage(StorageInterface):
-    """Implementation of StorageInterface using the file system"""
+    """
+    Implementation of StorageInterface using the file system
+
+    Each task is a JSON file, with its status record in a small
+    {task_id}.status file next to it for status polling. The status, type
+    and creation time of every task are also appended to an index log
+    whenever they change, which is replayed into memory to serve query_tasks
+    and compacted once most of its lines are outdated. Index lines appended
+    by other processes are picked up before every query. Appends and
+    compactions hold an exclusive lock on a lock file next to the log, so a
+    compaction by one process never drops lines appended by another.
+    """
 
     def __init__(self, storage_path: str):
         """Initialize with the path to store task files"""
@@ -20,11 +38,131 @@ class FileStorage(StorageInterface):
         self.logger = logging.getLogger(__name__)
         self.logger.info(f"Initializing file storage at {storage_path}")
         os.makedirs(storage_path, exist_ok=True)
+        self.index_path = os.path.join(storage_path, INDEX_FILENAME)
+        self.index_lock_path = f"{self.index_path}.lock"
+        self._index = TaskIndex()
+        self._index_file_id: Optional[Tuple[int, int]] = None  # (device, inode) of the replayed log
+        self._index_offset = 0
+        self._index_lines = 0
+        # Guards the in-memory index between the threads that refresh it
+        self._index_mutex = threading.Lock()
+        with self._index_locked():
+            if os.path.exists(self.index_path):
+                self._refresh_index()
+            else:
+                self._build_index()
+
+    @contextmanager
+    def _index_locked(self):
+        """
+        Hold the lock of the index log between processes
+
+        The log itself is replaced by compaction, so the lock is taken on a
+        separate file. It is only taken in worker threads or while the
+        storage is created, never on the event loop.
+        """
+        with open(self.index_lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _build_index(self) -> None:
+        """Index the tasks saved before the index log existed"""
+        for filename in os.listdir(self.storage_path):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.storage_path, filename)) as f:
+                    task_dict = json.load(f)
+                self._index.update(
+                    task_dict["task_id"],
+                    datetime.fromisoformat(task_dict["created_at"]).timestamp(),
+                    task_dict["status"],
+                    task_dict["task_type"]
+                )
+            except Exception as e:
+                self.logger.warning(f"Skipping unreadable task file {filename} while indexing: {str(e)}")
+        self._compact_index()
+        self.logger.info(f"Indexed {len(self._index)} existing tasks")
+    
+    def _refresh_index(self) -> None:
+        """Replay the index log lines written since the last replay, from scratch if it was replaced"""
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return
+        file_id = (stat.st_dev, stat.st_ino)
+        if file_id != self._index_file_id or stat.st_size < self._index_offset:
+            self._index = TaskIndex()
+            self._index_file_id, self._index_offset, self._index_lines = file_id, 0, 0
+        if stat.st_size == self._index_offset:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partially written by another process, read it next time
+                    break
+                self._index_offset += len(line)
+                self._index_lines += 1
+                entry = json.loads(line)
+                self._index.update(entry["task_id"], entry["created"], entry["status"], entry["task_type"])
+    
+    def _compact_index(self) -> None:
+        """Rewrite the index log with one line per task"""
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            for task_id, entry in self._index.entries().items():
+                f.write(_index_line(task_id, entry.key[0], entry.status, entry.task_type))
+        os.replace(tmp_path, self.index_path)
+        stat = os.stat(self.index_path)
+        self._index_file_id = (stat.st_dev, stat.st_ino)
+        self._index_offset = stat.st_size
+        self._index_lines = len(self._index)
+    
+    async def _write_status(self, task: TaskResult) -> None:
+        """Replace the status record file of a task"""
+        status_path = self._get_status_path(task.task_id)
+        tmp_path = f"{status_path}.tmp"
+        async with aiofiles.open(tmp_path, mode='w') as f:
+            await f.write(TaskStatusRecord.from_task(task).model_dump_json())
+        await aiofiles.os.replace(tmp_path, status_path)
+    
+    async def _index_task(self, task: TaskResult) -> None:
+        """Append the indexed fields of a task to the index log when they changed"""
+        created = task.created_at.timestamp()
+        await asyncio.to_thread(self._append_index, task.task_id, created, task.status.value, task.task_type)
+    
+    def _append_index(self, task_id: str, created: float, status: str, task_type: str) -> None:
+        """Append one index line under the index lock, compacting the log once most of it is outdated"""
+        with self._index_mutex, self._index_locked():
+            self._refresh_index()
+            if not self._index.update(task_id, created, status, task_type):
+                return
+            with open(self.index_path, "a") as f:
+                f.write(_index_line(task_id, created, status, task_type))
+            # Lines appended here are counted when they are replayed by the next refresh
+            if self._index_lines > 2 * len(self._index) + 1000:
+                self._refresh_index()
+                self._compact_index()
+    
+    def _query_index(
+        self, task_filter: TaskFilter, after: Optional[TaskKey], limit: int
+    ) -> Tuple[List[str], Optional[TaskKey]]:
+        with self._index_mutex:
+            self._refresh_index()
+            return self._index.query(task_filter, after, limit)
     
     def _get_file_path(self, task_id: str) -> str:
         """Get the file path for a task ID"""
         return os.path.join(self.storage_path, f"{task_id}.json")
     
+    def _get_status_path(self, task_id: str) -> str:
+        """Get the path of the status record file of a task ID"""
+        return os.path.join(self.storage_path, f"{task_id}.status")
+    
     async def save_task(self, task: TaskResult) -> None:
         """Save a task to a JSON file"""
         file_path = self._get_file_path(task.task_id)
@@ -32,13 +170,15 @@ class FileStorage(StorageInterface):
         
         # Convert the task to a dict and handle datetime serialization
         task_dict = task.dict()
-        for field in ['created_at', 'started_at', 'completed_at']:
+        for field in ['created_at', 'started_at', 'completed_at', 'heartbeat_at']:
             if task_dict.get(field) is not None:
                 task_dict[field] = task_dict[field].isoformat()
                 
         try:
             async with aiofiles.open(file_path, mode='w') as f:
                 await f.write(json.dumps(task_dict, indent=2))
+            await self._write_status(task)
+            await self._index_task(task)
             self.logger.debug(f"Successfully saved task {task.task_id}")
         except Exception as e:
             self.logger.error(f"Error saving task {task.task_id}: {str(e)}")
@@ -59,7 +199,7 @@ class FileStorage(StorageInterface):
                 task_dict = json.loads(content)
                 
             # Convert ISO datetime strings back to datetime objects
-            for field in ['created_at', 'started_at', 'completed_at']:
+            for field in ['created_at', 'started_at', 'completed_at', 'heartbeat_at']:
                 if task_dict.get(field) is not None:
                     task_dict[field] = datetime.fromisoformat(task_dict[field])
             
@@ -69,6 +209,15 @@ class FileStorage(StorageInterface):
             self.logger.error(f"Error retrieving task {task_id}: {str(e)}")
             return None
     
+    async def get_task_status(self, task_id: str) -> Optional[TaskStatusRecord]:
+        """Get the status record of a task without reading its task file"""
+        try:
+            async with aiofiles.open(self._get_status_path(task_id), mode='r') as f:
+                return TaskStatusRecord.model_validate_json(await f.read())
+        except FileNotFoundError:
+            # Tasks saved before status records were written
+            return await super().get_task_status(task_id)
+    
     async def list_tasks(self) -> Dict[str, TaskResult]:
         """List all tasks in the file system storage"""
         tasks = {}
@@ -91,4 +240,24 @@ class FileStorage(StorageInterface):
             return tasks
         except Exception as e:
             self.logger.error(f"Error listing tasks: {str(e)}")
-            return {} 
\ No newline at end of file
+            return {}
+    
+    async def query_tasks(
+        self,
+        task_filter: TaskFilter = TaskFilter(),
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[TaskResult], Optional[str]]:
+        """List one page of tasks matching a filter, newest first, reading only the files of that page"""
+        after = decode_cursor(cursor) if cursor else None
+        task_ids, last = await asyncio.to_thread(self._query_index, task_filter, after, limit)
+        tasks = []
+        for task_id in task_ids:
+            task = await self.get_task(task_id)
+            if task:
+                tasks.append(task)
+        return tasks, encode_cursor(last) if last else None
+
+
+def _index_line(task_id: str, created: float, status: str, task_type: str) -> str:
+    return json.dumps({"task_id": task_id, "created": created, "status": status, "task_type": task_type}) + "\n"
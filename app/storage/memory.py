@@ -1,35 +1,138 @@
-from typing import Dict, Optional
-from copy import deepcopy
-from app.models import TaskResult
-from app.storage.base import StorageInterface
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.models import TaskResult, TaskStatusRecord
+from app.storage.base import StorageInterface, TaskFilter, decode_cursor, encode_cursor
+from app.storage.task_index import TaskIndex
 from app.core.logging import get_logger
 
 
+@dataclass(frozen=True)
+class _Snapshot:
+    """One saved version of a task"""
+    task: TaskResult
+    version: int
+    # Serialized size in bytes, only measured for finished tasks under a byte budget
+    size: int = 0
+
+
 class InMemoryStorage(StorageInterface):
-    """In-memory implementation of task storage"""
-    
-    def __init__(self):
-        self._tasks: Dict[str, TaskResult] = {}
+    """
+    In-memory implementation of task storage
+
+    Every save stores an immutable, versioned snapshot of the task. Task
+    payloads (result, progress, checkpoints) are shared between the caller,
+    the snapshot and every reader instead of being deep-copied; callers
+    update a task by assigning new field values, never by changing those
+    dicts in place. Readers get a shallow copy of the snapshot, so setting a
+    field on it does not change what is stored.
+
+    Finished tasks are evicted least recently read first once max_tasks or
+    max_bytes is exceeded, and after ttl seconds. Queued and running tasks
+    are never evicted.
+    """
+
+    def __init__(self, max_tasks: int = 0, max_bytes: int = 0, ttl: float = 0):
+        self._tasks: Dict[str, _Snapshot] = {}
+        self._index = TaskIndex()
+        # Finished tasks, least recently read first
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        # Expiry times of finished tasks, soonest first
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+        self._finished_bytes = 0
+        self._versions = itertools.count(1)
+        self.max_tasks = max_tasks  # 0 disables the limit
+        self.max_bytes = max_bytes  # 0 disables the budget
+        self.ttl = ttl  # Seconds a finished task is kept, 0 keeps it until evicted
         self.logger = get_logger("storage.memory")
         self.logger.info("Initialized in-memory storage")
-    
+
     async def save_task(self, task: TaskResult) -> None:
-        """Save a task result to memory"""
+        """Save a new snapshot of a task"""
         self.logger.debug(f"Saving task {task.task_id} (status: {task.status})")
-        # Create a deep copy to ensure task state is properly maintained
-        self._tasks[task.task_id] = deepcopy(task)
-    
+        self._forget_finished(task.task_id)
+        snapshot = task.model_copy()
+        size = 0
+        if task.status.is_final:
+            if self.max_bytes:
+                size = len(snapshot.model_dump_json())
+                self._finished_bytes += size
+            self._finished[task.task_id] = None
+            if self.ttl:
+                self._expiry[task.task_id] = time.monotonic() + self.ttl
+        self._tasks[task.task_id] = _Snapshot(snapshot, next(self._versions), size)
+        self._index.update(task.task_id, task.created_at.timestamp(), task.status.value, task.task_type)
+        self._evict()
+
     async def get_task(self, task_id: str) -> Optional[TaskResult]:
-        """Get a task result from memory by ID"""
-        task = self._tasks.get(task_id)
-        if task:
-            # Return a deep copy to prevent accidental modifications
-            return deepcopy(task)
-        else:
+        """Get the latest snapshot of a task by ID"""
+        self._expire()
+        snapshot = self._tasks.get(task_id)
+        if snapshot is None:
             self.logger.warning(f"Task {task_id} not found in storage")
             return None
-    
+        if task_id in self._finished:
+            self._finished.move_to_end(task_id)
+        return snapshot.task.model_copy()
+
+    async def get_task_status(self, task_id: str) -> Optional[TaskStatusRecord]:
+        """Get the status record of the latest snapshot of a task"""
+        self._expire()
+        snapshot = self._tasks.get(task_id)
+        return TaskStatusRecord.from_task(snapshot.task) if snapshot else None
+
     async def list_tasks(self) -> Dict[str, TaskResult]:
-        """List all tasks from memory"""
-        # Return a deep copy of all tasks
-        return {k: deepcopy(v) for k, v in self._tasks.items()} 
\ No newline at end of file
+        """List the latest snapshot of every task"""
+        self._expire()
+        return {task_id: snapshot.task.model_copy() for task_id, snapshot in self._tasks.items()}
+
+    async def query_tasks(
+        self,
+        task_filter: TaskFilter = TaskFilter(),
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[TaskResult], Optional[str]]:
+        """List one page of the latest task snapshots matching a filter, newest first"""
+        after = decode_cursor(cursor) if cursor else None
+        self._expire()
+        task_ids, last = self._index.query(task_filter, after, limit)
+        tasks = [self._tasks[task_id].task.model_copy() for task_id in task_ids]
+        return tasks, encode_cursor(last) if last else None
+
+    def get_version(self, task_id: str) -> Optional[int]:
+        """Version of the latest snapshot of a task, increasing with every save"""
+        snapshot = self._tasks.get(task_id)
+        return snapshot.version if snapshot else None
+
+    def _forget_finished(self, task_id: str) -> None:
+        """Drop the eviction bookkeeping of a finished task"""
+        if task_id in self._finished:
+            del self._finished[task_id]
+            self._finished_bytes -= self._tasks[task_id].size
+            self._expiry.pop(task_id, None)
+
+    def _remove(self, task_id: str) -> None:
+        self._forget_finished(task_id)
+        self._index.remove(task_id)
+        del self._tasks[task_id]
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._expiry:
+            task_id, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            self.logger.debug(f"Task {task_id} expired from storage")
+            self._remove(task_id)
+
+    def _evict(self) -> None:
+        self._expire()
+        while self._finished and (
+            (self.max_tasks and len(self._tasks) > self.max_tasks)
+            or (self.max_bytes and self._finished_bytes > self.max_bytes)
+        ):
+            task_id = next(iter(self._finished))
+            self.logger.debug(f"Evicting finished task {task_id} from storage")
+            self._remove(task_id)
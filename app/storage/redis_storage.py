@@ -1,87 +1,371 @@
 import json
-from typing import Dict, Optional
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import redis.asyncio as redis
 
-from app.models import TaskResult
-from app.storage.base import StorageInterface
+from app.models import TaskResult, TaskStatus, TaskStatusRecord, progress_counters
+from app.storage.base import StorageInterface, TaskFilter, decode_cursor, encode_cursor, task_key
+
+# Task fields stored as JSON in the task hash; the others are plain strings
+JSON_FIELDS = ("result", "progress", "checkpoints")
+DATETIME_FIELDS = ("created_at", "started_at", "completed_at", "heartbeat_at")
+# Derived hash field holding the progress counters of the task's status record
+COUNTERS_FIELD = "status_counters"
+STATUS_FIELDS = tuple(name for name in TaskStatusRecord.model_fields if name != "progress")
+READ_BATCH = 500
+
+# Writes the changed fields of a task only if its hash still exists, moving it
+# to its new status index from the status stored in Redis.
+# KEYS: task hash, new status index. ARGV: status index prefix, task ID,
+# created score, new status, TTL or 0, number of removed fields, the removed
+# fields, then changed field/value pairs. Returns 0 if the hash is missing.
+PARTIAL_SAVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local stored = redis.call('HGET', KEYS[1], 'status')
+local removed = tonumber(ARGV[6])
+if removed > 0 then
+    redis.call('HDEL', KEYS[1], unpack(ARGV, 7, 6 + removed))
+end
+if #ARGV > 6 + removed then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 7 + removed, #ARGV))
+end
+if stored ~= ARGV[4] then
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[2])
+    if stored then
+        redis.call('ZREM', ARGV[1] .. stored, ARGV[2])
+    end
+end
+if tonumber(ARGV[5]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+end
+return 1
+"""
 
 
 class RedisStorage(StorageInterface):
-    """Implementation of StorageInterface using Redis"""
+    """
+    Implementation of StorageInterface using Redis
+
+    Each task is a hash with one field per task attribute, plus the progress
+    counters of its status record, so get_task_status reads a few small
+    fields. A save only writes the fields that changed since this process
+    last saved the task, so a status change or progress update does not
+    resend the task's result. Finished tasks expire after task_ttl seconds.
+    Undecodable hashes are logged and read as missing tasks.
 
-    def __init__(self, redis_url: str):
-        """Initialize with Redis connection URL"""
+    Besides the task itself, saves update sorted sets of task IDs scored by
+    creation time: one of all tasks, one per status and one per task type.
+    query_tasks pages through the most selective of them.
+    """
+
+    # Unfinished tasks whose last written fields are remembered for partial updates
+    written_cache_size = 1024
+
+    def __init__(self, redis_url: str, redis_client: Optional[redis.Redis] = None, task_ttl: int = 0):
+        """Initialize with Redis connection URL, or an existing client"""
         super().__init__()
         self.redis_url = redis_url
+        self.logger = logging.getLogger(__name__)
         self.logger.info(f"Initializing Redis storage with URL: {redis_url}")
-        self.redis_client = redis.from_url(redis_url)
+        self.redis_client = redis_client or redis.from_url(redis_url)
         self.key_prefix = "task:"
-    
+        self.index_prefix = "task-index:"
+        self.task_ttl = task_ttl  # Seconds finished tasks are kept, 0 keeps them forever
+        self._index_checked = False
+        self._written: "OrderedDict[str, Dict[str, Optional[str]]]" = OrderedDict()
+        self._partial_save = self.redis_client.register_script(PARTIAL_SAVE_SCRIPT)
+
     def _get_key(self, task_id: str) -> str:
         """Get the Redis key for a task ID"""
         return f"{self.key_prefix}{task_id}"
-    
+
+    def _index_key(self, kind: str, value: Optional[str] = None) -> str:
+        return f"{self.index_prefix}{kind}:{value}" if value is not None else f"{self.index_prefix}{kind}"
+
+    def _index_task(self, pipe, task: TaskResult) -> None:
+        """Queue the index updates of a task on a pipeline"""
+        created = task.created_at.timestamp()
+        member = {task.task_id: created}
+        pipe.zadd(self._index_key("all"), member)
+        pipe.zadd(self._index_key("type", task.task_type), member)
+        pipe.zadd(self._index_key("status", task.status.value), member)
+        for status in TaskStatus:
+            if status != task.status:
+                pipe.zrem(self._index_key("status", status.value), task.task_id)
+
+    async def _ensure_index(self) -> None:
+        """Index the tasks saved before the indexes existed"""
+        if self._index_checked:
+            return
+        if not await self.redis_client.exists(self._index_key("all")):
+            indexed = 0
+            async for task in self._scan_tasks():
+                pipe = self.redis_client.pipeline(transaction=False)
+                self._index_task(pipe, task)
+                await pipe.execute()
+                indexed += 1
+            self.logger.info(f"Indexed {indexed} existing tasks")
+        self._index_checked = True
+
     async def save_task(self, task: TaskResult) -> None:
-        """Save a task to Redis"""
+        """
+        Save a task to Redis
+
+        The first save of a task in this process replaces the whole hash in
+        a transaction. Later saves send only the changed fields in one script
+        call, which also moves the task from the status index of its stored
+        status, so a status written by another process is not left indexed.
+        If the hash expired or was deleted meanwhile, the script writes
+        nothing and the whole hash is replaced instead.
+        """
         key = self._get_key(task.task_id)
+        fields = _encode_task(task)
+        previous = self._written.pop(task.task_id, None)
+        ttl = self.task_ttl if task.status.is_final else 0
         self.logger.debug(f"Saving task {task.task_id} to Redis key {key}")
-        
-        # Convert the task to a dict and handle datetime serialization
-        task_dict = task.dict()
-        for field in ['created_at', 'started_at', 'completed_at']:
-            if task_dict.get(field) is not None:
-                task_dict[field] = task_dict[field].isoformat()
-        
-        try:        
-            await self.redis_client.set(key, json.dumps(task_dict))
+
+        try:
+            if previous is None or not await self._save_changes(task, fields, previous, ttl):
+                pipe = self.redis_client.pipeline(transaction=True)
+                pipe.delete(key)
+                pipe.hset(key, mapping={name: value for name, value in fields.items() if value is not None})
+                self._index_task(pipe, task)
+                if ttl:
+                    pipe.expire(key, ttl)
+                await pipe.execute()
             self.logger.debug(f"Successfully saved task {task.task_id}")
         except Exception as e:
             self.logger.error(f"Error saving task {task.task_id}: {str(e)}")
             raise
-    
+
+        if not task.status.is_final:
+            self._written[task.task_id] = fields
+            if len(self._written) > self.written_cache_size:
+                self._written.popitem(last=False)
+
+    async def _save_changes(
+        self,
+        task: TaskResult,
+        fields: Dict[str, Optional[str]],
+        previous: Dict[str, Optional[str]],
+        ttl: int
+    ) -> bool:
+        """Write the fields changed since the previous save, False if the task hash is missing"""
+        # The status is always sent, so the hash ends up with this process's status
+        changed = {
+            name: value for name, value in fields.items()
+            if value is not None and (value != previous.get(name) or name == "status")
+        }
+        removed = [name for name, value in fields.items() if value is None and previous.get(name) is not None]
+        args = [
+            self._index_key("status", ""), task.task_id, repr(task.created_at.timestamp()),
+            task.status.value, ttl, len(removed), *removed
+        ]
+        for name, value in changed.items():
+            args.extend((name, value))
+        written = await self._partial_save(
+            keys=[self._get_key(task.task_id), self._index_key("status", task.status.value)], args=args
+        )
+        return bool(written)
+
     async def get_task(self, task_id: str) -> Optional[TaskResult]:
         """Get a task from Redis by ID"""
-        key = self._get_key(task_id)
-        self.logger.debug(f"Retrieving task {task_id} from Redis key {key}")
-        
+        self.logger.debug(f"Retrieving task {task_id} from Redis")
+
         try:
-            task_json = await self.redis_client.get(key)
-            
-            if not task_json:
+            task = (await self._read_tasks([task_id]))[0]
+            if task is None:
                 self.logger.warning(f"Task {task_id} not found in Redis")
                 return None
-                
-            task_dict = json.loads(task_json)
-            
-            # Convert ISO datetime strings back to datetime objects
-            for field in ['created_at', 'started_at', 'completed_at']:
-                if task_dict.get(field) is not None:
-                    task_dict[field] = datetime.fromisoformat(task_dict[field])
-            
+
             self.logger.debug(f"Successfully retrieved task {task_id}")
-            return TaskResult(**task_dict)
+            return task
         except Exception as e:
             self.logger.error(f"Error retrieving task {task_id}: {str(e)}")
             return None
-    
+
+    async def get_task_status(self, task_id: str) -> Optional[TaskStatusRecord]:
+        """Get the status record of a task, without reading its result and checkpoints"""
+        try:
+            values = await self.redis_client.hmget(self._get_key(task_id), [*STATUS_FIELDS, COUNTERS_FIELD])
+        except Exception:
+            # Saved as JSON before tasks were hashes
+            return await super().get_task_status(task_id)
+        if values[0] is None:
+            return None
+        record = {name: value.decode('utf-8') for name, value in zip(STATUS_FIELDS, values) if value is not None}
+        counters = values[-1]
+        return TaskStatusRecord(**record, progress=json.loads(counters) if counters else {})
+
     async def list_tasks(self) -> Dict[str, TaskResult]:
         """List all tasks in Redis storage"""
-        tasks = {}
         self.logger.debug(f"Listing all tasks with prefix {self.key_prefix}")
-        
+
         try:
-            # Get all keys with our prefix
-            keys = await self.redis_client.keys(f"{self.key_prefix}*")
-            self.logger.debug(f"Found {len(keys)} task keys in Redis")
-            
-            for key in keys:
-                task_id = key.decode('utf-8').replace(self.key_prefix, "")
-                task = await self.get_task(task_id)
-                if task:
-                    tasks[task_id] = task
-            
+            tasks = {task.task_id: task async for task in self._scan_tasks()}
+            self.logger.debug(f"Found {len(tasks)} tasks in Redis")
             return tasks
         except Exception as e:
             self.logger.error(f"Error listing tasks: {str(e)}")
-            return {} 
\ No newline at end of file
+            return {}
+
+    async def _scan_tasks(self):
+        """Iterate over all stored tasks with SCAN, reading them in batches"""
+        task_ids: List[str] = []
+        async for key in self.redis_client.scan_iter(match=f"{self.key_prefix}*", count=READ_BATCH):
+            task_ids.append(key.decode('utf-8')[len(self.key_prefix):])
+            if len(task_ids) == READ_BATCH:
+                for task in await self._read_tasks(task_ids):
+                    if task:
+                        yield task
+                task_ids = []
+        for task in await self._read_tasks(task_ids):
+            if task:
+                yield task
+
+    async def _read_tasks(self, task_ids: List[str]) -> List[Optional[TaskResult]]:
+        """Read several tasks in one round trip, None for each missing task"""
+        if not task_ids:
+            return []
+        pipe = self.redis_client.pipeline(transaction=False)
+        for task_id in task_ids:
+            pipe.hgetall(self._get_key(task_id))
+        replies = await pipe.execute(raise_on_error=False)
+
+        # Tasks saved before tasks were hashes are JSON strings
+        legacy = [task_id for task_id, reply in zip(task_ids, replies) if isinstance(reply, Exception)]
+        legacy_tasks: Dict[str, Optional[TaskResult]] = {}
+        if legacy:
+            payloads = await self.redis_client.mget([self._get_key(task_id) for task_id in legacy])
+            legacy_tasks = {
+                task_id: _load_task(payload) if payload else None
+                for task_id, payload in zip(legacy, payloads)
+            }
+
+        tasks: List[Optional[TaskResult]] = []
+        for task_id, reply in zip(task_ids, replies):
+            if isinstance(reply, Exception):
+                tasks.append(legacy_tasks.get(task_id))
+            else:
+                tasks.append(self._decode(task_id, reply) if reply else None)
+        return tasks
+
+    def _decode(self, task_id: str, fields: Dict[bytes, bytes]) -> Optional[TaskResult]:
+        try:
+            return _decode_task(fields)
+        except Exception as e:
+            self.logger.warning(f"Skipping undecodable task {task_id}: {str(e)}")
+            return None
+
+    async def query_tasks(
+        self,
+        task_filter: TaskFilter = TaskFilter(),
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[TaskResult], Optional[str]]:
+        """
+        List one page of tasks matching a filter, newest first
+
+        Reads the status index when filtering by status, else the task type
+        index, else the index of all tasks, in batches bounded by the created
+        range and the cursor, and fetches each batch in one round trip.
+        Expired tasks found in the indexes are removed from them.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        await self._ensure_index()
+        if task_filter.status is not None:
+            index_key = self._index_key("status", task_filter.status.value)
+        elif task_filter.task_type is not None:
+            index_key = self._index_key("type", task_filter.task_type)
+        else:
+            index_key = self._index_key("all")
+        low, high = task_filter.created_range()
+        if after is not None:
+            high = min(high, after[0])
+
+        tasks: List[TaskResult] = []
+        batch_size = limit + 1
+        offset = 0
+        while True:
+            members = await self.redis_client.zrevrangebyscore(
+                index_key, _score(high), _score(low), start=offset, num=batch_size, withscores=True
+            )
+            offset += len(members)
+            task_ids = [
+                member.decode('utf-8')
+                for member, created in members
+                if after is None or (created, member.decode('utf-8')) < after
+            ]
+            expired = []
+            for task_id, task in zip(task_ids, await self._read_tasks(task_ids)):
+                if task is None:
+                    expired.append(task_id)
+                    continue
+                if not task_filter.matches(task.status, task.task_type, task.created_at.timestamp()):
+                    # Changed after the index was read
+                    continue
+                if len(tasks) == limit:
+                    await self._unindex(expired, index_key)
+                    return tasks, encode_cursor(task_key(tasks[-1]))
+                tasks.append(task)
+            await self._unindex(expired, index_key)
+            offset -= len(expired)
+            if len(members) < batch_size:
+                return tasks, None
+
+    async def _unindex(self, task_ids: List[str], index_key: str) -> None:
+        """Remove tasks that expired from the indexes they can be found in"""
+        if not task_ids:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key in {index_key, self._index_key("all"), *(self._index_key("status", s.value) for s in TaskStatus)}:
+            pipe.zrem(key, *task_ids)
+        await pipe.execute()
+
+
+def _score(value: float) -> str:
+    if value in (float("inf"), float("-inf")):
+        return "+inf" if value > 0 else "-inf"
+    return repr(value)
+
+
+def _encode_task(task: TaskResult) -> Dict[str, Optional[str]]:
+    """Hash field values of a task, None for unset fields"""
+    fields: Dict[str, Optional[str]] = {}
+    for name in TaskResult.model_fields:
+        value = getattr(task, name)
+        if value is None:
+            fields[name] = None
+        elif name in JSON_FIELDS:
+            fields[name] = json.dumps(value)
+        elif name in DATETIME_FIELDS:
+            fields[name] = value.isoformat()
+        elif isinstance(value, TaskStatus):
+            fields[name] = value.value
+        else:
+            fields[name] = str(value)
+    fields[COUNTERS_FIELD] = json.dumps(progress_counters(task))
+    return fields
+
+
+def _decode_task(fields: Dict[bytes, bytes]) -> TaskResult:
+    task_dict = {name.decode('utf-8'): value.decode('utf-8') for name, value in fields.items()}
+    task_dict.pop(COUNTERS_FIELD, None)
+    for name in JSON_FIELDS:
+        if name in task_dict:
+            task_dict[name] = json.loads(task_dict[name])
+    return TaskResult(**task_dict)
+
+
+def _load_task(task_json: bytes) -> TaskResult:
+    task_dict = json.loads(task_json)
+
+    # Convert ISO datetime strings back to datetime objects
+    for field in ['created_at', 'started_at', 'completed_at']:
+        if task_dict.get(field) is not None:
+            task_dict[field] = datetime.fromisoformat(task_dict[field])
+    return TaskResult(**task_dict)
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models import TaskResult, TaskStatusRecord
+from app.storage.base import StorageInterface, TaskFilter, decode_cursor, encode_cursor
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    task_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    status_record TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_created ON tasks (created_at, task_id);
+CREATE INDEX IF NOT EXISTS tasks_status_created ON tasks (status, created_at, task_id);
+CREATE INDEX IF NOT EXISTS tasks_type_created ON tasks (task_type, created_at, task_id);
+"""
+
+UPSERT = """
+INSERT INTO tasks (task_id, task_type, status, created_at, data, status_record) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (task_id) DO UPDATE SET
+    task_type = excluded.task_type,
+    status = excluded.status,
+    created_at = excluded.created_at,
+    data = excluded.data,
+    status_record = excluded.status_record
+"""
+
+
+class SQLiteStorage(StorageInterface):
+    """
+    Implementation of StorageInterface using a SQLite database
+
+    The database runs in WAL mode, so reads are not blocked by writes and
+    a crash never leaves a partly written task. Each task is one row with
+    its status, type and creation time in indexed columns, and its status
+    record in a column of its own so status reads skip the task data.
+
+    SQLite calls run on two dedicated threads, one with the writing and one
+    with the reading connection, so they never block the event loop. Saves
+    made while a write is in progress are committed together in the next
+    transaction, and each save returns once its transaction is committed.
+    """
+
+    def __init__(self, db_path: str):
+        """Initialize with the path of the database file"""
+        super().__init__()
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        self.logger.info(f"Initializing SQLite storage at {db_path}")
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        columns = [row[1] for row in self._writer.execute("PRAGMA table_info(tasks)")]
+        if "status_record" not in columns:
+            # Databases created before status records were stored
+            self._writer.execute("ALTER TABLE tasks ADD COLUMN status_record TEXT")
+        self._reader = self._connect()
+        self._write_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._read_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-reader")
+        self._pending: List[Tuple[Tuple[Any, ...], asyncio.Future]] = []
+        self._flush: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Each connection is only used by its own thread, one call at a time
+        connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode, NORMAL keeps the database consistent across crashes; a
+        # power loss may only drop the last commits
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    async def _read(self, sql: str, params: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_thread, lambda: self._reader.execute(sql, params).fetchall())
+
+    def _write_rows(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._writer.execute("BEGIN IMMEDIATE")
+        try:
+            self._writer.executemany(UPSERT, rows)
+        except BaseException:
+            self._writer.execute("ROLLBACK")
+            raise
+        self._writer.execute("COMMIT")
+
+    async def _flush_pending(self) -> None:
+        """Commit queued saves, one transaction per batch, until none are left"""
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                await loop.run_in_executor(self._write_thread, self._write_rows, [row for row, _ in batch])
+            except Exception as e:
+                self.logger.error(f"Error saving {len(batch)} tasks: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+    async def save_task(self, task: TaskResult) -> None:
+        """Save a task, returning once it is committed"""
+        self.logger.debug(f"Saving task {task.task_id} to SQLite")
+        row = (
+            task.task_id,
+            task.task_type,
+            task.status.value,
+            task.created_at.timestamp(),
+            task.model_dump_json(),
+            TaskStatusRecord.from_task(task).model_dump_json()
+        )
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+        if self._flush is None or self._flush.done():
+            self._flush = asyncio.create_task(self._flush_pending())
+        # Shielded so a cancelled caller does not cancel the batch it joined
+        await asyncio.shield(future)
+
+    async def get_task(self, task_id: str) -> Optional[TaskResult]:
+        """Get a task from SQLite by ID"""
+        try:
+            rows = await self._read("SELECT data FROM tasks WHERE task_id = ?", (task_id,))
+        except Exception as e:
+            self.logger.error(f"Error retrieving task {task_id}: {str(e)}")
+            return None
+        if not rows:
+            self.logger.warning(f"Task {task_id} not found in SQLite")
+            return None
+        return TaskResult.model_validate_json(rows[0][0])
+
+    async def get_task_status(self, task_id: str) -> Optional[TaskStatusRecord]:
+        """Get the status record of a task, without reading the task data"""
+        rows = await self._read("SELECT status_record FROM tasks WHERE task_id = ?", (task_id,))
+        if not rows:
+            return None
+        if rows[0][0] is None:
+            return await super().get_task_status(task_id)
+        return TaskStatusRecord.model_validate_json(rows[0][0])
+
+    async def list_tasks(self) -> Dict[str, TaskResult]:
+        """List all tasks in SQLite storage"""
+        try:
+            rows = await self._read("SELECT task_id, data FROM tasks")
+        except Exception as e:
+            self.logger.error(f"Error listing tasks: {str(e)}")
+            return {}
+        return {task_id: TaskResult.model_validate_json(data) for task_id, data in rows}
+
+    async def query_tasks(
+        self,
+        task_filter: TaskFilter = TaskFilter(),
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[TaskResult], Optional[str]]:
+        """List one page of tasks matching a filter, newest first, with one indexed query"""
+        after = decode_cursor(cursor) if cursor else None
+        conditions: List[str] = []
+        params: List[Any] = []
+        if task_filter.status is not None:
+            conditions.append("status = ?")
+            params.append(task_filter.status.value)
+        if task_filter.task_type is not None:
+            conditions.append("task_type = ?")
+            params.append(task_filter.task_type)
+        low, high = task_filter.created_range()
+        if not math.isinf(low):
+            conditions.append("created_at >= ?")
+            params.append(low)
+        if not math.isinf(high):
+            conditions.append("created_at <= ?")
+            params.append(high)
+        if after is not None:
+            conditions.append("(created_at, task_id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = await self._read(
+            f"SELECT created_at, task_id, data FROM tasks {where} "
+            f"ORDER BY created_at DESC, task_id DESC LIMIT ?",
+            (*params, limit + 1)
+        )
+        tasks = [TaskResult.model_validate_json(data) for _, _, data in rows[:limit]]
+        next_cursor = encode_cursor((rows[limit - 1][0], rows[limit - 1][1])) if len(rows) > limit else None
+        return tasks, next_cursor
@@ -0,0 +1,131 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.storage.base import TaskFilter, TaskKey
+
+# Sorts after every task ID, so a key with it ends a range of timestamps
+_KEY_END = "\U0010ffff"
+
+
+class IndexEntry(NamedTuple):
+    key: TaskKey
+    status: str
+    task_type: str
+
+
+class TaskIndex:
+    """
+    Sorted in-memory index of task creation time, status and type
+
+    Used by backends that keep their index in process memory to answer
+    TaskFilter queries without loading tasks. Besides the keys of all tasks,
+    the keys of each status and each task type are kept in lists of their
+    own, so a query filtered by either only visits matching tasks.
+    """
+
+    def __init__(self):
+        self._keys: List[TaskKey] = []  # Oldest first
+        self._status_keys: Dict[str, List[TaskKey]] = {}
+        self._type_keys: Dict[str, List[TaskKey]] = {}
+        self._entries: Dict[str, IndexEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entries(self) -> Dict[str, IndexEntry]:
+        return self._entries
+
+    def update(self, task_id: str, created: float, status: str, task_type: str) -> bool:
+        """
+        Index the current state of a task
+
+        Returns:
+            bool: Whether the entry changed
+        """
+        entry = IndexEntry((created, task_id), status, task_type)
+        old = self._entries.get(task_id)
+        if old == entry:
+            return False
+        moved = old is None or old.key != entry.key
+        if moved:
+            if old is not None:
+                _discard(self._keys, old.key)
+            insort(self._keys, entry.key)
+        for lists, old_value, value in (
+            (self._status_keys, old and old.status, status),
+            (self._type_keys, old and old.task_type, task_type),
+        ):
+            if moved or old_value != value:
+                if old is not None:
+                    _discard_from(lists, old_value, old.key)
+                insort(lists.setdefault(value, []), entry.key)
+        self._entries[task_id] = entry
+        return True
+
+    def remove(self, task_id: str) -> None:
+        old = self._entries.pop(task_id, None)
+        if old is not None:
+            self._unindex(old)
+
+    def query(
+        self,
+        task_filter: TaskFilter,
+        after: Optional[TaskKey] = None,
+        limit: int = 100
+    ) -> Tuple[List[str], Optional[TaskKey]]:
+        """
+        Find one page of matching task IDs, newest first
+
+        Args:
+            after: Key of the last task of the previous page
+
+        Returns:
+            Tuple[List[str], Optional[TaskKey]]: The task IDs, and the key
+            of the last one when more tasks may follow
+        """
+        low, high = task_filter.created_range()
+        # Walk the shortest list of keys that holds every match
+        keys = self._keys
+        if task_filter.status is not None:
+            keys = self._status_keys.get(task_filter.status.value, [])
+        if task_filter.task_type is not None:
+            type_keys = self._type_keys.get(task_filter.task_type, [])
+            if len(type_keys) < len(keys):
+                keys = type_keys
+        position = bisect_right(keys, (high, _KEY_END))
+        if after is not None:
+            position = min(position, bisect_left(keys, after))
+        task_ids: List[str] = []
+        while position > 0:
+            position -= 1
+            created, task_id = keys[position]
+            if created < low:
+                break
+            entry = self._entries[task_id]
+            if task_filter.status is not None and entry.status != task_filter.status.value:
+                continue
+            if task_filter.task_type is not None and entry.task_type != task_filter.task_type:
+                continue
+            if len(task_ids) == limit:
+                return task_ids, self._entries[task_ids[-1]].key
+            task_ids.append(task_id)
+        return task_ids, None
+
+    def _unindex(self, entry: IndexEntry) -> None:
+        _discard(self._keys, entry.key)
+        _discard_from(self._status_keys, entry.status, entry.key)
+        _discard_from(self._type_keys, entry.task_type, entry.key)
+
+
+def _discard(keys: List[TaskKey], key: TaskKey) -> None:
+    position = bisect_left(keys, key)
+    if position < len(keys) and keys[position] == key:
+        del keys[position]
+
+
+def _discard_from(lists: Dict[str, List[TaskKey]], value: str, key: TaskKey) -> None:
+    """Remove a key from the list of one status or task type, dropping the list once empty"""
+    keys = lists[value]
+    _discard(keys, key)
+    if not keys:
+        del lists[value]
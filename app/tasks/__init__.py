@@ -1,7 +1,12 @@
 from typing import Dict, Type
+from functools import lru_cache
 
+from app.core.config import settings
+from app.storage import get_redis_client
 from app.storage.base import StorageInterface
 from app.tasks.base import BaseTaskRunner
+from app.tasks.executor import TaskExecutor, QueueFullError
+from app.tasks.distributed import DistributedJobQueue
 from app.tasks.runners import ChunkingTaskRunner
 
 # Map of task type names to task runner classes
@@ -14,3 +19,31 @@ def get_task_runner(task_type: str, storage: StorageInterface) -> BaseTaskRunner
     if task_type not in TASK_RUNNERS:
         raise ValueError(f"Unknown task type: {task_type}")
     return TASK_RUNNERS[task_type](storage)
+
+
+@lru_cache()
+def get_task_executor() -> TaskExecutor:
+    """Get the shared bounded task executor"""
+    return TaskExecutor(
+        max_workers=settings.MAX_CONCURRENT_TASKS,
+        max_queue_size=settings.TASK_QUEUE_MAX_SIZE,
+        strategy_limits=settings.strategy_concurrency_limits,
+        aging_rate=settings.SCHEDULER_AGING_RATE,
+        tenant_max_running=settings.TENANT_MAX_CONCURRENT_TASKS,
+        tenant_max_queued=settings.TENANT_QUEUE_MAX_SIZE,
+        heartbeat_interval=settings.TASK_HEARTBEAT_INTERVAL,
+    )
+
+
+@lru_cache()
+def get_job_queue() -> DistributedJobQueue:
+    """Get the Redis stream job queue used in distributed execution mode"""
+    return DistributedJobQueue(
+        get_redis_client(),
+        stream=settings.JOB_STREAM,
+        group=settings.JOB_CONSUMER_GROUP,
+        dead_letter_stream=settings.JOB_DEAD_LETTER_STREAM,
+        visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT,
+        max_deliveries=settings.JOB_MAX_DELIVERIES,
+        max_queue_size=settings.TASK_QUEUE_MAX_SIZE,
+    )
@@ -1,26 +1,100 @@
 import asyncio
+import os
+import socket
+import uuid
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from abc import ABC, abstractmethod
 
-from app.models import TaskResult, TaskStatus
+from app.models import FileStage, TaskResult, TaskStatus
 from app.storage.base import StorageInterface
+from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger("tasks.base")
 
+# Recorded as the owner of the tasks this process queues and runs
+LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def take_lease(task: TaskResult) -> None:
+    """Record this process as the holder of a task, as of now"""
+    task.owner = LEASE_OWNER
+    task.heartbeat_at = datetime.utcnow()
+
+
+def lease_expired(task: TaskResult, timeout: float, now: Optional[datetime] = None) -> bool:
+    """Check whether the holder of a task stopped renewing its lease more than timeout seconds ago"""
+    if task.heartbeat_at is None:
+        # Saved before tasks had leases
+        return True
+    return ((now or datetime.utcnow()) - task.heartbeat_at).total_seconds() > timeout
+
 
 class BaseTaskRunner(ABC):
     """Base class for task runners"""
     
+    # Minimum number of seconds between two progress saves of the same task
+    progress_save_interval = 1.0
+    
     def __init__(self, storage: StorageInterface):
         """Initialize with storage backend"""
         self.storage = storage
         logger.debug(f"Initialized {self.__class__.__name__} task runner")
-        self.task_timeout = 3600  # Default to 1 hour timeout
+        self.task_timeout = settings.TASK_TIMEOUT  # Seconds, 0 disables the deadline
+        self._progress_save = None
+    
+    def report_progress(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Record progress for one part of the running task
+        
+        Updates are applied to the task immediately and persisted at most once
+        per progress_save_interval, so chatty progress sources do not turn
+        into a storage write per update.
+        """
+        task = self.task_result
+        task.progress = {**(task.progress or {}), key: value}
+        if self._progress_save is None or self._progress_save.done():
+            self._progress_save = asyncio.get_running_loop().create_task(self._save_progress())
+    
+    def get_checkpoint(self, key: str) -> Dict[str, Any]:
+        """Get the last checkpoint recorded for one part of the task, or an empty dict"""
+        return dict((self.task_result.checkpoints or {}).get(key, {}))
+    
+    async def record_checkpoint(self, key: str, stage: FileStage, **data: Any) -> None:
+        """
+        Record that one part of the task has reached a stage
+        
+        Data recorded at earlier stages is kept unless overwritten.
+        Checkpoints are saved right away, so a task interrupted by a restart
+        can resume from them instead of starting over.
+        """
+        task = self.task_result
+        checkpoints = dict(task.checkpoints or {})
+        checkpoints[key] = {**checkpoints.get(key, {}), "stage": stage.value, **data}
+        task.checkpoints = checkpoints
+        await self.storage.save_task(task)
+    
+    async def renew_lease(self, task: TaskResult) -> None:
+        """Save a new heartbeat for a task held by this process, unless it has finished"""
+        if task.status.is_final:
+            return
+        take_lease(task)
+        await self.storage.save_task(task)
+    
+    async def _save_progress(self) -> None:
+        await asyncio.sleep(self.progress_save_interval)
+        if self.task_result.status == TaskStatus.RUNNING:
+            await self.storage.save_task(self.task_result)
     
     async def run_task(self, task: TaskResult, **kwargs) -> None:
-        """Run the task and update its status"""
+        """
+        Run the task and update its status
+
+        The task is stopped once it runs longer than task_timeout and marked
+        timed out. Cancelling the coroutine marks the task cancelled; in both
+        cases _execute is cancelled first, so it can stop its subprocesses.
+        """
         try:
             # Store task result as instance variable
             self.task_result = task
@@ -28,12 +102,22 @@ class BaseTaskRunner(ABC):
             # Update status to running
             task.status = TaskStatus.RUNNING
             task.started_at = datetime.utcnow()
+            take_lease(task)
             await self.storage.save_task(task)
             
             logger.info(f"Starting task {task.task_id} of type {task.task_type}")
             
-            # Execute the task
-            result = await self._execute(**kwargs)
+            # Execute the task within its deadline
+            deadline = asyncio.timeout(self.task_timeout or None)
+            try:
+                async with deadline:
+                    result = await self._execute(**kwargs)
+            except TimeoutError:
+                if not deadline.expired():
+                    raise
+                logger.error(f"Task {task.task_id} timed out after {self.task_timeout} seconds")
+                await self._finish(task, TaskStatus.TIMED_OUT, f"Task exceeded the {self.task_timeout} second timeout")
+                return
             
             # Update with success
             task.status = TaskStatus.COMPLETED
@@ -43,15 +127,23 @@ class BaseTaskRunner(ABC):
             
             logger.info(f"Task {task.task_id} completed successfully")
             
+        except asyncio.CancelledError:
+            logger.warning(f"Task {task.task_id} was cancelled")
+            await self._finish(task, TaskStatus.CANCELLED, "Task was cancelled")
+            raise
         except Exception as e:
             logger.error(f"Task {task.task_id} failed: {str(e)}")
             # Update with failure
-            task.status = TaskStatus.FAILED
-            task.completed_at = datetime.utcnow()
-            task.error = str(e)
-            await self.storage.save_task(task)
+            await self._finish(task, TaskStatus.FAILED, str(e))
             raise
     
+    async def _finish(self, task: TaskResult, status: TaskStatus, error: str) -> None:
+        """Record a task that stopped without a result"""
+        task.status = status
+        task.completed_at = datetime.utcnow()
+        task.error = error
+        await self.storage.save_task(task)
+    
     @abstractmethod
     async def _execute(self, **kwargs) -> Dict[str, Any]:
         """Execute the actual task logic"""
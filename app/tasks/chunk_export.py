@@ -0,0 +1,155 @@
+import gzip
+import importlib.util
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterator, List
+
+from app.core.logging import get_logger
+from app.tasks.chunk_index import INDEX_RECORD, NO_PAGE, READ_RECORDS, index_path
+
+logger = get_logger("tasks.chunk_export")
+
+# Export formats and the file name of their output in the task directory
+EXPORT_FORMATS: Dict[str, str] = {
+    "arrow": "chunks.arrow",
+    "parquet": "chunks.parquet",
+}
+BATCH_ROWS = 4096
+
+
+class ExportUnavailableError(RuntimeError):
+    """Raised when the columnar export libraries are not installed"""
+
+
+def check_export_available() -> None:
+    """
+    Check that pyarrow is installed, without importing it
+
+    Raises:
+        ExportUnavailableError: If pyarrow is not installed
+    """
+    if importlib.util.find_spec("pyarrow") is None:
+        raise ExportUnavailableError("Columnar chunk exports require the pyarrow package")
+
+
+def export_path(chunks_path: str, export_format: str) -> str:
+    """Path of the columnar export of a chunks file"""
+    return os.path.join(os.path.dirname(chunks_path), EXPORT_FORMATS[export_format])
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        pa.field("chunk_id", pa.int64(), nullable=False),
+        pa.field("document", pa.int32(), nullable=False),
+        pa.field("source", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("text", pa.large_string()),
+        # Every other chunk field, including the chunker's metadata, as JSON
+        pa.field("metadata", pa.large_string()),
+        pa.field("page_start", pa.int32()),
+        pa.field("page_end", pa.int32()),
+        # Location of the chunk's line in the JSON Lines chunks file, or in its
+        # document's gzip member when the chunks file is compressed
+        pa.field("byte_offset", pa.int64(), nullable=False),
+        pa.field("byte_length", pa.int32(), nullable=False),
+    ])
+
+
+def _iter_index(path: str) -> Iterator[tuple]:
+    with open(path, "rb") as f:
+        while data := f.read(INDEX_RECORD.size * READ_RECORDS):
+            yield from INDEX_RECORD.iter_unpack(data)
+
+
+def _iter_batches(chunks_path: str, offsets_path: str, schema) -> Iterator[Any]:
+    """Read chunks in order with their index records and yield record batches"""
+    import pyarrow as pa
+
+    with open(offsets_path) as f:
+        # Every batch shares one source dictionary, indexed by document number
+        sources = pa.array([document["source"] for document in json.load(f)["documents"]], pa.string())
+    opener = gzip.open if chunks_path.endswith(".gz") else open
+    names = [name for name in schema.names if name != "source"]
+
+    def to_batch(columns: Dict[str, List[Any]]):
+        arrays = {name: pa.array(columns[name], schema.field(name).type) for name in names}
+        arrays["source"] = pa.DictionaryArray.from_arrays(arrays["document"], sources)
+        return pa.RecordBatch.from_arrays([arrays[name] for name in schema.names], schema=schema)
+
+    columns: Dict[str, List[Any]] = {name: [] for name in names}
+    with opener(chunks_path, "rb") as chunks:
+        lines = (line for line in chunks if line.strip())
+        for chunk_id, ((offset, length, document, page_start, page_end), line) in enumerate(
+            zip(_iter_index(index_path(chunks_path)), lines)
+        ):
+            record = json.loads(line)
+            text = record.pop("text", None)
+            columns["chunk_id"].append(chunk_id)
+            columns["document"].append(document)
+            columns["text"].append(text)
+            columns["metadata"].append(json.dumps(record, ensure_ascii=False))
+            columns["page_start"].append(None if page_start == NO_PAGE else page_start)
+            columns["page_end"].append(None if page_end == NO_PAGE else page_end)
+            columns["byte_offset"].append(offset)
+            columns["byte_length"].append(length)
+            if len(columns["chunk_id"]) == BATCH_ROWS:
+                yield to_batch(columns)
+                columns = {name: [] for name in names}
+    if columns["chunk_id"]:
+        yield to_batch(columns)
+
+
+def export_chunks(chunks_path: str, offsets_path: str, export_format: str) -> str:
+    """
+    Write a chunks file in a columnar format next to it
+
+    "arrow" writes an Arrow IPC file that readers can memory-map, "parquet"
+    a compressed Parquet file. Chunks are converted in batches of BATCH_ROWS
+    rows, so memory use does not grow with the size of the chunks file.
+    Requires pyarrow.
+
+    Returns:
+        str: Path of the export
+
+    Raises:
+        ExportUnavailableError: If pyarrow is not installed
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailableError("Columnar chunk exports require the pyarrow package")
+
+    output_path = export_path(chunks_path, export_format)
+    # A file of its own per export, so concurrent exports of one task do not
+    # write to the same temporary file; the last one to finish wins
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(output_path)}.", suffix=".tmp", dir=os.path.dirname(output_path)
+    )
+    os.close(fd)
+    schema = _schema()
+    rows = 0
+    try:
+        if export_format == "arrow":
+            with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+                for batch in _iter_batches(chunks_path, offsets_path, schema):
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+        else:
+            with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+                for batch in _iter_batches(chunks_path, offsets_path, schema):
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    logger.info(f"Exported {rows} chunks to {output_path}")
+    return output_path
@@ -0,0 +1,165 @@
+import gzip
+import json
+import os
+import struct
+from typing import Any, Dict, IO, Iterator, List, Optional, Set, Tuple
+
+# One fixed-size record per chunk: byte offset and length of its JSON line,
+# document number, and first/last page (-1 when unknown). Offsets are into
+# the chunks file, or into the document's decompressed block for gzip output.
+INDEX_RECORD = struct.Struct("<QIIii")
+NO_PAGE = -1
+READ_RECORDS = 4096
+
+
+def index_path(chunks_path: str) -> str:
+    """Path of the per-chunk index of a chunks file"""
+    base = chunks_path[:-3] if chunks_path.endswith(".gz") else chunks_path
+    return os.path.splitext(base)[0] + ".index"
+
+
+def part_index_path(part_path: str) -> str:
+    """Path of the per-chunk index written next to a chunk part file"""
+    return f"{part_path}.index"
+
+
+def chunk_pages(record: Dict[str, Any]) -> Tuple[int, int]:
+    """Get the first and last page of a serialized chunk, or NO_PAGE when unknown"""
+    metadata = record.get("metadata") or {}
+    start = metadata.get("page_start", metadata.get("page", metadata.get("page_number")))
+    end = metadata.get("page_end", start)
+    if not isinstance(start, int):
+        return NO_PAGE, NO_PAGE
+    return start, end if isinstance(end, int) else start
+
+
+def pack_record(offset: int, length: int, document: int, pages: Tuple[int, int]) -> bytes:
+    return INDEX_RECORD.pack(offset, length, document, *pages)
+
+
+def iter_part_index(part_path: str) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Yield (offset, length, page_start, page_end) for every chunk of a part file
+
+    Uses the index written by the chunk pool worker. Parts restored from the
+    chunk cache have none, in which case the part is scanned instead.
+    """
+    sidecar = part_index_path(part_path)
+    if os.path.isfile(sidecar):
+        with open(sidecar, "rb") as f:
+            while data := f.read(INDEX_RECORD.size * READ_RECORDS):
+                for offset, length, _, page_start, page_end in INDEX_RECORD.iter_unpack(data):
+                    yield offset, length, page_start, page_end
+        return
+    offset = 0
+    with open(part_path, "rb") as f:
+        for line in f:
+            length = len(line.rstrip(b"\n"))
+            if length:
+                yield (offset, length, *chunk_pages(json.loads(line)))
+            offset += len(line)
+
+
+def _read_documents(offsets_path: str) -> List[Dict[str, Any]]:
+    try:
+        with open(offsets_path) as f:
+            return json.load(f)["documents"]
+    except FileNotFoundError:
+        return []
+
+
+def query_chunks(
+    chunks_path: str,
+    offsets_path: str,
+    cursor: int = 0,
+    limit: int = 100,
+    sources: Optional[Set[str]] = None,
+    page_from: Optional[int] = None,
+    page_to: Optional[int] = None,
+    chunk_ids: Optional[Set[int]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Read one page of chunks from a chunks file through its index
+
+    Chunks are numbered in output order, and that number is both their
+    chunk_id and the pagination cursor. Only the index records of candidate
+    chunks and the bytes of matching chunks are read. Documents still being
+    written are not visible until they are listed in the offsets sidecar.
+
+    Args:
+        sources: Only chunks of documents whose path or file name is listed
+        page_from: Only chunks ending on or after this page
+        page_to: Only chunks starting on or before this page
+        chunk_ids: Only chunks with these ids
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[int]]: The chunks, each with its
+        chunk_id and source, and the cursor of the next page or None
+    """
+    documents = _read_documents(offsets_path)
+    ranges = [
+        (document["first_chunk"], document["first_chunk"] + document["chunks"])
+        for document in documents
+        if not sources or document["source"] in sources or os.path.basename(document["source"]) in sources
+    ]
+    total = documents[-1]["first_chunk"] + documents[-1]["chunks"] if documents else 0
+    if chunk_ids is not None:
+        wanted = sorted(i for i in chunk_ids if i >= cursor and any(start <= i < end for start, end in ranges))
+        ranges = [(i, i + 1) for i in wanted]
+    ranges = [(max(start, cursor), end) for start, end in ranges if end > cursor]
+    page_filter = page_from is not None or page_to is not None
+
+    items: List[Tuple[int, Tuple[int, int, int, int, int]]] = []
+    next_cursor = None
+    with open(index_path(chunks_path), "rb") as index:
+        for start, end in ranges:
+            for seq, record in _read_index(index, start, min(end, total)):
+                if page_filter and not _overlaps(record[3], record[4], page_from, page_to):
+                    continue
+                if len(items) == limit:
+                    next_cursor = seq
+                    break
+                items.append((seq, record))
+            if next_cursor is not None:
+                break
+
+    compressed = chunks_path.endswith(".gz")
+    blocks: Dict[int, bytes] = {}
+    chunks = []
+    with open(chunks_path, "rb") as f:
+        for seq, (offset, length, document, _, _) in items:
+            if compressed:
+                if document not in blocks:
+                    blocks[document] = _read_block(f, documents[document])
+                data = blocks[document][offset:offset + length]
+            else:
+                f.seek(offset)
+                data = f.read(length)
+            chunks.append({"chunk_id": seq, "source": documents[document]["source"], "chunk": json.loads(data)})
+    return chunks, next_cursor
+
+
+def _read_index(index: IO[bytes], start: int, end: int) -> Iterator[Tuple[int, Tuple[int, int, int, int, int]]]:
+    seq = start
+    index.seek(start * INDEX_RECORD.size)
+    while seq < end:
+        data = index.read(INDEX_RECORD.size * min(READ_RECORDS, end - seq))
+        if not data:
+            return
+        for record in INDEX_RECORD.iter_unpack(data):
+            yield seq, record
+            seq += 1
+
+
+def _read_block(f: IO[bytes], document: Dict[str, Any]) -> bytes:
+    """Decompress the gzip member holding one document's chunks"""
+    f.seek(document["offset"])
+    return gzip.decompress(f.read(document["length"]))
+
+
+def _overlaps(page_start: int, page_end: int, page_from: Optional[int], page_to: Optional[int]) -> bool:
+    if page_start == NO_PAGE:
+        return False
+    if page_from is not None and page_end < page_from:
+        return False
+    return page_to is None or page_start <= page_to
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.logging import get_logger
+from app.parsers.sharding import PageLocator
+from app.tasks.chunk_index import chunk_pages, pack_record, part_index_path
+
+logger = get_logger("tasks.chunk_pool")
+
+# Constructor arguments for each chunking strategy. They are part of the
+# chunk cache key, so cached results never outlive a parameter change.
+CHUNKER_PARAMS: Dict[str, Dict[str, Any]] = {
+    "section_semantic": {},
+    "semantic": {},
+    "recursive_text": {"chunk_size": 1000, "chunk_overlap": 100},
+}
+
+
+def build_chunker(strategy: str, params: Dict[str, Any]):
+    """Create the chunker for a strategy"""
+    from ai_chunking import RecursiveTextSplitter, SectionBasedSemanticChunker, SemanticTextChunker
+
+    chunkers = {
+        "section_semantic": SectionBasedSemanticChunker,
+        "semantic": SemanticTextChunker,
+        "recursive_text": RecursiveTextSplitter,
+    }
+    if strategy not in chunkers:
+        raise ValueError(f"Unsupported chunking strategy: {strategy}")
+    return chunkers[strategy](**params)
+
+
+def _warm_worker() -> None:
+    """Pool initializer: import the chunking library once per worker process"""
+    import ai_chunking  # noqa: F401
+
+
+def _worker_pid() -> int:
+    return os.getpid()
+
+
+def _pid_path(output_path: str) -> str:
+    return f"{output_path}.pid"
+
+
+def _cancel_path(output_path: str) -> str:
+    return f"{output_path}.cancelled"
+
+
+def chunk_to_file(strategy: str, params: Dict[str, Any], file_paths: List[str], output_path: str) -> int:
+    """
+    Chunk documents and write the serialized chunks to output_path as JSON Lines
+
+    Runs inside a pool worker. Only the chunk count travels back to the
+    parent process; the chunks themselves are handed over through the file,
+    which is written one chunk per line as the chunks are serialized, along
+    with a per-chunk index of line offsets and pages.
+    The worker records its pid next to output_path so a cancelled job can
+    be killed, and skips jobs that were cancelled before they started.
+
+    Returns:
+        int: Number of chunks written
+    """
+    with open(_pid_path(output_path), "w") as f:
+        f.write(str(os.getpid()))
+    if os.path.exists(_cancel_path(output_path)):
+        return 0
+    chunker = build_chunker(strategy, params)
+    count = 0
+    offset = 0
+    tmp_path = f"{output_path}.tmp"
+    tmp_index_path = f"{part_index_path(output_path)}.tmp"
+    with open(tmp_path, "wb") as f, open(tmp_index_path, "wb") as index:
+        for file_path in file_paths:
+            # Documents parsed in page-range shards carry page provenance into their chunks
+            locator = PageLocator.for_document(file_path)
+            for chunk in chunker.chunk_documents([file_path]):
+                record = chunk.model_dump()
+                if locator is not None:
+                    locator.annotate([record])
+                line = json.dumps(record, ensure_ascii=False).encode("utf-8")
+                f.write(line)
+                f.write(b"\n")
+                index.write(pack_record(offset, len(line), 0, chunk_pages(record)))
+                offset += len(line) + 1
+                count += 1
+    os.replace(tmp_index_path, part_index_path(output_path))
+    os.replace(tmp_path, output_path)
+    return count
+
+
+class ChunkPool:
+    """
+    Process pool that runs chunking and serialization off the event loop
+
+    Workers are started ahead of time and import the chunking library in
+    their initializer, so the first task does not pay for the cold start.
+
+    A cancelled job that is already running is stopped by killing its worker
+    process. That breaks the whole pool, so the pool is restarted and jobs
+    that were running next to the killed one are resubmitted once.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, start_method: str = "spawn"):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Pools broken on purpose by killing a cancelled job's worker
+        self._killed_executors: List[ProcessPoolExecutor] = []
+
+    def start(self) -> None:
+        """Create the pool and pre-start every worker process"""
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_warm_worker,
+        )
+        # Submitting one job per worker forces all processes to spawn now
+        for _ in range(self.max_workers):
+            self._executor.submit(_worker_pid)
+        logger.info(f"Started chunk pool with {self.max_workers} workers ({self.start_method})")
+
+    async def chunk_to_file(
+        self,
+        strategy: str,
+        params: Dict[str, Any],
+        file_paths: List[str],
+        output_path: str,
+    ) -> int:
+        """Chunk documents in a pool worker and write the chunks to output_path"""
+        job = partial(chunk_to_file, strategy, params, file_paths, output_path)
+        for attempt in range(2):
+            self.start()
+            executor = self._executor
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, job)
+            except BrokenProcessPool:
+                if self._executor is executor:
+                    if executor not in self._killed_executors:
+                        logger.error("Chunk pool worker died, restarting the pool")
+                    self.restart()
+                # Only retry when the pool was broken by a cancellation, never
+                # after a crash that the same job could cause again
+                if attempt or executor not in self._killed_executors:
+                    raise
+                logger.info(f"Resubmitting chunking of {output_path} after a cancelled job broke the pool")
+            except asyncio.CancelledError:
+                self._kill_job(executor, output_path)
+                raise
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a CPU-bound function in a pool worker"""
+        self.start()
+        executor = self._executor
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, partial(fn, *args))
+        except BrokenProcessPool:
+            if self._executor is executor:
+                logger.error("Chunk pool worker died, restarting the pool")
+                self.restart()
+            raise
+
+    def _kill_job(self, executor: ProcessPoolExecutor, output_path: str) -> None:
+        """Stop a cancelled job, killing its worker process if it already started"""
+        # The worker writes its pid before checking the cancel marker, and the
+        # marker is written here before reading the pid, so either the worker
+        # skips the job or its pid is found
+        open(_cancel_path(output_path), "w").close()
+        try:
+            with open(_pid_path(output_path)) as f:
+                pid = int(f.read())
+        except (OSError, ValueError):
+            return
+        if executor is not self._executor or pid not in (executor._processes or {}):
+            return
+        logger.warning(f"Killing chunk pool worker {pid} running a cancelled job")
+        self._killed_executors = self._killed_executors[-7:] + [executor]
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def restart(self) -> None:
+        """Replace a broken pool with a fresh one"""
+        self.shutdown(wait=False)
+        self.start()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,135 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, IO, List, Optional
+
+from app.core.logging import get_logger
+from app.tasks.chunk_index import index_path, iter_part_index, pack_record
+
+logger = get_logger("tasks.chunk_writer")
+
+COPY_SIZE = 1024 * 1024
+
+
+class ChunksFileWriter:
+    """
+    Builds a task's chunks file from per-document part files
+
+    Each part is a JSON Lines file written by a chunk pool worker, one chunk
+    per line. Parts are copied into the output in blocks as soon as they are
+    handed over, so chunks are never parsed again in the parent process.
+    With gzip compression every document becomes its own gzip member, which
+    keeps the whole file a valid gzip stream while each document can still
+    be decompressed on its own.
+
+    The output is written at its final path and flushed after every
+    document, and an offsets sidecar records where each document's chunks
+    start, so finished documents can be read while the task is running.
+    A fixed-size record per chunk is appended to the chunk index, so single
+    chunks can be located without reading the chunks file.
+    Part files are left in place, so an interrupted task can rebuild the
+    output from them.
+    """
+
+    def __init__(self, output_path: str, compression: Optional[str] = None):
+        if compression not in (None, "gzip"):
+            raise ValueError(f"Unsupported chunks compression: {compression}")
+        self.output_path = output_path
+        self.compression = compression
+        self.offsets_path = offsets_path(output_path)
+        self.index_path = index_path(output_path)
+        self.documents: List[Dict[str, Any]] = []
+        self._file: Optional[IO[bytes]] = None
+        self._index: Optional[IO[bytes]] = None
+
+    @property
+    def parts_written(self) -> int:
+        return len(self.documents)
+
+    @property
+    def chunks_written(self) -> int:
+        return sum(document["chunks"] for document in self.documents)
+
+    def open(self) -> None:
+        """Start a new, empty chunks file"""
+        self._file = open(self.output_path, "wb")
+        self._index = open(self.index_path, "wb")
+        self.documents = []
+        self._write_offsets(complete=False)
+
+    def append_part(self, part_path: str, source: Optional[str] = None) -> None:
+        """Append the chunks of one document, recording its offset under source"""
+        offset = self._file.tell()
+        with open(part_path, "rb") as src:
+            if self.compression == "gzip":
+                with gzip.GzipFile(fileobj=self._file, mode="wb") as dst:
+                    _copy_lines(src, dst)
+            else:
+                _copy_lines(src, self._file)
+        self._file.flush()
+        
+        # Index offsets point into the file, or into the document's gzip member
+        base = 0 if self.compression == "gzip" else offset
+        document = len(self.documents)
+        chunks = 0
+        for chunk_offset, length, page_start, page_end in iter_part_index(part_path):
+            self._index.write(pack_record(base + chunk_offset, length, document, (page_start, page_end)))
+            chunks += 1
+        self._index.flush()
+        
+        self.documents.append({
+            "source": source or part_path,
+            "offset": offset,
+            "length": self._file.tell() - offset,
+            "first_chunk": self.chunks_written,
+            "chunks": chunks,
+        })
+        self._write_offsets(complete=False)
+
+    def close(self) -> None:
+        """Finish the chunks file and mark it complete in the offsets sidecar"""
+        self._file.close()
+        self._file = None
+        self._index.close()
+        self._index = None
+        self._write_offsets(complete=True)
+        logger.debug(f"Wrote {self.chunks_written} chunks from {self.parts_written} documents to {self.output_path}")
+
+    def abort(self) -> None:
+        """Discard a partially written chunks file"""
+        for handle in (self._file, self._index):
+            if handle is not None:
+                handle.close()
+        self._file = None
+        self._index = None
+        for path in (self.output_path, self.offsets_path, self.index_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _write_offsets(self, complete: bool) -> None:
+        """Replace the offsets sidecar so readers never see it half written"""
+        tmp_path = f"{self.offsets_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "format": "jsonl",
+                "compression": self.compression,
+                "complete": complete,
+                "documents": self.documents,
+            }, f)
+        os.replace(tmp_path, self.offsets_path)
+
+
+def offsets_path(chunks_path: str) -> str:
+    """Path of the sidecar recording where each document starts in a chunks file"""
+    base = chunks_path[:-3] if chunks_path.endswith(".gz") else chunks_path
+    return os.path.splitext(base)[0] + ".offsets.json"
+
+
+def _copy_lines(src: IO[bytes], dst: IO[bytes]) -> None:
+    """Copy a JSON Lines file in blocks, terminating its last line"""
+    last = b"\n"
+    while block := src.read(COPY_SIZE):
+        dst.write(block)
+        last = block[-1:]
+    if last != b"\n":
+        dst.write(b"\n")
@@ -0,0 +1,42 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+# Rough seconds of work per unit, used only to order the task queue. The
+# absolute values matter less than their ratios.
+PDF_PAGE_PARSE_COST = 2.0
+PDF_PAGE_CHUNK_COST = 0.2
+TEXT_MIB_CHUNK_COST = 1.0
+FILE_OVERHEAD_COST = 0.5
+# Bytes per page assumed when the page count of a PDF cannot be read
+ESTIMATED_PDF_PAGE_BYTES = 100 * 1024
+
+# Chunking cost multipliers; embedding-based strategies are the slow ones
+STRATEGY_COST_FACTORS: Dict[str, float] = {
+    "recursive_text": 1.0,
+    "semantic": 4.0,
+    "section_semantic": 4.0,
+}
+DEFAULT_STRATEGY_COST_FACTOR = 4.0
+
+
+@dataclass
+class FileCostInput:
+    """What is known about an uploaded file when its task is queued"""
+    path: str
+    size: int
+    page_count: Optional[int] = None
+
+
+def estimate_file_cost(file: FileCostInput, strategy: str) -> float:
+    """Estimate the seconds needed to parse and chunk one file"""
+    factor = STRATEGY_COST_FACTORS.get(strategy, DEFAULT_STRATEGY_COST_FACTOR)
+    if os.path.splitext(file.path)[1].lower() == ".pdf":
+        pages = file.page_count or max(1, file.size // ESTIMATED_PDF_PAGE_BYTES)
+        return FILE_OVERHEAD_COST + pages * (PDF_PAGE_PARSE_COST + factor * PDF_PAGE_CHUNK_COST)
+    return FILE_OVERHEAD_COST + factor * TEXT_MIB_CHUNK_COST * file.size / (1024 * 1024)
+
+
+def estimate_task_cost(files: Iterable[FileCostInput], strategy: str) -> float:
+    """Estimate the seconds needed to run a chunking task over all of its files"""
+    return sum(estimate_file_cost(file, strategy) for file in files)
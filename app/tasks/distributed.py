@@ -0,0 +1,375 @@
+import asyncio
+import json
+import math
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+from app.core.logging import get_logger
+from app.models import TaskStatus
+from app.storage.base import StorageInterface
+from app.tasks.executor import QueueFullError
+
+logger = get_logger("tasks.distributed")
+
+
+@dataclass
+class JobDelivery:
+    """A job claimed by a worker from the job stream"""
+    message_id: str
+    job: Optional[Dict[str, Any]]
+    deliveries: int
+
+
+class DistributedJobQueue:
+    """
+    Job queue on a Redis stream shared by the API and any number of workers
+
+    Workers read jobs through a consumer group. A claimed job stays in the
+    group's pending list until it is acknowledged; if its worker stops
+    sending heartbeats for ``visibility_timeout`` seconds the job is handed
+    to another worker. Jobs delivered more than ``max_deliveries`` times are
+    moved to a dead-letter stream. Acknowledged jobs are deleted from the
+    stream, so the stream length is the number of unfinished jobs.
+    Cancellation requests are flags in Redis that the workers poll.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        stream: str = "chunking:jobs",
+        group: str = "chunking-workers",
+        dead_letter_stream: str = "chunking:jobs:dead",
+        visibility_timeout: float = 300.0,
+        max_deliveries: int = 3,
+        max_queue_size: int = 0,
+        default_task_duration: float = 30.0,
+        cancel_ttl: int = 24 * 3600,
+    ):
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.dead_letter_stream = dead_letter_stream
+        self.visibility_timeout = visibility_timeout
+        self.max_deliveries = max_deliveries
+        self.max_queue_size = max_queue_size
+        self.default_task_duration = default_task_duration
+        self.cancel_ttl = cancel_ttl
+        self._group_ready = False
+
+    async def ensure_group(self) -> None:
+        """Create the stream and consumer group if they do not exist yet"""
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            logger.info(f"Created consumer group {self.group} on {self.stream}")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def depth(self) -> int:
+        """Number of unfinished jobs, queued or running"""
+        return await self.redis.xlen(self.stream)
+
+    async def is_full(self) -> bool:
+        """Check whether a new job would be rejected"""
+        return self.max_queue_size > 0 and await self.depth() >= self.max_queue_size
+
+    async def live_consumers(self) -> int:
+        """
+        Number of consumers that read or renewed a job within the visibility timeout
+
+        Consumers of stopped workers stay in the group, so they are told
+        apart by their idle time.
+        """
+        await self.ensure_group()
+        consumers = await self.redis.xinfo_consumers(self.stream, self.group)
+        return sum(1 for consumer in consumers if consumer["idle"] < self.visibility_timeout * 1000)
+
+    async def retry_after(self) -> int:
+        """Estimate the number of seconds until a queue slot frees up"""
+        waves = (await self.depth() + 1) / max(await self.live_consumers(), 1)
+        return max(1, min(3600, math.ceil(waves * self.default_task_duration)))
+
+    async def enqueue(self, job: Dict[str, Any]) -> int:
+        """
+        Add a job to the stream
+
+        Args:
+            job: JSON-serializable job description, including its task_id
+
+        Returns:
+            int: Number of unfinished jobs, including this one
+
+        Raises:
+            QueueFullError: If the queue is full
+        """
+        await self.ensure_group()
+        if await self.is_full():
+            raise QueueFullError(await self.retry_after())
+        message_id = await self.redis.xadd(self.stream, {"payload": json.dumps(job)})
+        logger.debug(f"Enqueued job {_decode(message_id)} for task {job.get('task_id')}")
+        return await self.depth()
+
+    async def claim(self, consumer: str, block_ms: int = 5000) -> Optional[JobDelivery]:
+        """
+        Claim the next job for a consumer
+
+        Jobs abandoned by another worker are reclaimed first, then new jobs
+        are read, waiting up to block_ms for one to arrive.
+
+        Returns:
+            Optional[JobDelivery]: The claimed job, or None if there was none
+        """
+        await self.ensure_group()
+        reclaimed = await self.redis.xautoclaim(
+            self.stream,
+            self.group,
+            consumer,
+            min_idle_time=int(self.visibility_timeout * 1000),
+            start_id="0-0",
+            count=1,
+        )
+        for message_id, fields in reclaimed[1]:
+            if fields is None:
+                continue
+            deliveries = await self._delivery_count(message_id)
+            logger.warning(f"Reclaimed job {_decode(message_id)} for {consumer} (delivery {deliveries})")
+            return JobDelivery(_decode(message_id), _decode_job(fields), deliveries)
+
+        response = await self.redis.xreadgroup(
+            self.group, consumer, {self.stream: ">"}, count=1, block=block_ms
+        )
+        for _, messages in response or []:
+            for message_id, fields in messages:
+                return JobDelivery(_decode(message_id), _decode_job(fields), 1)
+        return None
+
+    async def _delivery_count(self, message_id: Any) -> int:
+        entries = await self.redis.xpending_range(
+            self.stream, self.group, min=message_id, max=message_id, count=1
+        )
+        return entries[0]["times_delivered"] if entries else 1
+
+    async def heartbeat(self, message_id: str, consumer: str) -> None:
+        """Reset the idle time of a claimed job so it is not handed to another worker"""
+        # JUSTID claims do not count as a delivery
+        await self.redis.xclaim(
+            self.stream, self.group, consumer, min_idle_time=0, message_ids=[message_id], justid=True
+        )
+
+    async def ack(self, message_id: str) -> None:
+        """Mark a job as finished and remove it from the stream"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xack(self.stream, self.group, message_id)
+            pipe.xdel(self.stream, message_id)
+            await pipe.execute()
+
+    async def dead_letter(self, delivery: JobDelivery, reason: str) -> None:
+        """Move a job to the dead-letter stream"""
+        entry = {
+            "payload": json.dumps(delivery.job),
+            "message_id": delivery.message_id,
+            "deliveries": delivery.deliveries,
+            "reason": reason,
+            "failed_at": time.time(),
+        }
+        await self.redis.xadd(self.dead_letter_stream, entry)
+        await self.ack(delivery.message_id)
+        logger.error(f"Dead-lettered job {delivery.message_id}: {reason}")
+
+    def _cancel_key(self, task_id: str) -> str:
+        return f"{self.stream}:cancel:{task_id}"
+
+    async def request_cancel(self, task_id: str) -> None:
+        """Ask whichever worker holds the task to stop it"""
+        await self.redis.set(self._cancel_key(task_id), 1, ex=self.cancel_ttl)
+        logger.info(f"Requested cancellation of task {task_id}")
+
+    async def is_cancel_requested(self, task_id: str) -> bool:
+        """Check whether the task has been cancelled"""
+        return bool(await self.redis.exists(self._cancel_key(task_id)))
+
+    async def queue_position(self, task_id: str) -> Optional[int]:
+        """Get the 1-based position of a job that no worker has claimed yet"""
+        await self.ensure_group()
+        last_delivered = "0-0"
+        for group in await self.redis.xinfo_groups(self.stream):
+            if _decode(group["name"]) == self.group:
+                last_delivered = _decode(group["last-delivered-id"])
+        entries = await self.redis.xrange(
+            self.stream, min=f"({last_delivered}", max="+", count=self.max_queue_size or 1000
+        )
+        for index, (_, fields) in enumerate(entries):
+            job = _decode_job(fields)
+            if job is not None and job.get("task_id") == task_id:
+                return index + 1
+        return None
+
+    async def stats(self) -> Dict[str, Any]:
+        """Get stream, consumer and dead-letter counts"""
+        await self.ensure_group()
+        group_info: Dict[str, Any] = {}
+        for group in await self.redis.xinfo_groups(self.stream):
+            if _decode(group["name"]) == self.group:
+                group_info = group
+        return {
+            "mode": "distributed",
+            "stream": self.stream,
+            "unfinished": await self.depth(),
+            "claimed": group_info.get("pending", 0),
+            "consumers": group_info.get("consumers", 0),
+            "dead_letters": await self.redis.xlen(self.dead_letter_stream),
+            "max_queue_size": self.max_queue_size,
+        }
+
+
+class DistributedWorker:
+    """
+    Worker process side of the distributed queue
+
+    Runs ``concurrency`` consumer slots. Each slot claims a job, runs the
+    task runner for it while sending heartbeats, and acknowledges the job
+    once the task has reached a final state. Running tasks are checked for
+    cancellation every ``cancel_poll_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        queue: DistributedJobQueue,
+        storage: StorageInterface,
+        concurrency: int = 1,
+        heartbeat_interval: float = 30.0,
+        consumer_name: Optional[str] = None,
+        block_ms: int = 5000,
+        cancel_poll_interval: float = 1.0,
+    ):
+        self.queue = queue
+        self.storage = storage
+        self.concurrency = concurrency
+        self.heartbeat_interval = heartbeat_interval
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.block_ms = block_ms
+        self.cancel_poll_interval = cancel_poll_interval
+        self.jobs_processed = 0
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Finish the running jobs and stop claiming new ones"""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Serve jobs until stop() is called"""
+        await self.queue.ensure_group()
+        logger.info(f"Worker {self.consumer_name} serving {self.queue.stream} with {self.concurrency} slots")
+        await asyncio.gather(*(self._slot(index) for index in range(self.concurrency)))
+        logger.info(f"Worker {self.consumer_name} stopped after {self.jobs_processed} jobs")
+
+    async def _slot(self, index: int) -> None:
+        consumer = f"{self.consumer_name}-{index}"
+        while not self._stopping.is_set():
+            try:
+                delivery = await self.queue.claim(consumer, block_ms=self.block_ms)
+            except Exception as e:
+                logger.error(f"Consumer {consumer} failed to claim a job: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+            if delivery is None:
+                continue
+            try:
+                await self._handle(delivery, consumer)
+            except Exception as e:
+                # The job stays pending and is reclaimed once its visibility timeout passes
+                logger.error(f"Consumer {consumer} failed to handle job {delivery.message_id}: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def _handle(self, delivery: JobDelivery, consumer: str) -> None:
+        job = delivery.job
+        if job is None:
+            await self.queue.dead_letter(delivery, "unreadable job payload")
+            return
+        task_id = job.get("task_id")
+        if delivery.deliveries > self.queue.max_deliveries:
+            await self._fail_task(task_id, "Task was abandoned by its workers too many times")
+            await self.queue.dead_letter(delivery, f"delivered {delivery.deliveries} times")
+            return
+
+        task = await self.storage.get_task(task_id)
+        if task is None:
+            await self.queue.dead_letter(delivery, f"task {task_id} not found")
+            return
+        if task.status.is_final:
+            # Finished by a previous delivery that did not get to acknowledge
+            # it, or cancelled while it was queued
+            await self.queue.ack(delivery.message_id)
+            return
+
+        from app.tasks import get_task_runner
+
+        loop = asyncio.get_running_loop()
+        runner = get_task_runner(job["task_type"], self.storage)
+        execution = loop.create_task(runner.run_task(task, **job.get("kwargs", {})))
+        heartbeat = loop.create_task(self._heartbeat(delivery.message_id, consumer))
+        cancel_watch = loop.create_task(self._watch_cancel(task_id, execution))
+        try:
+            await execution
+        except asyncio.CancelledError:
+            if not execution.cancelled() or asyncio.current_task().cancelling():
+                raise
+            logger.info(f"Task {task_id} cancelled on {consumer}")
+        except Exception as e:
+            # The runner has already recorded the failure on the task
+            logger.error(f"Task {task_id} failed on {consumer}: {str(e)}")
+        finally:
+            heartbeat.cancel()
+            cancel_watch.cancel()
+        await self.queue.ack(delivery.message_id)
+        self.jobs_processed += 1
+
+    async def _heartbeat(self, message_id: str, consumer: str) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.queue.heartbeat(message_id, consumer)
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {message_id} failed: {str(e)}")
+
+    async def _watch_cancel(self, task_id: str, execution: asyncio.Task) -> None:
+        """Cancel the task runner once a cancellation is requested for its task"""
+        while True:
+            try:
+                if await self.queue.is_cancel_requested(task_id):
+                    execution.cancel()
+                    return
+            except Exception as e:
+                logger.warning(f"Cancellation check for task {task_id} failed: {str(e)}")
+            await asyncio.sleep(self.cancel_poll_interval)
+
+    async def _fail_task(self, task_id: Optional[str], error: str) -> None:
+        task = await self.storage.get_task(task_id) if task_id else None
+        if task is None:
+            return
+        task.status = TaskStatus.FAILED
+        task.completed_at = datetime.utcnow()
+        task.error = error
+        await self.storage.save_task(task)
+
+
+def _decode(value: Any) -> Any:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _decode_job(fields: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+    payload = fields.get(b"payload", fields.get("payload"))
+    try:
+        return json.loads(_decode(payload))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,331 @@
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.core.logging import get_logger
+
+logger = get_logger("tasks.executor")
+
+
+# Priority classes, as a head start in estimated seconds of task cost
+PRIORITY_OFFSETS: Dict[str, float] = {
+    "high": -600.0,
+    "normal": 0.0,
+    "low": 600.0,
+}
+DEFAULT_PRIORITY = "normal"
+DEFAULT_TENANT = "anonymous"
+
+
+class QueueFullError(Exception):
+    """Raised when a task is submitted while the executor queue is full"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Task queue is full, retry after {retry_after} seconds")
+
+
+@dataclass
+class QueuedJob:
+    """A task waiting for a worker slot"""
+    task_id: str
+    strategy: str
+    run: Callable[[], Awaitable[None]]
+    cost: float = 0.0
+    priority: str = DEFAULT_PRIORITY
+    tenant: str = DEFAULT_TENANT
+    enqueued_at: float = field(default_factory=time.monotonic)
+    execution: Optional[asyncio.Task] = None
+    # Renews the task's lease in storage while the executor holds the job
+    heartbeat: Optional[Callable[[], Awaitable[None]]] = None
+
+    def score(self, now: float, aging_rate: float) -> float:
+        """Scheduling score; the lowest score runs first"""
+        return self.cost + PRIORITY_OFFSETS[self.priority] - aging_rate * (now - self.enqueued_at)
+
+
+class TaskExecutor:
+    """
+    Bounded executor for task runners
+
+    Jobs wait in a bounded queue and are run by a fixed number of worker
+    coroutines. Each job has a score: its estimated cost, shifted by its
+    priority class and reduced by ``aging_rate`` for every second it has
+    waited, so cheap jobs overtake expensive ones without starving them.
+    A free worker takes a job from the priority class of the lowest-scoring
+    job. Within that class tenants take turns: the tenant whose last job
+    started longest ago goes first, with its lowest-scoring job, so one
+    tenant's backlog does not hold up the others.
+
+    A strategy can be given a lower concurrency limit than the global one,
+    and a tenant can be limited in how many jobs it runs and queues at
+    once, in which case their jobs wait while others keep running.
+    Submissions are rejected with QueueFullError once the queue is full,
+    along with an estimate of when capacity frees up. Queued and running
+    jobs can be cancelled; a running job's slot is freed once its
+    cancellation has finished cleaning up. Every ``heartbeat_interval``
+    seconds the heartbeat of each queued and running job is called, so
+    other processes can tell the job is still held.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue_size: int,
+        strategy_limits: Optional[Dict[str, int]] = None,
+        default_task_duration: float = 30.0,
+        aging_rate: float = 1.0,
+        tenant_max_running: int = 0,
+        tenant_max_queued: int = 0,
+        heartbeat_interval: float = 30.0,
+    ):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.strategy_limits = strategy_limits or {}
+        self.aging_rate = aging_rate
+        self.tenant_max_running = tenant_max_running
+        self.tenant_max_queued = tenant_max_queued
+        self.heartbeat_interval = heartbeat_interval
+        self._pending: List[QueuedJob] = []
+        self._running: Dict[str, QueuedJob] = {}
+        self._running_per_strategy: Dict[str, int] = {}
+        self._running_per_tenant: Dict[str, int] = {}
+        # Turn in which each tenant with queued or running jobs last started one
+        self._last_turn: Dict[str, int] = {}
+        self._turn = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._workers: List[asyncio.Task] = []
+        self._heartbeats: Optional[asyncio.Task] = None
+        # Exponentially weighted average of task durations, used for Retry-After
+        self._avg_duration = default_task_duration
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker slot"""
+        return len(self._pending)
+
+    @property
+    def running_count(self) -> int:
+        """Number of jobs currently running"""
+        return len(self._running)
+
+    def is_full(self, tenant: Optional[str] = None) -> bool:
+        """Check whether a new submission, optionally from a given tenant, would be rejected"""
+        if self.max_queue_size > 0 and len(self._pending) >= self.max_queue_size:
+            return True
+        if tenant is not None and self.tenant_max_queued > 0:
+            queued = sum(1 for job in self._pending if job.tenant == tenant)
+            return queued >= self.tenant_max_queued
+        return False
+
+    def retry_after(self) -> int:
+        """Estimate the number of seconds until a queue slot frees up"""
+        waves = (len(self._pending) + 1) / max(self.max_workers, 1)
+        return max(1, min(3600, math.ceil(waves * self._avg_duration)))
+
+    def _pick(self, jobs: List[QueuedJob], last_turn: Dict[str, int], now: float) -> Optional[QueuedJob]:
+        """Pick the next job: the tenant waiting longest for its turn within the best priority class"""
+        if not jobs:
+            return None
+        scores = {id(job): job.score(now, self.aging_rate) for job in jobs}
+        best = min(jobs, key=lambda job: scores[id(job)])
+        return min(
+            (job for job in jobs if job.priority == best.priority),
+            key=lambda job: (last_turn.get(job.tenant, -1), scores[id(job)])
+        )
+
+    def _ordered_pending(self) -> List[QueuedJob]:
+        """Queued jobs in the order they would be picked right now, ignoring concurrency limits"""
+        now = time.monotonic()
+        remaining = list(self._pending)
+        last_turn = dict(self._last_turn)
+        ordered = []
+        for turn in range(self._turn + 1, self._turn + 1 + len(remaining)):
+            job = self._pick(remaining, last_turn, now)
+            remaining.remove(job)
+            ordered.append(job)
+            last_turn[job.tenant] = turn
+        return ordered
+
+    def queue_position(self, task_id: str) -> Optional[int]:
+        """Get the 1-based position of a queued task, or None if it is not queued"""
+        for index, job in enumerate(self._ordered_pending()):
+            if job.task_id == task_id:
+                return index + 1
+        return None
+
+    def holds(self, task_id: str) -> bool:
+        """Check whether a task is queued or running on this executor"""
+        return task_id in self._running or any(job.task_id == task_id for job in self._pending)
+
+    def stats(self) -> Dict[str, object]:
+        """Get queue and worker utilization"""
+        return {
+            "max_workers": self.max_workers,
+            "running": len(self._running),
+            "queued": len(self._pending),
+            "max_queue_size": self.max_queue_size,
+            "running_per_strategy": dict(self._running_per_strategy),
+            "running_per_tenant": {tenant: count for tenant, count in self._running_per_tenant.items() if count},
+            "avg_task_duration": round(self._avg_duration, 3),
+        }
+
+    def submit(
+        self,
+        task_id: str,
+        strategy: str,
+        run: Callable[[], Awaitable[None]],
+        cost: float = 0.0,
+        priority: str = DEFAULT_PRIORITY,
+        tenant: str = DEFAULT_TENANT,
+        heartbeat: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> int:
+        """
+        Queue a job for execution
+
+        Args:
+            task_id: ID of the task
+            strategy: Chunking strategy, used for per-strategy worker limits
+            run: Coroutine function that runs the task
+            cost: Estimated duration of the task in seconds
+            priority: Priority class, one of PRIORITY_OFFSETS
+            tenant: Submitting tenant, used for per-tenant limits
+            heartbeat: Coroutine function renewing the task's lease
+
+        Returns:
+            int: Position of the job in the queue
+
+        Raises:
+            QueueFullError: If the queue is full
+        """
+        if priority not in PRIORITY_OFFSETS:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if self.is_full(tenant):
+            raise QueueFullError(self.retry_after())
+        self._ensure_started()
+        self._pending.append(QueuedJob(
+            task_id=task_id, strategy=strategy, run=run, cost=cost, priority=priority, tenant=tenant,
+            heartbeat=heartbeat
+        ))
+        self._notify()
+        logger.debug(f"Queued task {task_id} (cost {cost:.1f}s, {priority}, depth {len(self._pending)})")
+        return self.queue_position(task_id)
+
+    async def cancel(self, task_id: str) -> Optional[str]:
+        """
+        Cancel a queued or running job
+
+        A queued job is dropped from the queue. A running job is cancelled
+        and awaited, so its subprocesses have been stopped by the time this
+        returns.
+
+        Returns:
+            Optional[str]: "queued" or "running" depending on where the job
+            was found, or None if the executor does not know the task
+        """
+        for job in self._pending:
+            if job.task_id == task_id:
+                self._pending.remove(job)
+                logger.info(f"Cancelled queued task {task_id}")
+                return "queued"
+        job = self._running.get(task_id)
+        if job is None or job.execution is None:
+            return None
+        job.execution.cancel()
+        await asyncio.wait([job.execution])
+        logger.info(f"Cancelled running task {task_id}")
+        return "running"
+
+    def _notify(self) -> None:
+        asyncio.get_running_loop().create_task(self._notify_workers())
+
+    async def _notify_workers(self) -> None:
+        async with self._condition:
+            self._condition.notify_all()
+
+    def _ensure_started(self) -> None:
+        """Start the worker coroutines on the running event loop"""
+        if self._workers:
+            return
+        self._condition = asyncio.Condition()
+        loop = asyncio.get_running_loop()
+        self._workers = [
+            loop.create_task(self._worker(index)) for index in range(self.max_workers)
+        ]
+        self._heartbeats = loop.create_task(self._send_heartbeats())
+        logger.info(f"Started task executor with {self.max_workers} workers")
+
+    def _has_capacity(self, job: QueuedJob) -> bool:
+        limit = self.strategy_limits.get(job.strategy)
+        if limit is not None and self._running_per_strategy.get(job.strategy, 0) >= limit:
+            return False
+        return not self.tenant_max_running or self._running_per_tenant.get(job.tenant, 0) < self.tenant_max_running
+
+    def _next_runnable(self) -> Optional[QueuedJob]:
+        """Pick the next queued job among those whose strategy and tenant have a free slot"""
+        runnable = [job for job in self._pending if self._has_capacity(job)]
+        return self._pick(runnable, self._last_turn, time.monotonic())
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            async with self._condition:
+                job = self._next_runnable()
+                while job is None:
+                    await self._condition.wait()
+                    job = self._next_runnable()
+                self._pending.remove(job)
+                self._turn += 1
+                self._last_turn[job.tenant] = self._turn
+                self._running[job.task_id] = job
+                self._running_per_strategy[job.strategy] = self._running_per_strategy.get(job.strategy, 0) + 1
+                self._running_per_tenant[job.tenant] = self._running_per_tenant.get(job.tenant, 0) + 1
+
+            started = time.monotonic()
+            logger.debug(f"Worker {index} running task {job.task_id}")
+            job.execution = asyncio.get_running_loop().create_task(job.run())
+            try:
+                await job.execution
+            except asyncio.CancelledError:
+                # A cancelled job frees its slot; a cancelled worker stops
+                if not job.execution.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            except Exception as e:
+                logger.error(f"Task {job.task_id} raised in worker {index}: {str(e)}")
+            finally:
+                duration = time.monotonic() - started
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+                async with self._condition:
+                    self._running.pop(job.task_id, None)
+                    self._running_per_strategy[job.strategy] -= 1
+                    self._running_per_tenant[job.tenant] -= 1
+                    if not self._running_per_tenant[job.tenant] and not any(
+                        queued.tenant == job.tenant for queued in self._pending
+                    ):
+                        # An idle tenant's next job starts with a fresh turn
+                        del self._last_turn[job.tenant]
+                    self._condition.notify_all()
+
+    async def _send_heartbeats(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            for job in [*self._pending, *self._running.values()]:
+                # Skip jobs cancelled or finished during an earlier heartbeat
+                if job.heartbeat is None or not self.holds(job.task_id):
+                    continue
+                try:
+                    await job.heartbeat()
+                except Exception as e:
+                    logger.warning(f"Failed to send heartbeat for task {job.task_id}: {str(e)}")
+
+    async def shutdown(self) -> None:
+        """Stop the worker coroutines; queued jobs are dropped"""
+        background = [*self._workers, *([self._heartbeats] if self._heartbeats else [])]
+        for worker in background:
+            worker.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        self._workers = []
+        self._heartbeats = None
+        logger.info(f"Task executor stopped, dropped {len(self._pending)} queued tasks")
+        self._pending.clear()
@@ -0,0 +1,96 @@
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from app.core.logging import get_logger
+from app.models import TaskResult, TaskStatus
+from app.storage.base import StorageInterface, TaskFilter
+from app.tasks.base import lease_expired, take_lease
+from app.tasks.executor import DEFAULT_PRIORITY, DEFAULT_TENANT, QueueFullError, TaskExecutor
+
+logger = get_logger("tasks.recovery")
+
+
+def _task_kwargs(task: TaskResult) -> Optional[Dict[str, Any]]:
+    """Rebuild the runner arguments of a task from what was stored when it was created"""
+    result = task.result or {}
+    if "saved_files" not in result or "strategy" not in result:
+        return None
+    file_hashes = {
+        path: checkpoint["sha256"]
+        for path, checkpoint in (task.checkpoints or {}).items()
+        if checkpoint.get("sha256")
+    }
+    return {
+        "files": result["saved_files"],
+        "strategy": result["strategy"],
+        "file_hashes": file_hashes,
+        "export_format": result.get("export_format"),
+    }
+
+
+async def _fail(storage: StorageInterface, task: TaskResult, error: str) -> None:
+    logger.error(f"Cannot resume task {task.task_id}: {error}")
+    task.status = TaskStatus.FAILED
+    task.completed_at = datetime.utcnow()
+    task.error = error
+    await storage.save_task(task)
+
+
+async def _unfinished_tasks(storage: StorageInterface) -> List[TaskResult]:
+    """Queued and running tasks, oldest first"""
+    tasks = []
+    for status in (TaskStatus.PENDING, TaskStatus.RUNNING):
+        cursor = None
+        while True:
+            page, cursor = await storage.query_tasks(TaskFilter(status=status), cursor)
+            tasks.extend(page)
+            if cursor is None:
+                break
+    return sorted(tasks, key=lambda task: task.created_at)
+
+
+async def recover_tasks(storage: StorageInterface, executor: TaskExecutor, lease_timeout: float) -> int:
+    """
+    Resubmit the queued and running tasks whose holder has stopped
+
+    A task is held by the process that queued it, which renews its lease
+    while the task is queued or running. Tasks whose lease was not renewed
+    for lease_timeout seconds are taken over and queued again in creation
+    order. The runner skips every file stage that was checkpointed before
+    the interruption.
+
+    Returns:
+        int: Number of tasks resubmitted
+    """
+    from app.tasks import get_task_runner
+
+    resumed = 0
+    for task in await _unfinished_tasks(storage):
+        if not lease_expired(task, lease_timeout) or executor.holds(task.task_id):
+            continue
+        kwargs = _task_kwargs(task)
+        if kwargs is None:
+            await _fail(storage, task, "Task was interrupted and its inputs were not recorded")
+            continue
+        result = task.result or {}
+        runner = get_task_runner(task.task_type, storage)
+        previous_owner = task.owner
+        take_lease(task)
+        await storage.save_task(task)
+        try:
+            executor.submit(
+                task.task_id,
+                kwargs["strategy"],
+                partial(runner.run_task, task, **kwargs),
+                cost=result.get("estimated_cost", 0.0),
+                priority=result.get("priority", DEFAULT_PRIORITY),
+                tenant=result.get("tenant", DEFAULT_TENANT),
+                heartbeat=partial(runner.renew_lease, task),
+            )
+        except QueueFullError:
+            await _fail(storage, task, "Task was interrupted and the queue was too full to resume it")
+            continue
+        resumed += 1
+        logger.info(f"Resuming task {task.task_id} (was {task.status.value}, held by {previous_owner})")
+    return resumed
@@ -1,81 +1,303 @@
 import asyncio
-import json
+import os
+import shutil
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from app.models import FileStage
 from app.tasks.base import BaseTaskRunner
+from app.tasks.chunk_pool import CHUNKER_PARAMS, ChunkPool
+from app.tasks.chunk_export import export_chunks
+from app.tasks.chunk_writer import ChunksFileWriter
 from app.parsers.parser_factory import ParserFactory
+from app.parsers.pdf_parser import PDFParser
+from app.parsers.sharding import count_pdf_pages, merge_shard_outputs, plan_shards
+from app.parsers.worker_pool import ParserWorkerPool
+from app.cache import ParseCache, file_sha256, get_chunk_cache, get_parse_cache
+from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger("tasks.runners")
 
+# Options passed to PDFParser.parse. Every option that changes the parser
+# output is part of the parse cache key.
+PDF_PARSE_OPTIONS: Dict[str, Any] = {
+    "model_name": "gemini-2.0-flash",
+    "disable_image_extraction": False,
+    "page_range": None,
+    "force_ocr": False,
+    "strip_existing_ocr": False,
+    "debug": False,
+}
+
+
+@lru_cache()
+def get_chunk_pool() -> ChunkPool:
+    """Get the shared chunking process pool"""
+    return ChunkPool(
+        max_workers=settings.CHUNK_POOL_WORKERS or None,
+        start_method=settings.CHUNK_POOL_START_METHOD,
+    )
+
+
+@lru_cache()
+def get_parser_worker_pool() -> ParserWorkerPool:
+    """Get the shared pool of warm parser workers"""
+    return ParserWorkerPool(
+        size=settings.PARSER_WORKERS,
+        converter=settings.PARSER_WORKER_CONVERTER,
+        max_rss_bytes=settings.PARSER_WORKER_MAX_RSS_MB * 1024 * 1024,
+        startup_timeout=settings.PARSER_WORKER_STARTUP_TIMEOUT,
+    )
+
+
+@lru_cache()
+def get_parse_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore bounding concurrent PDF parses"""
+    return asyncio.Semaphore(settings.PARSE_CONCURRENCY)
+
 
 class ChunkingTaskRunner(BaseTaskRunner):
     """Runner for chunking tasks"""
     
-    async def _execute(self, files: List[str], strategy: str = "default") -> Dict[str, Any]:
-        """Execute a chunking task"""
+    async def _run_parser(self, parser: PDFParser, options: Dict[str, Any], progress_key: str) -> str:
+        """Run a parser, bounding the number of marker processes across all tasks"""
+        worker_pool = get_parser_worker_pool() if settings.PARSER_MODE == "worker" else None
+        async with get_parse_semaphore():
+            return await parser.aparse(
+                on_progress=lambda progress: self.report_progress(progress_key, progress.to_dict()),
+                worker_pool=worker_pool,
+                **options
+            )
+    
+    async def _parse_file(
+        self,
+        file_path: str,
+        file_hash: Optional[str] = None,
+        page_range: Optional[Tuple[int, int]] = None
+    ) -> str:
+        """Parse a file (or a page range of it) to markdown, reusing cached parser output when available"""
+        options = dict(PDF_PARSE_OPTIONS)
+        progress_key = os.path.basename(file_path)
+        if page_range is None:
+            parser = ParserFactory.get_parser(file_path)
+        else:
+            first_page, last_page = page_range
+            options["page_range"] = f"{first_page}-{last_page}"
+            progress_key = f"{progress_key}[{options['page_range']}]"
+            shard_dir = os.path.join(
+                os.path.dirname(file_path),
+                f"{Path(file_path).stem}_shards",
+                options["page_range"]
+            )
+            parser = PDFParser(file_path, output_dir=shard_dir)
+        
+        if not settings.PARSE_CACHE_ENABLED:
+            return await self._run_parser(parser, options, progress_key)
+        
+        parse_cache = get_parse_cache()
+        if file_hash is None:
+            file_hash = await asyncio.to_thread(file_sha256, file_path)
+        cache_key = ParseCache.make_key(file_hash, **options)
+        
+        cached_path = await parse_cache.get(cache_key, parser.markdown_output_dir)
+        if cached_path is not None:
+            logger.info(f"Reusing cached parse output for {progress_key}")
+            return cached_path
+        
+        output_path = await self._run_parser(parser, options, progress_key)
+        if os.path.isfile(output_path):
+            await parse_cache.put(cache_key, os.path.dirname(output_path), output_path)
+        return output_path
+    
+    async def _parse_pdf(self, file_path: str, file_hash: Optional[str] = None) -> str:
+        """Parse a PDF, splitting large documents into page-range shards parsed in parallel"""
+        page_count = None
+        if settings.PDF_SHARD_PAGES:
+            page_count = await asyncio.to_thread(count_pdf_pages, file_path)
+        if page_count is None or page_count < settings.PDF_SHARD_MIN_PAGES:
+            return await self._parse_file(file_path, file_hash)
+        
+        shards = plan_shards(page_count, settings.PDF_SHARD_PAGES)
+        logger.info(f"Parsing {file_path} ({page_count} pages) in {len(shards)} shards")
+        shard_tasks = [
+            asyncio.ensure_future(self._parse_file(file_path, file_hash, page_range=shard))
+            for shard in shards
+        ]
+        try:
+            shard_paths = await asyncio.gather(*shard_tasks)
+        except BaseException:
+            # One failed shard fails the document; stop parsing the others
+            for task in shard_tasks:
+                task.cancel()
+            await asyncio.gather(*shard_tasks, return_exceptions=True)
+            raise
+        
+        markdown_path = ParserFactory.get_parser(file_path).markdown_path
+        return await asyncio.to_thread(merge_shard_outputs, markdown_path, list(zip(shards, shard_paths)))
+    
+    async def _process_file(self, file_path: str, file_hash: Optional[str] = None) -> str:
+        """Turn an input file into a document the chunker can read"""
+        logger.debug(f"Processing file: {file_path}")
+        if not file_path.endswith('.pdf'):
+            return file_path
+        
+        # Parse the file, or restore a cached parse of the same document
+        output_path = await self._parse_pdf(file_path, file_hash)
+        logger.debug(f"Successfully processed file: {file_path}")
+        return output_path
+    
+    async def _chunk_document(
+        self,
+        parsed_path: str,
+        part_path: str,
+        strategy: str,
+        chunker_params: Dict[str, Any]
+    ) -> None:
+        """Chunk one parsed document into a part file, reusing cached chunks when available"""
+        chunk_cache = get_chunk_cache(settings.STORAGE_TYPE) if settings.CHUNK_CACHE_ENABLED else None
+        cache_key = None
+        # Paths in the chunks' metadata point into the task directory
+        task_dir = str(Path(settings.TASK_BASE_DIR) / self.task_result.task_id)
+        if chunk_cache is not None:
+            content_hash = await asyncio.to_thread(file_sha256, parsed_path)
+            cache_key = chunk_cache.make_key([content_hash], strategy, chunker_params)
+            if await chunk_cache.get(cache_key, part_path, task_dir):
+                logger.info(f"Reusing cached chunks for {parsed_path} ({strategy})")
+                return
+        
+        # Chunk and serialize in a pool worker process
+        chunk_count = await get_chunk_pool().chunk_to_file(
+            strategy, chunker_params, [parsed_path], part_path
+        )
+        logger.debug(f"Wrote {chunk_count} chunks for {parsed_path}")
+        
+        if cache_key is not None:
+            await chunk_cache.put(cache_key, part_path, task_dir)
+    
+    async def _pipeline_document(
+        self,
+        file_path: str,
+        file_hash: Optional[str],
+        part_path: str,
+        strategy: str,
+        chunker_params: Dict[str, Any]
+    ) -> str:
+        """
+        Parse a file and chunk it as soon as its markdown is ready
+        
+        Stages already checkpointed by an interrupted run of the task are
+        skipped as long as their output is still on disk.
+        """
+        checkpoint = self.get_checkpoint(file_path)
+        parsed_path = checkpoint.get("parsed_path")
+        if checkpoint.get("stage") == FileStage.CHUNKED and os.path.isfile(part_path):
+            logger.info(f"Resuming {file_path} from its chunked checkpoint")
+            return parsed_path
+        
+        if checkpoint.get("stage") in (FileStage.PARSED, FileStage.CHUNKED) and parsed_path and os.path.isfile(parsed_path):
+            logger.info(f"Resuming {file_path} from its parsed checkpoint")
+        else:
+            parsed_path = await self._process_file(file_path, file_hash)
+            await self.record_checkpoint(file_path, FileStage.PARSED, parsed_path=parsed_path)
+        
+        await self._chunk_document(parsed_path, part_path, strategy, chunker_params)
+        await self.record_checkpoint(file_path, FileStage.CHUNKED, parsed_path=parsed_path, part_path=part_path)
+        return parsed_path
+    
+    async def _execute(
+        self,
+        files: List[str],
+        strategy: str = "default",
+        file_hashes: Optional[Dict[str, str]] = None,
+        export_format: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Execute a chunking task, optionally exporting the chunks in a columnar format"""
+        file_hashes = file_hashes or {}
         logger.info(f"Starting chunking task with {len(files)} files")
         results = []
         errors = []
         parsed_files_paths = []
-        for file_path in files:
-            try:
-                logger.debug(f"Processing file: {file_path}")
-
-                if file_path.endswith('.pdf'):
-                    # Get appropriate parser for the file
-                    parser = ParserFactory.get_parser(file_path)
-                    
-                    # Parse the file
-                    output_path = parser.parse()
-                    parsed_files_paths.append(output_path)
-                else:
-                    parsed_files_paths.append(file_path)
-                logger.debug(f"Successfully processed file: {file_path}")
-                
-            except Exception as e:
-                logger.error(f"Error processing file {file_path}: {str(e)}")
-                errors.append({
-                    "file_path": file_path,
-                    "error": str(e),
-                    "status": "failed"
-                })
         
-        base_dir = Path("/tmp/ai_chunking")
-        task_dir = base_dir / self.task_result.task_id
-        task_dir.mkdir(parents=True, exist_ok=True)
-
-        from ai_chunking import RecursiveTextSplitter, SectionBasedSemanticChunker, SemanticTextChunker 
-
-        # Chunk the file
         print("Strategy: ", strategy)
         if strategy == "default":
             strategy = "auto_ai"
-
-        if strategy == "auto_ai":
-            pass
-        elif strategy == "section_semantic":
-            chunker = SectionBasedSemanticChunker()
-        elif strategy == "semantic":
-            chunker = SemanticTextChunker() 
-        elif strategy == "recursive_text":
-            chunker = RecursiveTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=100,
-            )
+        if strategy not in CHUNKER_PARAMS:
+            raise ValueError(f"Unsupported chunking strategy: {strategy}")
+        chunker_params = CHUNKER_PARAMS[strategy]
         
-        chunks = chunker.chunk_documents(parsed_files_paths)
-
-        # Save the chunks to a JSON file based on the task_id
-        with open(f"{task_dir}/chunks.json", "w") as f:
-            json.dump([chunk.model_dump() for chunk in chunks], f, indent=4)
-
-        results.append({
+        base_dir = Path(settings.TASK_BASE_DIR)
+        task_dir = base_dir / self.task_result.task_id
+        parts_dir = task_dir / "chunk_parts"
+        parts_dir.mkdir(parents=True, exist_ok=True)
+        compression = settings.CHUNKS_OUTPUT_COMPRESSION or None
+        chunks_file_path = str(task_dir / ("chunks.jsonl.gz" if compression == "gzip" else "chunks.jsonl"))
+        
+        # Every file is parsed and then chunked independently, so chunking of
+        # one document overlaps with parsing of the others
+        pipelines = [
+            asyncio.ensure_future(self._pipeline_document(
+                file_path,
+                file_hashes.get(file_path),
+                str(parts_dir / f"{index}.jsonl"),
+                strategy,
+                chunker_params
+            ))
+            for index, file_path in enumerate(files)
+        ]
+        writer = ChunksFileWriter(chunks_file_path, compression=compression)
+        writer.open()
+        try:
+            # Append each document's chunks in input order as soon as they are ready
+            for index, (file_path, pipeline) in enumerate(zip(files, pipelines)):
+                try:
+                    parsed_files_paths.append(await pipeline)
+                except Exception as e:
+                    logger.error(f"Error processing file {file_path}: {str(e)}")
+                    errors.append({
+                        "file_path": file_path,
+                        "error": str(e),
+                        "status": "failed"
+                    })
+                    continue
+                await asyncio.to_thread(writer.append_part, str(parts_dir / f"{index}.jsonl"), file_path)
+                # Finished documents can be read from the chunks file while the task runs
+                self.report_progress("output", {
+                    "chunks_file_path": chunks_file_path,
+                    "offsets_path": writer.offsets_path,
+                    "documents_written": writer.parts_written,
+                    "chunks_written": writer.chunks_written,
+                })
+            await asyncio.to_thread(writer.close)
+        except BaseException:
+            for pipeline in pipelines:
+                pipeline.cancel()
+            await asyncio.gather(*pipelines, return_exceptions=True)
+            writer.abort()
+            raise
+        finally:
+            # Part files back the chunked checkpoints until the chunks file is
+            # complete; a crash before this point leaves them for the resumed run
+            shutil.rmtree(parts_dir, ignore_errors=True)
+        
+        result = {
             "files_paths": files,
             "parsed_files_paths": parsed_files_paths,
-            "chunks_file_path": f"{task_dir}/chunks.json",
+            "chunks_file_path": chunks_file_path,
+            "chunks_offsets_path": writer.offsets_path,
+            "chunks_count": writer.chunks_written,
             "status": "success"
-        })
+        }
+        if export_format:
+            # The chunks are complete either way, so a failed export does not fail the task
+            try:
+                result["export_path"] = await get_chunk_pool().run(
+                    export_chunks, chunks_file_path, writer.offsets_path, export_format
+                )
+            except Exception as e:
+                logger.error(f"Exporting chunks as {export_format} failed: {str(e)}")
+                result["export_error"] = str(e)
+        results.append(result)
 
         final_result = {
             "processed_files": len(files),
@@ -0,0 +1,48 @@
+"""
+Distributed task worker.
+
+Run with ``python -m app.tasks.worker`` on any node that shares REDIS_URL,
+TASK_BASE_DIR and BLOB_STORE_DIR with the API. The API must run with
+EXECUTION_MODE=distributed so it queues tasks instead of running them.
+"""
+import argparse
+import asyncio
+import signal
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.storage import get_storage
+from app.tasks import get_job_queue
+from app.tasks.distributed import DistributedWorker
+from app.tasks.runners import get_chunk_pool, get_parser_worker_pool
+
+logger = get_logger("tasks.worker")
+
+
+async def run_worker(concurrency: int) -> None:
+    """Serve jobs from the job stream until SIGINT or SIGTERM"""
+    get_chunk_pool().start()
+    if settings.PARSER_MODE == "worker":
+        await get_parser_worker_pool().start()
+
+    worker = DistributedWorker(
+        get_job_queue(),
+        get_storage(settings.STORAGE_TYPE),
+        concurrency=concurrency,
+        heartbeat_interval=settings.JOB_HEARTBEAT_INTERVAL,
+    )
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        get_chunk_pool().shutdown()
+        await get_parser_worker_pool().shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed chunking task worker")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY)
+    asyncio.run(run_worker(parser.parse_args().concurrency))
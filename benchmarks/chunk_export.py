@@ -0,0 +1,101 @@
+"""
+Size and load time of a task's chunks as chunks.json, JSON Lines, Arrow and Parquet
+
+Writes 3 documents of 20,000 chunks of 150 words each. The chunks are saved
+as an indented JSON array, the chunks.json that tasks wrote before JSON
+Lines. They are also saved as JSON Lines (plain and gzip) and exported to
+Arrow and Parquet. For each file the benchmark reports the size and the
+time to load every chunk text.
+
+Usage: python -m benchmarks.chunk_export [chunks per document]
+Requires pyarrow.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.tasks.chunk_export import export_chunks
+from app.tasks.chunk_writer import ChunksFileWriter
+
+WORDS = ["alpha", "beta", "gamma", "delta", "chunk", "vector", "index"]
+
+
+def _write_parts(directory: str, chunks: int) -> list:
+    parts = []
+    for document in range(3):
+        path = os.path.join(directory, f"{document}.jsonl")
+        with open(path, "w") as f:
+            for i in range(chunks):
+                record = {
+                    "text": " ".join(random.choice(WORDS) for _ in range(150)),
+                    "metadata": {"page_start": i // 10, "page_end": i // 10, "section": f"s{i % 7}"},
+                    "token_count": 150,
+                }
+                f.write(json.dumps(record) + "\n")
+        parts.append(path)
+    return parts
+
+
+def _timed(label: str, path: str, load) -> None:
+    start = time.perf_counter()
+    count = load(path)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {os.path.getsize(path) / 1e6:8.1f} MB {elapsed:8.2f} s to load {count} texts")
+
+
+def _load_json(path: str) -> int:
+    with open(path) as f:
+        return len([chunk["text"] for chunk in json.load(f)])
+
+
+def _load_jsonl(path: str) -> int:
+    with open(path) as f:
+        return len([json.loads(line)["text"] for line in f])
+
+
+def _load_arrow(path: str) -> int:
+    return len(pa.ipc.open_file(pa.memory_map(path)).read_all().column("text"))
+
+
+def _load_parquet(path: str) -> int:
+    return len(pq.read_table(path, columns=["text"]).column("text"))
+
+
+def main(chunks: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        parts = _write_parts(directory, chunks)
+        legacy = os.path.join(directory, "chunks.json")
+        with open(legacy, "w") as f:
+            json.dump([json.loads(line) for part in parts for line in open(part)], f, indent=4)
+
+        writers = {}
+        for name, compression in (("chunks.jsonl", None), ("chunks.jsonl.gz", "gzip")):
+            writer = ChunksFileWriter(os.path.join(directory, name), compression)
+            writer.open()
+            for document, part in enumerate(parts):
+                writer.append_part(part, f"doc{document}.pdf")
+            writer.close()
+            writers[name] = writer
+
+        exports = {}
+        jsonl = writers["chunks.jsonl"]
+        for export_format in ("arrow", "parquet"):
+            start = time.perf_counter()
+            exports[export_format] = export_chunks(jsonl.output_path, jsonl.offsets_path, export_format)
+            print(f"export {export_format:<9} {time.perf_counter() - start:8.2f} s")
+
+        _timed("chunks.json", legacy, _load_json)
+        _timed("chunks.jsonl", jsonl.output_path, _load_jsonl)
+        print(f"{'chunks.jsonl.gz':<16} {os.path.getsize(writers['chunks.jsonl.gz'].output_path) / 1e6:8.1f} MB")
+        _timed("chunks.arrow", exports["arrow"], _load_arrow)
+        _timed("chunks.parquet", exports["parquet"], _load_parquet)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,67 @@
+"""
+Throughput of the Redis stream job queue
+
+Enqueues jobs, then drains them with several consumers that claim, send
+one heartbeat for and acknowledge each job, as workers do. It also
+measures how long a job abandoned by its worker takes to be reclaimed.
+
+Usage: python -m benchmarks.job_queue [redis://localhost:6379/15] [jobs] [consumers]
+The database is flushed first; point it at a scratch database.
+"""
+import asyncio
+import sys
+import time
+
+import redis.asyncio as redis
+
+from app.tasks.distributed import DistributedJobQueue
+
+
+async def _drain(queue: DistributedJobQueue, consumer: str, done: list) -> None:
+    while True:
+        delivery = await queue.claim(consumer, block_ms=100)
+        if delivery is None:
+            return
+        await queue.heartbeat(delivery.message_id, consumer)
+        await queue.ack(delivery.message_id)
+        done.append(delivery.message_id)
+
+
+async def main(url: str, jobs: int, consumers: int) -> None:
+    client = redis.from_url(url)
+    await client.flushdb()
+    queue = DistributedJobQueue(client, visibility_timeout=0.5)
+
+    start = time.perf_counter()
+    for i in range(jobs):
+        await queue.enqueue({"task_id": f"task-{i}", "task_type": "chunking_task", "kwargs": {"files": []}})
+    elapsed = time.perf_counter() - start
+    print(f"enqueue         {jobs / elapsed:8.0f} jobs/s")
+
+    done: list = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_drain(queue, f"consumer-{i}", done) for i in range(consumers)))
+    # The last consumers wait out one empty claim
+    elapsed = time.perf_counter() - start
+    print(f"claim+ack       {len(done) / elapsed:8.0f} jobs/s with {consumers} consumers, {await queue.depth()} left")
+
+    await queue.enqueue({"task_id": "abandoned"})
+    abandoned = await queue.claim("crashed", block_ms=100)
+    start = time.perf_counter()
+    while (delivery := await queue.claim("survivor", block_ms=10)) is None:
+        await asyncio.sleep(0.01)
+    print(
+        f"reclaim         {time.perf_counter() - start:8.2f} s after a {queue.visibility_timeout} s visibility "
+        f"timeout, delivery {delivery.deliveries}, same job: {delivery.message_id == abandoned.message_id}"
+    )
+    await client.flushdb()
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(
+        args[0] if args else "redis://localhost:6379/15",
+        int(args[1]) if len(args) > 1 else 5000,
+        int(args[2]) if len(args) > 2 else 8,
+    ))
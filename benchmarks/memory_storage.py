@@ -0,0 +1,86 @@
+"""
+Deep-copying in-memory storage versus InMemoryStorage snapshots
+
+Saves, reads and lists 100,000 completed tasks, each with a result listing
+20 input files. The baseline deep-copies tasks on every save and read, as
+in-memory storage did before snapshots. InMemoryStorage is run with and
+without eviction limits, since a byte budget serializes finished tasks to
+measure them.
+
+Usage: python -m benchmarks.memory_storage [tasks]
+"""
+import asyncio
+import logging
+import sys
+import time
+from copy import deepcopy
+from typing import Dict, List, Optional, Tuple
+
+from app.models import TaskResult, TaskStatus
+from app.storage.base import StorageInterface, TaskFilter
+from app.storage.memory import InMemoryStorage
+
+
+class DeepCopyStorage(StorageInterface):
+    """In-memory storage that deep-copies tasks on the way in and out"""
+
+    def __init__(self):
+        self._tasks: Dict[str, TaskResult] = {}
+
+    async def save_task(self, task: TaskResult) -> None:
+        self._tasks[task.task_id] = deepcopy(task)
+
+    async def get_task(self, task_id: str) -> Optional[TaskResult]:
+        task = self._tasks.get(task_id)
+        return deepcopy(task) if task else None
+
+    async def list_tasks(self) -> Dict[str, TaskResult]:
+        return {task_id: deepcopy(task) for task_id, task in self._tasks.items()}
+
+    async def query_tasks(
+        self,
+        task_filter: TaskFilter = TaskFilter(),
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[TaskResult], Optional[str]]:
+        raise NotImplementedError
+
+
+def _task(index: int) -> TaskResult:
+    task = TaskResult.create_new("chunking_task", f"task-{index}")
+    task.status = TaskStatus.COMPLETED
+    task.result = {
+        "input_files": [{"filename": f"f{i}.pdf", "size": i, "sha256": "a" * 64} for i in range(20)],
+        "saved_files": [f"/tmp/ai_chunking/task-{index}/f{i}.pdf" for i in range(20)],
+        "strategy": "semantic",
+    }
+    return task
+
+
+async def _run(label: str, storage: StorageInterface, tasks: List[TaskResult]) -> None:
+    start = time.perf_counter()
+    for task in tasks:
+        await storage.save_task(task)
+    saved = time.perf_counter()
+    for task in tasks:
+        await storage.get_task(task.task_id)
+    read = time.perf_counter()
+    await storage.list_tasks()
+    listed = time.perf_counter()
+    print(f"{label:<22} save {saved - start:6.2f} s  get {read - saved:6.2f} s  list {listed - read:6.2f} s")
+
+
+async def main(count: int) -> None:
+    logging.disable(logging.CRITICAL)
+    tasks = [_task(i) for i in range(count)]
+    await _run("deepcopy", DeepCopyStorage(), tasks)
+    await _run("snapshots", InMemoryStorage(), tasks)
+    await _run(
+        "snapshots with limits",
+        InMemoryStorage(max_tasks=count, max_bytes=512 * 1024 * 1024, ttl=86400),
+        tasks
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
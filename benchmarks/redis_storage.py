@@ -0,0 +1,100 @@
+"""
+Round trips and bytes of a task's lifecycle in RedisStorage
+
+Saves a task through 12 updates (running, 10 progress updates, completed),
+reads it 10 times and lists 200 tasks, counting client round trips and the
+bytes Redis received and sent, from INFO stats.
+
+Usage: python -m benchmarks.redis_storage [redis://localhost:6379/15]
+The database is flushed first; point it at a scratch database.
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline, Redis
+
+from app.models import TaskResult, TaskStatus
+from app.storage.redis_storage import RedisStorage
+
+round_trips = 0
+
+
+def _count_round_trips() -> None:
+    pipeline_execute = Pipeline.execute
+    execute_command = Redis.execute_command
+
+    async def execute(self, *args, **kwargs):
+        global round_trips
+        round_trips += 1
+        return await pipeline_execute(self, *args, **kwargs)
+
+    async def command(self, *args, **kwargs):
+        global round_trips
+        if not isinstance(self, Pipeline):
+            round_trips += 1
+        return await execute_command(self, *args, **kwargs)
+
+    Pipeline.execute = execute
+    Redis.execute_command = command
+
+
+async def _measure(client: Redis, label: str, work) -> None:
+    global round_trips
+    before = await client.info("stats")
+    round_trips = 0
+    start = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - start
+    trips = round_trips
+    after = await client.info("stats")
+    received = after["total_net_input_bytes"] - before["total_net_input_bytes"]
+    sent = after["total_net_output_bytes"] - before["total_net_output_bytes"]
+    # The INFO call itself is included in the byte counts, the same in every row
+    print(f"{label:<14} {trips:>6} round trips {received:>9} B to redis {sent:>9} B from redis {elapsed * 1000:8.1f} ms")
+
+
+async def main(url: str) -> None:
+    client = redis.from_url(url)
+    await client.flushdb()
+    storage = RedisStorage(url, redis_client=client, task_ttl=3600)
+    _count_round_trips()
+
+    task = TaskResult.create_new("chunking_task", "lifecycle")
+    task.result = {
+        "input_files": [{"filename": f"f{i}.pdf", "size": i, "sha256": "a" * 64} for i in range(20)],
+        "strategy": "semantic",
+    }
+    await storage.save_task(task)
+    # Loads the partial save script, so the updates below measure steady state
+    task.status = TaskStatus.RUNNING
+    task.started_at = datetime.now()
+    await storage.save_task(task)
+
+    async def updates():
+        for i in range(10):
+            task.progress = {"parse": {"done": i, "total": 10}}
+            await storage.save_task(task)
+        task.status = TaskStatus.COMPLETED
+        task.completed_at = datetime.now()
+        task.result = {**task.result, "chunks_count": 1000}
+        await storage.save_task(task)
+
+    async def reads():
+        for _ in range(10):
+            await storage.get_task("lifecycle")
+
+    for i in range(200):
+        await storage.save_task(TaskResult.create_new("chunking_task", f"task-{i}"))
+
+    await _measure(client, "11 updates", updates)
+    await _measure(client, "10 gets", reads)
+    await _measure(client, "list 201 tasks", storage.list_tasks)
+    await client.flushdb()
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "redis://localhost:6379/15"))
@@ -0,0 +1,77 @@
+"""
+Save, get, list and query throughput of the memory, file and SQLite backends
+
+Saves tasks one at a time and then all at once (concurrent saves, which
+SQLite commits in shared transactions), reads 2,000 of them back, lists
+them all and pages through query_tasks.
+
+Usage: python -m benchmarks.storage_backends [tasks]
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from app.models import TaskResult
+from app.storage.base import StorageInterface, TaskFilter
+from app.storage.file_storage import FileStorage
+from app.storage.memory import InMemoryStorage
+from app.storage.sqlite_storage import SQLiteStorage
+
+READS = 2000
+QUERIES = 100
+
+
+def _task(index: int) -> TaskResult:
+    task = TaskResult.create_new("chunking_task", f"task-{index}")
+    task.result = {
+        "input_files": [{"filename": f"f{i}.pdf", "size": i, "sha256": "a" * 64} for i in range(5)],
+        "strategy": "semantic",
+    }
+    return task
+
+
+async def _run(label: str, storage: StorageInterface, count: int) -> None:
+    tasks = [_task(i) for i in range(count)]
+    start = time.perf_counter()
+    for task in tasks:
+        await storage.save_task(task)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(storage.save_task(task) for task in tasks))
+    concurrent = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for task in tasks[:READS]:
+        await storage.get_task(task.task_id)
+    reads = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await storage.list_tasks()
+    listed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        await storage.query_tasks(TaskFilter(), None, 100)
+    queried = time.perf_counter() - start
+
+    print(
+        f"{label:<7} save {count / sequential:7.0f}/s  concurrent save {count / concurrent:7.0f}/s  "
+        f"get {READS / reads:7.0f}/s  list {count} {listed * 1000:6.0f} ms  "
+        f"query page {queried * 1000 / QUERIES:5.1f} ms"
+    )
+
+
+async def main(count: int) -> None:
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as directory:
+        await _run("memory", InMemoryStorage(), count)
+        await _run("file", FileStorage(os.path.join(directory, "files")), count)
+        await _run("sqlite", SQLiteStorage(os.path.join(directory, "tasks.db")), count)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,37 @@
+import asyncio
+import hashlib
+
+from app.models import FileStage, TaskResult, TaskStatus
+from app.storage.blob_store import BlobStore, release_removed_tasks
+from app.storage.memory import InMemoryStorage
+
+
+def test_blob_is_kept_until_its_task_is_evicted(tmp_path):
+    async def scenario():
+        blobs = BlobStore(str(tmp_path / "blobs"))
+        storage = InMemoryStorage(max_tasks=1)
+        content = b"%PDF-1.4 document"
+        digest = hashlib.sha256(content).hexdigest()
+        staged = blobs.staging_path()
+        with open(staged, "wb") as f:
+            f.write(content)
+        task_dir = tmp_path / "tasks" / "t1"
+        task_dir.mkdir(parents=True)
+        document = str(task_dir / "doc.pdf")
+        await blobs.add(staged, digest, document, "t1")
+
+        task = TaskResult.create_new("chunking_task", "t1")
+        task.checkpoints = {document: {"stage": FileStage.UPLOADED.value, "sha256": digest}}
+        task.status = TaskStatus.COMPLETED
+        await storage.save_task(task)
+        assert await release_removed_tasks(storage, blobs, str(tmp_path / "tasks"), 0) == 0
+        assert blobs.ref_count(digest) == 1
+
+        # Evicts t1
+        await storage.save_task(TaskResult.create_new("chunking_task", "t2"))
+        assert await release_removed_tasks(storage, blobs, str(tmp_path / "tasks"), 0) == 1
+        assert not blobs.blob_path(digest).exists()
+        assert blobs.ref_count(digest) == 0
+        assert not task_dir.exists()
+
+    asyncio.run(scenario())
@@ -0,0 +1,26 @@
+import asyncio
+import json
+
+from app.cache.chunk_cache import FileChunkCache
+
+
+def test_hit_points_chunk_paths_at_the_reading_task(tmp_path):
+    async def scenario():
+        cache = FileChunkCache(str(tmp_path / "cache"), max_bytes=0, ttl=0)
+        first, second = tmp_path / "tasks" / "first", tmp_path / "tasks" / "second"
+        chunks = first / "0.jsonl"
+        first.mkdir(parents=True)
+        second.mkdir()
+        chunks.write_text(json.dumps({
+            "text": "Intro",
+            "metadata": {"source_path": f"{first}/doc/doc.md", "images": [f"{first}/doc/figure_1.png"]},
+        }) + "\n")
+        key = cache.make_key(["hash"], "semantic", {})
+        await cache.put(key, str(chunks), str(first))
+
+        destination = second / "0.jsonl"
+        assert await cache.get(key, str(destination), str(second))
+        metadata = json.loads(destination.read_text())["metadata"]
+        assert metadata == {"source_path": f"{second}/doc/doc.md", "images": [f"{second}/doc/figure_1.png"]}
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+import importlib.util
+import json
+
+import pytest
+
+from app.tasks.chunk_export import ExportUnavailableError, check_export_available
+
+
+def test_missing_pyarrow_is_reported_before_export(monkeypatch):
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    with pytest.raises(ExportUnavailableError):
+        check_export_available()
+
+
+def test_concurrent_exports_use_separate_temporary_files(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.tasks.chunk_export import export_chunks
+    from app.tasks.chunk_writer import ChunksFileWriter
+
+    part = tmp_path / "0.jsonl"
+    part.write_text("".join(json.dumps({"text": f"chunk {i}", "page": i}) + "\n" for i in range(10000)))
+    writer = ChunksFileWriter(str(tmp_path / "chunks.jsonl"))
+    writer.open()
+    writer.append_part(str(part), "doc.pdf")
+    writer.close()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        paths = list(pool.map(
+            lambda _: export_chunks(writer.output_path, writer.offsets_path, "arrow"), range(4)
+        ))
+
+    assert set(paths) == {str(tmp_path / "chunks.arrow")}
+    assert pa.ipc.open_file(paths[0]).read_all().num_rows == 10000
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from app.models import TaskResult, TaskStatus
+from app.storage.memory import InMemoryStorage
+from app.tasks.distributed import DistributedJobQueue, DistributedWorker
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _queue(**kwargs):
+    return DistributedJobQueue(fakeredis.aioredis.FakeRedis(), **kwargs)
+
+
+def test_claims_jobs_in_order_and_ack_removes_them():
+    async def scenario():
+        queue = _queue()
+        assert await queue.enqueue({"task_id": "t1"}) == 1
+        assert await queue.enqueue({"task_id": "t2"}) == 2
+        assert await queue.queue_position("t2") == 2
+
+        delivery = await queue.claim("worker-a", block_ms=10)
+        assert (delivery.job, delivery.deliveries) == ({"task_id": "t1"}, 1)
+        assert await queue.queue_position("t2") == 1
+        await queue.ack(delivery.message_id)
+        assert await queue.depth() == 1
+        assert (await queue.claim("worker-b", block_ms=10)).job == {"task_id": "t2"}
+        assert await queue.claim("worker-b", block_ms=10) is None
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_job_is_reclaimed_unless_heartbeats_continue():
+    async def scenario():
+        queue = _queue(visibility_timeout=0.1)
+        await queue.enqueue({"task_id": "t1"})
+        delivery = await queue.claim("worker-a", block_ms=10)
+
+        for _ in range(3):
+            await asyncio.sleep(0.06)
+            await queue.heartbeat(delivery.message_id, "worker-a")
+            assert await queue.claim("worker-b", block_ms=10) is None
+
+        await asyncio.sleep(0.15)
+        reclaimed = await queue.claim("worker-b", block_ms=10)
+        assert reclaimed.message_id == delivery.message_id
+        assert reclaimed.deliveries == 2
+
+    asyncio.run(scenario())
+
+
+def test_job_delivered_too_often_is_dead_lettered_and_its_task_failed():
+    async def scenario():
+        queue = _queue(visibility_timeout=0.01, max_deliveries=1)
+        storage = InMemoryStorage()
+        await storage.save_task(TaskResult.create_new("chunking_task", "t1"))
+        worker = DistributedWorker(queue, storage, block_ms=10)
+        await queue.enqueue({"task_id": "t1", "task_type": "chunking_task"})
+        await queue.claim("worker-a", block_ms=10)
+        await asyncio.sleep(0.05)
+
+        delivery = await queue.claim("worker-b", block_ms=10)
+        assert delivery.deliveries == 2
+        await worker._handle(delivery, "worker-b")
+
+        assert (await storage.get_task("t1")).status == TaskStatus.FAILED
+        assert await queue.depth() == 0
+        stats = await queue.stats()
+        assert (stats["dead_letters"], stats["claimed"]) == (1, 0)
+
+    asyncio.run(scenario())
+
+
+def test_stopped_consumers_do_not_count_towards_retry_after():
+    async def scenario():
+        queue = _queue(visibility_timeout=0.1, default_task_duration=10)
+        for task_id in ("t1", "t2", "t3"):
+            await queue.enqueue({"task_id": task_id})
+        await queue.claim("worker-a", block_ms=10)
+        delivery = await queue.claim("worker-b", block_ms=10)
+        assert await queue.live_consumers() == 2
+
+        await asyncio.sleep(0.15)
+        await queue.heartbeat(delivery.message_id, "worker-b")
+        assert await queue.live_consumers() == 1
+        assert await queue.retry_after() == 40
+
+    asyncio.run(scenario())
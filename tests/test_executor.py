@@ -0,0 +1,30 @@
+import asyncio
+
+from app.tasks.executor import TaskExecutor
+
+
+def test_tenants_take_turns_within_a_priority_class():
+    async def scenario():
+        executor = TaskExecutor(max_workers=1, max_queue_size=0)
+        started = []
+
+        def job(task_id):
+            async def run():
+                started.append(task_id)
+            return run
+
+        for task_id, tenant, priority in [
+            ("a1", "a", "normal"), ("a2", "a", "normal"), ("a3", "a", "normal"),
+            ("b1", "b", "normal"), ("c1", "c", "low"), ("b2", "b", "high"),
+        ]:
+            executor.submit(task_id, "simple_page", job(task_id), priority=priority, tenant=tenant)
+        assert [executor.queue_position(task_id) for task_id in ("b2", "a1", "b1", "a2", "a3", "c1")] == [
+            1, 2, 3, 4, 5, 6
+        ]
+
+        while len(started) < 6:
+            await asyncio.sleep(0.01)
+        assert started == ["b2", "a1", "b1", "a2", "a3", "c1"]
+        await executor.shutdown()
+
+    asyncio.run(scenario())
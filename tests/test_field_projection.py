@@ -0,0 +1,42 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.endpoints import _project, _projection
+from app.models import TaskResult, TaskStatus
+
+
+def _task():
+    task = TaskResult.create_new("chunking_task", "t1")
+    task.status = TaskStatus.COMPLETED
+    task.result = {
+        "processed_files": 2,
+        "results": [
+            {"chunks_count": 3, "chunks_file_path": "/tmp/a.jsonl"},
+            {"chunks_count": 5, "chunks_file_path": "/tmp/b.jsonl"},
+        ],
+    }
+    return task
+
+
+def _select(fields):
+    projection = _projection(fields)
+    return _project(_task().model_dump(mode="json", include=set(projection)), projection)
+
+
+def test_selects_keys_in_each_list_item():
+    assert _select("status,result.results.chunks_count") == {
+        "task_id": "t1",
+        "status": "completed",
+        "result": {"results": [{"chunks_count": 3}, {"chunks_count": 5}]},
+    }
+
+
+def test_whole_field_wins_over_its_keys():
+    assert _select("result.processed_files,result")["result"] == _task().result
+
+
+@pytest.mark.parametrize("fields", ["status.x", "nope", "result..x"])
+def test_rejects_invalid_paths(fields):
+    with pytest.raises(HTTPException) as error:
+        _projection(fields)
+    assert error.value.status_code == 400
@@ -0,0 +1,42 @@
+import asyncio
+
+from starlette.requests import Request
+
+from app.api.file_responses import file_response
+
+
+def _request(**headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+async def _body(response):
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+def test_if_range_of_a_grown_chunks_file_gets_the_whole_file(tmp_path):
+    async def scenario():
+        path = tmp_path / "chunks.jsonl"
+        path.write_bytes(b'{"text": "a"}\n')
+        first = file_response(_request(), str(path))
+        assert await _body(first) == b'{"text": "a"}\n'
+
+        # Appended by the running task after the first download
+        with open(path, "ab") as f:
+            f.write(b'{"text": "b"}\n')
+        resumed = file_response(_request(range="bytes=14-", if_range=first.headers["etag"]), str(path))
+        assert resumed.status_code == 200
+        assert resumed.headers["content-length"] == "28"
+        assert await _body(resumed) == b'{"text": "a"}\n{"text": "b"}\n'
+
+        current = file_response(_request(), str(path)).headers["etag"]
+        resumed = file_response(_request(range="bytes=14-", if_range=current), str(path))
+        assert resumed.status_code == 206
+        assert resumed.headers["content-range"] == "bytes 14-27/28"
+        assert await _body(resumed) == b'{"text": "b"}\n'
+
+    asyncio.run(scenario())
@@ -0,0 +1,35 @@
+import asyncio
+import multiprocessing
+
+from app.models import TaskResult, TaskStatus
+from app.storage.base import TaskFilter
+from app.storage.file_storage import FileStorage
+
+STATUSES = (TaskStatus.PENDING, TaskStatus.RUNNING, TaskStatus.RUNNING, TaskStatus.COMPLETED)
+
+
+def _save_tasks(storage_path, worker, count):
+    async def save():
+        storage = FileStorage(storage_path)
+        for i in range(count):
+            task = TaskResult.create_new("chunking_task", f"w{worker}-{i}")
+            for status in STATUSES:
+                task.status = status
+                await storage.save_task(task)
+
+    asyncio.run(save())
+
+
+def test_index_keeps_lines_appended_during_other_processes_compaction(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_save_tasks, args=(str(tmp_path), worker, 400)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+
+    index = FileStorage(str(tmp_path))._index
+    assert len(index) == 1600
+    task_ids, _ = index.query(TaskFilter(status=TaskStatus.COMPLETED), limit=2000)
+    assert len(task_ids) == 1600
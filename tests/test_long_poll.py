@@ -0,0 +1,33 @@
+import asyncio
+
+from app.api import endpoints
+from app.models import TaskResult
+from app.storage.events import LocalTaskEvents
+from app.storage.memory import InMemoryStorage
+
+
+class CountingEvents(LocalTaskEvents):
+    def __init__(self):
+        super().__init__()
+        self.subscriptions = 0
+
+    def subscribe(self, task_id):
+        self.subscriptions += 1
+        return super().subscribe(task_id)
+
+
+def test_subscribes_only_when_waiting(monkeypatch):
+    events = CountingEvents()
+    monkeypatch.setattr(endpoints, "get_task_events", lambda: events)
+
+    async def scenario():
+        storage = InMemoryStorage()
+        await storage.save_task(TaskResult.create_new("chunking_task", "t1"))
+        await endpoints.get_task_status("t1", wait=None, storage=storage)
+        await endpoints.get_task_result("t1", wait=None, fields=None, storage=storage)
+        assert events.subscriptions == 0
+        await endpoints.get_task_status("t1", wait="0.01s", storage=storage)
+        await endpoints.get_task_result("t1", wait="0.01s", fields=None, storage=storage)
+        assert events.subscriptions == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+from app.parsers import output_pump
+from app.parsers.output_pump import MAX_PROGRESS_LINE, OutputPump, parse_progress_line
+
+
+def test_parses_marker_progress_line():
+    progress = parse_progress_line("Recognizing layout: 45%|████▌     | 9/20 [00:03<00:04,  2.61it/s]")
+    assert progress is not None
+    assert (progress.stage, progress.percent, progress.current, progress.total) == ("Recognizing layout", 45, 9, 20)
+
+
+def test_ignores_lines_without_progress_bar():
+    assert parse_progress_line("Loaded layout model on cuda") is None
+
+
+class RecordingPattern:
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.lengths = []
+
+    def match(self, line):
+        self.lengths.append(len(line))
+        return self.pattern.match(line)
+
+
+def test_long_colon_free_line_is_matched_on_a_bounded_prefix(monkeypatch):
+    pattern = RecordingPattern(output_pump.PROGRESS_PATTERN)
+    monkeypatch.setattr(output_pump, "PROGRESS_PATTERN", pattern)
+    pump = OutputPump()
+    line = "x" * (64 * 1024)
+    pump._handle_line("stdout", line)
+    pump._handle_line("stdout", line + "%|")
+    # Only the line with a progress bar marker reaches the regex, cut to the bound
+    assert pattern.lengths == [MAX_PROGRESS_LINE]
+    assert pump.progress is None
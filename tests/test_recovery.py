@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.models import FileStage, TaskResult, TaskStatus
+from app.storage.memory import InMemoryStorage
+from app.tasks.base import LEASE_OWNER
+from app.tasks.recovery import recover_tasks
+
+
+class RecordingExecutor:
+    def __init__(self):
+        self.submitted = {}
+
+    def holds(self, task_id):
+        return task_id in self.submitted
+
+    def submit(self, task_id, strategy, run, **kwargs):
+        self.submitted[task_id] = kwargs
+        return len(self.submitted)
+
+
+def _running_task(task_id, heartbeat_age):
+    task = TaskResult.create_new("chunking_task", task_id)
+    task.status = TaskStatus.RUNNING
+    task.owner = "other-node"
+    task.heartbeat_at = datetime.utcnow() - timedelta(seconds=heartbeat_age)
+    task.result = {"saved_files": ["/tmp/doc.pdf"], "strategy": "simple_page", "tenant": "tenant-a"}
+    task.checkpoints = {"/tmp/doc.pdf": {"stage": FileStage.UPLOADED.value, "sha256": "abc"}}
+    return task
+
+
+def test_resumes_only_tasks_with_expired_leases():
+    async def scenario():
+        storage = InMemoryStorage()
+        await storage.save_task(_running_task("held", heartbeat_age=10))
+        await storage.save_task(_running_task("abandoned", heartbeat_age=600))
+        executor = RecordingExecutor()
+
+        assert await recover_tasks(storage, executor, lease_timeout=120) == 1
+        assert list(executor.submitted) == ["abandoned"]
+        assert executor.submitted["abandoned"]["tenant"] == "tenant-a"
+        assert (await storage.get_task("abandoned")).owner == LEASE_OWNER
+        assert (await storage.get_task("held")).owner == "other-node"
+
+        # Renewed by the takeover, and held by this process
+        assert await recover_tasks(storage, executor, lease_timeout=120) == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.models import TaskResult, TaskStatus
+from app.storage.base import TaskFilter
+from app.storage.redis_storage import RedisStorage
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Runs the partial save script
+
+
+def _storages(count):
+    server = fakeredis.FakeServer()
+    return [
+        RedisStorage("redis://fake", redis_client=fakeredis.aioredis.FakeRedis(server=server))
+        for _ in range(count)
+    ]
+
+
+def test_status_change_moves_task_from_stored_status_index():
+    async def scenario():
+        runner, api = _storages(2)
+        task = TaskResult.create_new("chunking_task", "t1")
+        await runner.save_task(task)
+        task.status = TaskStatus.RUNNING
+        await runner.save_task(task)
+
+        # Cancelled by another process, then saved again by the runner
+        cancelled = await api.get_task("t1")
+        cancelled.status = TaskStatus.CANCELLED
+        await api.save_task(cancelled)
+        task.progress = {"parse": {"done": 1, "total": 2}}
+        task.status = TaskStatus.COMPLETED
+        await runner.save_task(task)
+
+        client = runner.redis_client
+        indexed = [s for s in TaskStatus if await client.zscore(f"task-index:status:{s.value}", "t1") is not None]
+        assert indexed == [TaskStatus.COMPLETED]
+
+    asyncio.run(scenario())
+
+
+def test_partial_save_of_vanished_task_replaces_whole_hash():
+    async def scenario():
+        (storage,) = _storages(1)
+        task = TaskResult.create_new("chunking_task", "t1")
+        await storage.save_task(task)
+        await storage.redis_client.delete("task:t1")
+
+        task.status = TaskStatus.RUNNING
+        await storage.save_task(task)
+
+        stored = await storage.get_task("t1")
+        assert stored is not None and stored.task_type == "chunking_task"
+        assert stored.status == TaskStatus.RUNNING
+        tasks, _ = await storage.query_tasks(TaskFilter(status=TaskStatus.RUNNING))
+        assert [t.task_id for t in tasks] == ["t1"]
+
+    asyncio.run(scenario())
+
+
+def test_undecodable_hash_is_skipped():
+    async def scenario():
+        (storage,) = _storages(1)
+        await storage.save_task(TaskResult.create_new("chunking_task", "good"))
+        await storage.save_task(TaskResult.create_new("chunking_task", "bad"))
+        await storage.redis_client.hdel("task:bad", "task_type", "created_at")
+
+        assert await storage.get_task("bad") is None
+        assert list(await storage.list_tasks()) == ["good"]
+        tasks, _ = await storage.query_tasks()
+        assert [t.task_id for t in tasks] == ["good"]
+
+    asyncio.run(scenario())
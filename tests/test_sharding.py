@@ -0,0 +1,11 @@
+import sys
+
+from app.parsers import sharding
+
+
+def test_page_objects_split_across_pieces_are_counted_once(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pypdfium2", None)
+    monkeypatch.setattr(sharding, "PAGE_SCAN_READ_SIZE", 7)
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.4 " + b"<< /Type /Page >> << /Type /Pages /Kids [] >> " * 50)
+    assert sharding.count_pdf_pages(str(path)) == 50
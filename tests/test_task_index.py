@@ -0,0 +1,43 @@
+import random
+
+from app.models import TaskStatus
+from app.storage.base import TaskFilter
+from app.storage.task_index import TaskIndex
+
+
+def _expected(tasks, task_filter):
+    matches = [
+        (created, task_id) for task_id, (created, status, task_type) in tasks.items()
+        if task_filter.matches(TaskStatus(status), task_type, created)
+    ]
+    return [task_id for _, task_id in sorted(matches, reverse=True)]
+
+
+def test_filtered_queries_match_a_full_scan():
+    rng = random.Random(7)
+    index = TaskIndex()
+    tasks = {}
+    for _ in range(3000):
+        task_id = f"t{rng.randrange(500)}"
+        if rng.random() < 0.1:
+            index.remove(task_id)
+            tasks.pop(task_id, None)
+            continue
+        created = tasks[task_id][0] if task_id in tasks and rng.random() < 0.8 else float(rng.randrange(200))
+        state = (created, rng.choice(list(TaskStatus)).value, rng.choice(["chunking_task", "ocr_task"]))
+        index.update(task_id, *state)
+        tasks[task_id] = state
+
+    filters = [TaskFilter()] + [TaskFilter(status=status) for status in TaskStatus] + [
+        TaskFilter(status=TaskStatus.RUNNING, task_type="ocr_task"),
+        TaskFilter(task_type="chunking_task"),
+        TaskFilter(task_type="missing"),
+    ]
+    for task_filter in filters:
+        pages, after = [], None
+        while True:
+            task_ids, after = index.query(task_filter, after, limit=7)
+            pages.extend(task_ids)
+            if after is None:
+                break
+        assert pages == _expected(tasks, task_filter)
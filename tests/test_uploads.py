@@ -0,0 +1,57 @@
+import asyncio
+
+from app.core.uploads import RequestSizeLimitMiddleware
+
+
+class BodyReadingApp:
+    def __init__(self):
+        self.received = b""
+        self.disconnected = False
+
+    async def __call__(self, scope, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                self.disconnected = True
+                break
+            self.received += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _call(middleware, headers, pieces):
+    messages = [{"type": "http.request", "body": piece, "more_body": True} for piece in pieces]
+    messages[-1]["more_body"] = False
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": headers}
+    asyncio.run(middleware(scope, receive, send))
+    return sent, messages
+
+
+def test_declared_oversized_body_is_rejected_before_it_is_read():
+    app = BodyReadingApp()
+    sent, unread = _call(RequestSizeLimitMiddleware(app, limit=10), [(b"content-length", b"11")], [b"x" * 11])
+    assert sent[0]["status"] == 413
+    assert len(unread) == 1 and app.received == b""
+
+
+def test_streamed_body_is_cut_off_once_it_exceeds_the_limit():
+    app = BodyReadingApp()
+    sent, unread = _call(RequestSizeLimitMiddleware(app, limit=10), [], [b"x" * 6, b"x" * 6, b"x" * 6])
+    assert [message.get("status") for message in sent] == [413, None]
+    assert app.disconnected and len(unread) == 1
+
+
+def test_body_within_the_limit_is_passed_through():
+    app = BodyReadingApp()
+    sent, _ = _call(RequestSizeLimitMiddleware(app, limit=10), [(b"content-length", b"10")], [b"x" * 5, b"x" * 5])
+    assert sent[0]["status"] == 200 and app.received == b"x" * 10